@@ -3,18 +3,54 @@ AquaExchange Package
 ====================
 This package processes farm pond data, buffers ponds, retrieves satellite images, 
 calculates NWI indices, assigns LULC classes, and produces structured JSON outputs.
+
+Public names are loaded lazily: ``import aquaexchange`` is cheap, and each
+submodule (with its geospatial dependencies) is imported on first access.
 """
 
-# Import key modules for easier access
-from .buffer import buffer_ponds
-from .calculate_indices import process_nwi
-from .find_previous_lulc import assign_previous_lulc_class
-from .geojson_maker import create_geojson
-from .merge_geojson import merge_geojson
-from .search_stack_images import search_stac_images
-from .satellite_imagery_processor import process_satellite_imagery
-from .combine_outputs import merge_final_outputs
-from .utils import *
+import importlib
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    "buffer_ponds": ".buffer",
+    "buffer_geometries": ".geometry_engine",
+    "process_nwi": ".calculate_indices",
+    "process_indices": ".calculate_indices",
+    "assign_previous_lulc_class": ".find_previous_lulc",
+    "create_geojson": ".geojson_maker",
+    "farm_geodataframe": ".geojson_maker",
+    "merge_geojson": ".merge_geojson",
+    "merge_ponds": ".merge_geojson",
+    "FetchPlan": ".fetch_plan",
+    "run_farm": ".pipeline",
+    "search_stac_images": ".search_stack_images",
+    "process_satellite_imagery": ".satellite_imagery_processor",
+    "render_imagery": ".satellite_imagery_processor",
+    "combine_json_outputs": ".combine_outputs",
+    "combine_results": ".combine_outputs",
+    "RunContext": ".run_context",
+    "enable_metrics": ".metrics",
+    "configure_logging": ".metrics",
+    "ensure_directory_exists": ".utils",
+    "save_json": ".utils",
+    "load_json": ".utils",
+    "clean_intermediate_files": ".utils",
+    "load_geojson": ".utils",
+    "save_geojson": ".utils",
+    "to_geodataframe": ".utils",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
 
 # Define package version
 __version__ = "1.0.0"
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value  # Cache so later lookups skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
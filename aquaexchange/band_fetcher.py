@@ -0,0 +1,52 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+import rasterio
+
+# Concurrency limit and per-request HTTP timeout (seconds) for remote band reads
+MAX_CONCURRENT_READS = int(os.getenv("AQUAEXCHANGE_MAX_CONCURRENT_READS", "8"))
+READ_TIMEOUT = float(os.getenv("AQUAEXCHANGE_READ_TIMEOUT", "60"))
+
+def http_env(timeout=None):
+    """
+    rasterio environment that bounds every HTTP request made by GDAL.
+
+    Args:
+        timeout (float, optional): Per-request timeout in seconds. Defaults to READ_TIMEOUT.
+
+    Returns:
+        rasterio.Env: Environment to enter around the read.
+    """
+    timeout = READ_TIMEOUT if timeout is None else timeout
+    seconds = str(max(int(math.ceil(timeout)), 1))
+    return rasterio.Env(GDAL_HTTP_TIMEOUT=seconds, GDAL_HTTP_CONNECTTIMEOUT=seconds)
+
+def fetch_all(read_fn, tasks, max_workers=None, timeout=None):
+    """
+    Run ``read_fn(*task)`` for every task on a bounded thread pool.
+
+    Results are returned in task order regardless of completion order, so the
+    output is identical to a serial loop over ``tasks``.
+
+    Args:
+        read_fn (callable): Function performing one remote read.
+        tasks (list): Argument tuples, one per read.
+        max_workers (int, optional): Maximum reads in flight. Defaults to MAX_CONCURRENT_READS.
+        timeout (float, optional): Per-request HTTP timeout in seconds. Defaults to READ_TIMEOUT.
+
+    Returns:
+        list: Result of each task, in the order of ``tasks``.
+    """
+    max_workers = MAX_CONCURRENT_READS if max_workers is None else max_workers
+
+    def run(task):
+        # GDAL configuration is thread-local, so each worker sets its own timeout
+        with http_env(timeout):
+            return read_fn(*task)
+
+    if max_workers <= 1 or len(tasks) <= 1:
+        return [run(task) for task in tasks]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tasks))) as pool:
+        futures = [pool.submit(run, task) for task in tasks]
+        return [future.result() for future in futures]
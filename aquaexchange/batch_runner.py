@@ -0,0 +1,269 @@
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import shape
+from .geojson_maker import farm_geodataframe
+from .buffer import buffer_ponds
+from .stac_cache import search_items
+from .search_stack_images import search_stac_images_by_pond
+from .calculate_indices import process_nwi_by_pond
+from .fetch_plan import FetchPlan
+from .merge_geojson import merge_ponds
+from .find_previous_lulc import assign_previous_lulc_class, get_registry
+from .satellite_imagery_processor import render_imagery
+from .combine_outputs import build_pond_records
+from .pipeline import BUFFER_DISTANCE, NWI_MODE, pond_scene_items, record_nwi
+from .metrics import metrics
+from .utils import save_json
+
+logger = logging.getLogger(__name__)
+
+# Short search used only to discover which tiles cover a region
+TILE_SEARCH_RANGE = "2023-01-01/2023-12-31"
+
+# Farms are grouped on a grid (degrees) before tile discovery, and tile
+# clusters are split into chunks so a scene window stays a few km wide.
+REGION_SIZE = 1.0
+CHUNK_SIZE = 0.1
+
+def tile_id(item):
+    """
+    Landsat WRS-2 path/row or Sentinel-2 MGRS tile of a STAC item, or None.
+    """
+    properties = item.properties
+    if "landsat:wrs_path" in properties:
+        return f"{properties['landsat:wrs_path']}/{properties['landsat:wrs_row']}"
+    return properties.get("s2:mgrs_tile")
+
+def _grid_cell(geom, size):
+    point = geom.centroid
+    return math.floor(point.x / size), math.floor(point.y / size)
+
+def assign_tiles(farm_geometries, collection, search_range=TILE_SEARCH_RANGE):
+    """
+    Finds the tile that fully covers each farm.
+
+    Farms are grouped by REGION_SIZE cells and every cell runs one (cached)
+    STAC search to discover the tiles around it.
+
+    Args:
+        farm_geometries (list): Farm outlines in EPSG:4326.
+        collection (str): "landsat-c2-l2" or "sentinel-2-l2a".
+        search_range (str): Date range of the discovery search.
+
+    Returns:
+        list: Tile id per farm (the first in sorted order that covers it), or None.
+    """
+    geometries = np.asarray(farm_geometries, dtype=object)
+    tiles = [None] * len(geometries)
+
+    regions = {}
+    for i, geom in enumerate(geometries):
+        regions.setdefault(_grid_cell(geom, REGION_SIZE), []).append(i)
+
+    for members in regions.values():
+        region = shapely.union_all(geometries[members])
+        footprints = {}
+        for item in search_items([collection], region.envelope, search_range):
+            tile = tile_id(item)
+            if tile is not None:
+                footprints.setdefault(tile, []).append(shape(item.geometry))
+
+        for tile in sorted(footprints):
+            unassigned = [i for i in members if tiles[i] is None]
+            if not unassigned:
+                break
+            # Area covered by every acquisition of the tile
+            footprint = shapely.intersection_all(footprints[tile])
+            for i, covered in zip(unassigned, shapely.contains(footprint, geometries[unassigned])):
+                if covered:
+                    tiles[i] = tile
+    return tiles
+
+def cluster_farms(farm_geometries):
+    """
+    Groups farms that share a Landsat path/row, a Sentinel-2 tile and a CHUNK_SIZE cell.
+
+    Args:
+        farm_geometries (list): Farm outlines in EPSG:4326.
+
+    Returns:
+        dict: {(wrs path/row, mgrs tile, chunk): [farm indices]}
+    """
+    landsat_tiles = assign_tiles(farm_geometries, "landsat-c2-l2")
+    sentinel_tiles = assign_tiles(farm_geometries, "sentinel-2-l2a")
+
+    clusters = {}
+    for i, geom in enumerate(farm_geometries):
+        key = (landsat_tiles[i], sentinel_tiles[i], _grid_cell(geom, CHUNK_SIZE))
+        clusters.setdefault(key, []).append(i)
+    return clusters
+
+def cluster_nwi(farm_gdfs, plan=None):
+    """
+    NWI for several farms at once, reading each scene window once for all their ponds.
+
+    Ponds are buffered by BUFFER_DISTANCE, searched and processed exactly as
+    in ``pipeline.run_farm``, so every farm gets the NWI results of a
+    single-farm run.
+
+    Args:
+        farm_gdfs (list): Pond GeoDataFrames of the farms, in EPSG:4326.
+        plan (FetchPlan, optional): Plan holding the cluster's other reads (its
+            imagery); the NWI reads are added to it, so windows both need are read once.
+
+    Returns:
+        list: NWI DataFrame per farm, in input order. ``attrs["scenes_read"]``
+        of each holds the scenes read for the whole group, ``attrs["pixels"]``
+        the valid pixels of the farm's own ponds.
+    """
+    ponds = gpd.GeoDataFrame(
+        pd.concat([gdf.assign(farm_index=i) for i, gdf in enumerate(farm_gdfs)], ignore_index=True),
+        crs="EPSG:4326",
+    )
+
+    with metrics.stage("buffer"):
+        buffered = buffer_ponds(ponds, BUFFER_DISTANCE)
+
+    # Pond ids are only unique within a farm, so the group is keyed by position
+    cluster_ponds = buffered.assign(pond_id=np.arange(len(buffered)))
+    with metrics.stage("search"):
+        pond_items = search_stac_images_by_pond(cluster_ponds)
+    if plan is not None:
+        plan.add_items(pond_scene_items(pond_items), cluster_ponds)
+    with metrics.stage("nwi"):
+        nwi_df = process_nwi_by_pond(pond_items, cluster_ponds, mode=NWI_MODE, plan=plan)
+    nwi_df["pond_id"] = ponds["pond_id"].values
+
+    pond_pixels = np.asarray(nwi_df.attrs["pond_pixels"])
+    farm_nwi = []
+    for i in range(len(farm_gdfs)):
+        selected = ponds["farm_index"].values == i
+        df = nwi_df[selected].reset_index(drop=True)
+        df.attrs = {
+            "scenes_read": nwi_df.attrs["scenes_read"],
+            "pond_pixels": pond_pixels[selected].tolist(),
+            "pixels": int(pond_pixels[selected].sum()),
+        }
+        farm_nwi.append(df)
+    return farm_nwi
+
+def process_farm(farm_id, ponds, nwi_df, output_dir, registry=None, plan=None):
+    """
+    Per-farm work of a batch: LULC, imagery and the structured output.
+
+    NWI has already been extracted for the cluster. Imagery is rendered from
+    the merged ponds, as in ``pipeline.run_farm``.
+
+    Args:
+        farm_id (str): Farm id.
+        ponds (GeoDataFrame): The farm's ponds.
+        nwi_df (DataFrame): NWI results of the farm's ponds.
+        output_dir (str): Batch output directory.
+        registry (LulcRegistry, optional): LULC epochs.
+        plan (FetchPlan, optional): Cluster plan the imagery reads go through.
+
+    Returns:
+        tuple: (farm_id, structured output dict)
+    """
+    lulc_df = assign_previous_lulc_class(ponds, nwi_df, registry=registry)
+    images, thumbnails = render_imagery(merge_ponds(ponds), plan=plan)
+
+    image_dir = os.path.join(output_dir, "images", str(farm_id))
+    os.makedirs(image_dir, exist_ok=True)
+    paths = {}
+    for kind, files in (("Images", images), ("Thumbnails", thumbnails)):
+        paths[kind] = []
+        for filename, image_bytes in files.items():
+            image_path = os.path.join(image_dir, filename)
+            with open(image_path, "wb") as f:
+                f.write(image_bytes)
+            paths[kind].append(image_path)
+
+    output = {
+        "farmid": farm_id,
+        "noofponds": len(nwi_df),
+        "ponds": build_pond_records(nwi_df, lulc_df),
+        "Images": paths["Images"],
+        "Thumbnails": paths["Thumbnails"]
+    }
+    save_json(output, os.path.join(output_dir, f"{farm_id}.json"))
+    return farm_id, output
+
+def process_cluster(farm_ids, farm_gdfs, output_dir, registry=None):
+    """
+    All work of one tile cluster, run in a worker process.
+
+    The imagery display reads of every farm and the NWI reads of all ponds
+    go through one fetch plan, so a scene window the farms share is read once
+    for the cluster.
+
+    Args:
+        farm_ids (list): Farm ids.
+        farm_gdfs (list): Pond GeoDataFrames of the farms, in EPSG:4326.
+        output_dir (str): Batch output directory.
+        registry (LulcRegistry, optional): LULC epochs.
+
+    Returns:
+        list: (farm_id, structured output dict, NWI DataFrame) per farm, in input order.
+    """
+    plan = FetchPlan()
+    for ponds in farm_gdfs:
+        plan.add_imagery(merge_ponds(ponds))
+    farm_nwi = cluster_nwi(farm_gdfs, plan=plan)
+
+    results = []
+    for farm_id, ponds, nwi_df in zip(farm_ids, farm_gdfs, farm_nwi):
+        _, output = process_farm(farm_id, ponds, nwi_df, output_dir, registry, plan=plan)
+        results.append((farm_id, output, nwi_df))
+    return results
+
+def run_batch(farm_data, output_dir, max_workers=None):
+    """
+    Processes many farms, paying each remote scene read once per tile cluster.
+
+    Farms are clustered by Landsat path/row and Sentinel-2 tile, and the
+    clusters run in a process pool (``process_cluster``). Within a cluster,
+    one STAC search covers all ponds, the scene-major NWI engine reads every
+    scene window once for all of them, and the farms' imagery shares those
+    windows through the cluster's fetch plan.
+
+    Args:
+        farm_data (list): Farms in the input JSON format.
+        output_dir (str): Directory for images and per-farm JSON outputs.
+        max_workers (int, optional): Size of the process pool.
+
+    Returns:
+        dict: {farm_id: structured output}
+    """
+    farm_gdfs = [farm_geodataframe(farm) for farm in farm_data]
+    farm_geometries = [shapely.union_all(np.asarray(gdf.geometry.values)) for gdf in farm_gdfs]
+    clusters = cluster_farms(farm_geometries)
+    registry = get_registry()
+
+    outputs = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for (landsat_tile, sentinel_tile, _), members in clusters.items():
+            logger.info("Cluster %s / %s: %d farms", landsat_tile, sentinel_tile, len(members),
+                        extra={"landsat_tile": landsat_tile, "sentinel_tile": sentinel_tile, "farms": len(members)})
+            future = pool.submit(
+                process_cluster, [farm_data[i]["farmid"] for i in members], [farm_gdfs[i] for i in members],
+                output_dir, registry,
+            )
+            futures[future] = (landsat_tile, sentinel_tile)
+
+        for future, (landsat_tile, sentinel_tile) in futures.items():
+            results = future.result()
+            logger.info("Cluster %s / %s: %d scenes read for NWI", landsat_tile, sentinel_tile,
+                        results[0][2].attrs["scenes_read"])
+            for farm_id, output, nwi_df in results:
+                record_nwi(farm_id, nwi_df)
+                outputs[farm_id] = output
+
+    return outputs
@@ -1,41 +1,52 @@
-import geopandas as gpd
+import logging
 import os
+from .geometry_engine import buffer_geometries
+from .utils import to_geodataframe
 
-def buffer_ponds(input_geojson, buffer_distance, output_geojson):
+logger = logging.getLogger(__name__)
+
+def buffer_ponds(ponds, buffer_distance, output_geojson=None, workers=None):
     """
     Buffers pond geometries by a specified distance.
 
+    Every pond is buffered in the UTM zone it lies in (see
+    ``geometry_engine.buffer_geometries``), so batches spanning several
+    zones get correct metric buffers.
+
     Parameters:
-    - input_geojson (str): Path to input GeoJSON file containing pond polygons.
+    - ponds (str | GeoDataFrame): Pond polygons, as a GeoJSON path or a GeoDataFrame.
     - buffer_distance (float): Buffer distance in meters.
-    - output_geojson (str): Path to save the buffered GeoJSON file.
-    """
-    
-    # Ensure output directory exists
-    os.makedirs(os.path.dirname(output_geojson), exist_ok=True)
+    - output_geojson (str, optional): Path to also save the buffered GeoJSON file,
+      for debugging.
+    - workers (int, optional): Processes used for large pond sets. Defaults to GEOMETRY_WORKERS.
 
-    # Read input GeoJSON
-    gdf = gpd.read_file(input_geojson)
+    Returns:
+    - GeoDataFrame: Buffered ponds in EPSG:4326, with their area before buffering in 'area_m2'.
+    """
+    gdf = to_geodataframe(ponds)
 
     # Ensure CRS is WGS84 before processing
     gdf = gdf.set_crs("EPSG:4326", allow_override=True)
 
-    # Convert to UTM (Auto detects correct zone)
-    utm_crs = gdf.estimate_utm_crs()
-    gdf_utm = gdf.to_crs(utm_crs)
+    # Areas and buffers in each pond's own UTM zone
+    buffered, areas = buffer_geometries(gdf.geometry.values, buffer_distance, workers)
 
-    # Debug: Log areas before buffering
-    gdf_utm["area_m2"] = gdf_utm.area
-    for _, row in gdf_utm.iterrows():
-        print(f"Pond {row['pond_id']}: Area {row['area_m2']:.2f} m², Bounds: {row.geometry.bounds}")
+    buffered_gdf = gdf.copy()
+    buffered_gdf["area_m2"] = areas
+    # Per-pond lines are only formatted when debug logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        for pond_id, area, bounds in zip(buffered_gdf["pond_id"], areas, gdf.bounds.values):
+            logger.debug("Pond %s: Area %.2f m², Bounds: %s", pond_id, area, tuple(bounds),
+                         extra={"pond_id": pond_id, "area_m2": area})
+    logger.info("Buffering %d ponds by %s m", len(buffered_gdf), buffer_distance)
 
     # Apply buffer
-    gdf_utm["geometry"] = gdf_utm.geometry.buffer(buffer_distance)
-
-    # Convert back to WGS84
-    buffered_gdf = gdf_utm.to_crs("EPSG:4326")
+    buffered_gdf["geometry"] = buffered
 
-    # Save to GeoJSON
-    buffered_gdf.to_file(output_geojson, driver='GeoJSON')
+    if output_geojson:
+        # Ensure output directory exists
+        os.makedirs(os.path.dirname(output_geojson) or ".", exist_ok=True)
+        buffered_gdf.to_file(output_geojson, driver='GeoJSON')
+        logger.info("Buffered file saved at: %s", output_geojson)
 
-    print(f"Buffered file saved at: {output_geojson}")
+    return buffered_gdf
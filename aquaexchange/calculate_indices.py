@@ -1,96 +1,693 @@
+import math
 import numpy as np
 import pandas as pd
 import rasterio
-from rasterio.mask import mask
-import planetary_computer
-import geopandas as gpd
+from rasterio.features import geometry_mask
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds
+from rasterio.windows import transform as window_transform
+from .band_fetcher import fetch_all
+from .pixel_accumulator import make_accumulator
+from .signing_cache import sign_href
+from .chip_cache import cached_read
+from .metrics import metrics
 
-def calculate_nwi(blue, nir, swir16, swir22):
+NWI_BANDS = ("blue", "nir08", "swir16", "swir22")
+
+# Reflectance = DN * scale + offset for the surface reflectance bands of each collection
+REFLECTANCE_SCALING = {
+    "landsat-c2-l2": (0.0000275, -0.2),
+    "sentinel-2-l2a": (0.0001, -0.1),
+}
+
+# Minimum yearly median NWI for a pond to count as present
+NWI_THRESHOLD = 1
+
+# How process_nwi walks the years: every year, sorted years until the first
+# qualifying one, or a per-pond bisection assuming a pond stays a pond
+NWI_MODES = ("full", "early_exit", "bisect")
+
+def reflectance_scaling(item):
+    """
+    Scale and offset that convert an item's digital numbers to reflectance.
+
+    Sentinel-2 scenes before processing baseline 04.00 carry no offset.
+
+    Returns:
+        tuple: (scale, offset); (1.0, 0.0) for unknown collections.
+    """
+    scale, offset = REFLECTANCE_SCALING.get(item.collection_id, (1.0, 0.0))
+    if item.collection_id == "sentinel-2-l2a" and item.properties.get("s2:processing_baseline", "04.00") < "04.00":
+        offset = 0.0
+    return scale, offset
+
+def _nwi_block(blue, nir, swir16, swir22, scale, offset, nodata, out, scratch):
+    """
+    Fused NWI over one block, writing into ``out`` with ``scratch`` as the only temporary.
+    """
+    # scratch = NIR + SWIR1 + SWIR2, accumulated in float32 so uint16 inputs cannot overflow
+    np.add(nir, swir16, out=scratch, dtype=np.float32)
+    np.add(scratch, swir22, out=scratch, dtype=np.float32)
+    np.copyto(out, blue, casting="unsafe")
+    if scale != 1 or offset != 0:
+        scratch *= scale
+        scratch += 3 * offset
+        out *= scale
+        out += offset
+
+    # out = Blue - sum, then scratch = 2 * sum + (Blue - sum) = Blue + sum
+    out -= scratch
+    scratch *= 2
+    scratch += out
+
+    valid = scratch != 0
+    if nodata is not None:
+        for band in (blue, nir, swir16, swir22):
+            valid &= band != nodata
+    np.divide(out, scratch, out=out, where=valid)
+    invalid = np.logical_not(valid, out=valid)
+    out[invalid] = np.nan
+
+def calculate_nwi(blue, nir, swir16, swir22, scale=1.0, offset=0.0, nodata=0, out=None, block_rows=None):
     """
     Calculate Normalized Water Index (NWI).
     
     Formula: (Blue - (NIR + SWIR1 + SWIR2)) / (Blue + (NIR + SWIR1 + SWIR2))
+
+    Inputs are promoted to float32 once (so raw uint16 reflectance cannot
+    overflow), scaled to reflectance and combined with in-place operations
+    into ``out``. Large windows can be processed ``block_rows`` rows at a
+    time to bound the scratch memory.
     
     Args:
         blue (numpy array): Blue band.
         nir (numpy array): Near-Infrared band.
         swir16 (numpy array): Shortwave Infrared (1.6µm) band.
         swir22 (numpy array): Shortwave Infrared (2.2µm) band.
+        scale (float): Reflectance scale of the digital numbers.
+        offset (float): Reflectance offset of the digital numbers.
+        nodata (number, optional): Input value marking missing pixels; None to disable.
+        out (numpy array, optional): float32 output buffer of the input shape, reused if given.
+        block_rows (int, optional): Rows (first axis) processed per block. Defaults to all.
 
     Returns:
-        numpy array: Computed NWI values.
+        numpy array: Computed NWI values (float32), NaN where undefined or missing.
     """
-    denominator = blue + (nir + swir16 + swir22)
-    with np.errstate(divide='ignore', invalid='ignore'):
-        nwi = np.where(denominator != 0, (blue - (nir + swir16 + swir22)) / denominator, np.nan)
-    return nwi
+    shape = np.shape(blue)
+    if out is None:
+        out = np.empty(shape, dtype=np.float32)
+    if len(shape) == 0:
+        raise ValueError("NWI inputs must be arrays.")
+
+    rows = shape[0]
+    step = rows if not block_rows else min(block_rows, rows)
+    scratch = np.empty((step,) + shape[1:], dtype=np.float32)
+    for start in range(0, rows, max(step, 1)):
+        stop = min(start + step, rows)
+        _nwi_block(
+            blue[start:stop], nir[start:stop], swir16[start:stop], swir22[start:stop],
+            scale, offset, nodata, out[start:stop], scratch[:stop - start],
+        )
+    return out
+
+def _reflectance(band, scale, offset):
+    """Band as float32 reflectance, in a new array."""
+    values = np.asarray(band).astype(np.float32)
+    if scale != 1 or offset != 0:
+        values *= scale
+        values += offset
+    return values
+
+def _mask_nodata(out, bands, nodata, valid=None):
+    """Sets ``out`` to NaN where any input band is ``nodata`` or ``valid`` is False."""
+    if nodata is not None:
+        for band in bands:
+            missing = np.asarray(band) == nodata
+            valid = ~missing if valid is None else valid & ~missing
+    if valid is not None:
+        out[~valid] = np.nan
+    return out
+
+def normalized_difference(a, b, scale=1.0, offset=0.0, nodata=0):
+    """
+    Normalized difference (a - b) / (a + b) of two bands in reflectance.
+
+    Args:
+        a (numpy array): First band.
+        b (numpy array): Second band.
+        scale (float): Reflectance scale of the digital numbers.
+        offset (float): Reflectance offset of the digital numbers.
+        nodata (number, optional): Input value marking missing pixels; None to disable.
+
+    Returns:
+        numpy array: float32 values, NaN where undefined or missing.
+    """
+    out = _reflectance(a, scale, offset)
+    total = _reflectance(b, scale, offset)
+    out -= total
+    total *= 2
+    total += out  # a + b
+    valid = total != 0
+    np.divide(out, total, out=out, where=valid)
+    return _mask_nodata(out, (a, b), nodata, valid)
+
+def calculate_awei(green, nir, swir16, swir22, blue=None, scale=1.0, offset=0.0, nodata=0):
+    """
+    Automated Water Extraction Index (Feyisa et al., 2014).
+
+    Without ``blue``: AWEInsh = 4 * (Green - SWIR1) - (0.25 * NIR + 2.75 * SWIR2).
+    With ``blue``: AWEIsh = Blue + 2.5 * Green - 1.5 * (NIR + SWIR1) - 0.25 * SWIR2,
+    the variant for areas with shadows.
+
+    Returns:
+        numpy array: float32 values, NaN where missing.
+    """
+    green_r, nir_r, swir16_r, swir22_r = (_reflectance(band, scale, offset) for band in (green, nir, swir16, swir22))
+    if blue is None:
+        out = green_r
+        out -= swir16_r
+        out *= 4
+        nir_r *= 0.25
+        swir22_r *= 2.75
+        out -= nir_r
+        out -= swir22_r
+        bands = (green, nir, swir16, swir22)
+    else:
+        out = _reflectance(blue, scale, offset)
+        green_r *= 2.5
+        out += green_r
+        nir_r += swir16_r
+        nir_r *= 1.5
+        out -= nir_r
+        swir22_r *= 0.25
+        out -= swir22_r
+        bands = (blue, green, nir, swir16, swir22)
+    return _mask_nodata(out, bands, nodata)
+
+# Water indices: name -> (asset keys read, function(bands, scale, offset)),
+# where ``bands`` maps each asset key to its pixels
+INDICES = {
+    "nwi": (NWI_BANDS, lambda b, *s: calculate_nwi(b["blue"], b["nir08"], b["swir16"], b["swir22"], *s)),
+    "ndwi": (("green", "nir08"), lambda b, *s: normalized_difference(b["green"], b["nir08"], *s)),
+    "mndwi": (("green", "swir16"), lambda b, *s: normalized_difference(b["green"], b["swir16"], *s)),
+    "awei_nsh": (
+        ("green", "nir08", "swir16", "swir22"),
+        lambda b, *s: calculate_awei(b["green"], b["nir08"], b["swir16"], b["swir22"], None, *s),
+    ),
+    "awei_sh": (
+        ("blue", "green", "nir08", "swir16", "swir22"),
+        lambda b, *s: calculate_awei(b["green"], b["nir08"], b["swir16"], b["swir22"], b["blue"], *s),
+    ),
+}
 
-def process_nwi(selected_items_by_year, aoi_gdf):
+def register_index(name, bands, function):
+    """
+    Adds a water index to INDICES.
+
+    Args:
+        name (str): Index name, used in result columns.
+        bands (tuple): Asset keys the index needs.
+        function (callable): ``function(bands, scale, offset)`` returning a float32
+            array with NaN for invalid pixels, where ``bands`` maps asset keys to pixel arrays.
+    """
+    INDICES[name] = (tuple(bands), function)
+
+def index_bands(indices):
+    """
+    Union of the asset keys needed by ``indices``, in first-use order.
+
+    Raises:
+        ValueError: For an index missing from INDICES.
+    """
+    bands = []
+    for name in indices:
+        if name not in INDICES:
+            raise ValueError(f"Unknown index '{name}', use one of {sorted(INDICES)}.")
+        bands.extend(band for band in INDICES[name][0] if band not in bands)
+    return tuple(bands)
+
+def window_from_bounds(bounds, transform, height, width):
+    """
+    Integer pixel window that covers ``bounds`` on the given grid, clipped to the grid.
+
+    Returns:
+        Window or None: None if the bounds do not overlap the grid.
+    """
+    window = from_bounds(*bounds, transform=transform)
+    row_start = max(int(math.floor(window.row_off)), 0)
+    col_start = max(int(math.floor(window.col_off)), 0)
+    row_stop = min(int(math.ceil(window.row_off + window.height)), height)
+    col_stop = min(int(math.ceil(window.col_off + window.width)), width)
+    if row_stop <= row_start or col_stop <= col_start:
+        return None
+    return Window(col_start, row_start, col_stop - col_start, row_stop - row_start)
+
+def read_band_window(href, bounds, bounds_crs):
+    """
+    Read the part of a single-band raster that covers the given bounds.
+
+    Args:
+        href (str): Signed URL or local path of the band raster.
+        bounds (tuple): (minx, miny, maxx, maxy) of the area to read.
+        bounds_crs: CRS of ``bounds``.
+
+    Returns:
+        tuple or None: (array, transform, crs) of the window, or None if the
+        bounds fall outside the raster.
+    """
+    metrics.increment("remote_opens")
+    with rasterio.open(href) as src:
+        src_bounds = transform_bounds(bounds_crs, src.crs, *bounds)
+        window = window_from_bounds(src_bounds, src.transform, src.height, src.width)
+        if window is None:
+            return None
+        array = src.read(1, window=window)
+        metrics.increment("bytes_read", array.nbytes)
+        return array, src.window_transform(window), src.crs
+
+def read_band_window_cached(href, collection, bounds, bounds_crs, signer=None, chip_cache=None, plan=None):
+    """
+    ``read_band_window`` through the run's fetch plan and the local chip cache.
+
+    Windows shared by ``plan`` come from its in-memory chips. The href is
+    signed only on a cache miss, so a warm cache needs no network access.
+
+    Args:
+        href (str): Unsigned asset URL.
+        collection (str): Collection of the asset, used for signing.
+        bounds (tuple): (minx, miny, maxx, maxy) of the area to read.
+        bounds_crs: CRS of ``bounds``.
+        signer (SigningCache, optional): Token cache.
+        chip_cache (ChipCache, optional): Chip cache. Defaults to the process-wide cache.
+        plan (FetchPlan, optional): Shared chips of the run.
+
+    Returns:
+        tuple or None: As ``read_band_window``.
+    """
+    if plan is not None:
+        try:
+            return plan.read(href, bounds, bounds_crs)
+        except KeyError:
+            pass  # Not shared, read it as usual
+
+    window = ("bounds", [round(float(v), 6) for v in bounds], str(bounds_crs))
+    return cached_read(
+        href,
+        window,
+        lambda: read_band_window(sign_href(href, collection, signer), bounds, bounds_crs),
+        chip_cache=chip_cache,
+    )
+
+def pond_pixel_index(geometries, transform, shape):
+    """
+    Locate the pixels of each pond inside an in-memory window.
+
+    Pixel selection matches ``rasterio.mask.mask`` (pixel centres inside the
+    polygon), but each mask only spans the pond's own bounding box so large
+    windows with many ponds stay cheap.
+
+    Args:
+        geometries (list): Pond geometries in the CRS of the window.
+        transform (Affine): Transform of the window.
+        shape (tuple): (height, width) of the window.
+
+    Returns:
+        list: One (row_slice, col_slice, mask) tuple per pond, or None for
+        ponds that fall outside the window.
+    """
+    height, width = shape
+    index = []
+    for geom in geometries:
+        window = None
+        if geom is not None and not geom.is_empty:
+            window = window_from_bounds(geom.bounds, transform, height, width)
+        if window is None:
+            index.append(None)
+            continue
+
+        inside = geometry_mask(
+            [geom],
+            out_shape=(window.height, window.width),
+            transform=window_transform(window, transform),
+            invert=True,
+        )
+        rows = slice(window.row_off, window.row_off + window.height)
+        cols = slice(window.col_off, window.col_off + window.width)
+        index.append((rows, cols, inside))
+    return index
+
+def read_scenes(items, aoi_gdf, bands=NWI_BANDS, max_workers=None, timeout=None, signer=None,
+                chip_cache=None, plan=None):
+    """
+    Fetch the farm window of every band of several scenes concurrently.
+
+    Args:
+        items (list): Scenes (pystac.Item) to read.
+        aoi_gdf (GeoDataFrame): Pond polygons; their total bounds define the window.
+        bands (tuple): Asset keys to read.
+        max_workers (int, optional): Maximum reads in flight.
+        timeout (float, optional): Per-request HTTP timeout in seconds.
+        signer (SigningCache, optional): Token cache. Defaults to the process-wide cache.
+        chip_cache (ChipCache, optional): Chip cache. Defaults to the process-wide cache.
+        plan (FetchPlan, optional): Shared chips of the run.
+
+    Returns:
+        list: Per item, a list of (array, transform, crs) windows in ``bands``
+        order, or None if the scene lacks a band or does not overlap the farm.
+    """
+    bounds = tuple(aoi_gdf.total_bounds)
+    tasks, owners = [], []
+    for i, item in enumerate(items):
+        try:
+            hrefs = [item.assets[band].href for band in bands]
+        except KeyError:
+            continue  # Skip if any required band is missing
+        tasks.extend(
+            (href, item.collection_id, bounds, aoi_gdf.crs, signer, chip_cache, plan) for href in hrefs
+        )
+        owners.extend([i] * len(hrefs))
+
+    results = fetch_all(read_band_window_cached, tasks, max_workers, timeout)
+
+    scenes = [[] for _ in items]
+    for owner, window in zip(owners, results):
+        scenes[owner].append(window)
+    return [
+        windows if len(windows) == len(bands) and all(w is not None for w in windows) else None
+        for windows in scenes
+    ]
+
+def slice_pond_pixels(item, windows, aoi_gdf, geometry_cache=None, index_cache=None):
+    """
+    Slice the pixels of every pond out of a scene's in-memory band windows.
+
+    Args:
+        item (pystac.Item): Scene the windows belong to.
+        windows (list): (array, transform, crs) per band, as returned by ``read_scenes``.
+        aoi_gdf (GeoDataFrame): Pond polygons.
+        geometry_cache (dict, optional): Reprojected pond geometries keyed by CRS,
+            shared between scenes.
+        index_cache (dict, optional): Pond pixel indices keyed by grid, shared
+            between scenes on the same grid.
+
+    Returns:
+        list: Per pond, a tuple of 1-D pixel arrays (one per band), or None for
+        ponds outside the scene.
+    """
+    geometry_cache = {} if geometry_cache is None else geometry_cache
+    index_cache = {} if index_cache is None else index_cache
+
+    arrays = [array for array, _, _ in windows]
+    _, transform, crs = windows[0]
+    if any(array.shape != arrays[0].shape for array in arrays):
+        raise ValueError(f"Bands of item {item.id} do not share a pixel grid.")
+
+    # Reproject all ponds once per CRS and locate their pixels once per grid
+    crs_key = crs.to_wkt()
+    if crs_key not in geometry_cache:
+        geometry_cache[crs_key] = list(aoi_gdf.geometry.to_crs(crs))
+    grid_key = (crs_key, tuple(transform), arrays[0].shape)
+    if grid_key not in index_cache:
+        index_cache[grid_key] = pond_pixel_index(geometry_cache[crs_key], transform, arrays[0].shape)
+
+    pond_pixels = []
+    for entry in index_cache[grid_key]:
+        if entry is None:
+            pond_pixels.append(None)
+            continue
+        rows, cols, inside = entry
+        pond_pixels.append(tuple(array[rows, cols][inside] for array in arrays))
+    return pond_pixels
+
+def _year_stats(images, ponds, aoi_gdf, indices, accumulators, covered_ponds, read_kwargs, geometry_cache,
+                index_cache):
+    """
+    Median of each index for some ponds over the images of one year.
+
+    Only images covering at least one of ``ponds`` are read, and each of them
+    only once for the union of the bands of ``indices``. The pixels of all
+    covered ponds are concatenated, so every index is evaluated in one
+    vectorized call per scene.
+
+    Returns:
+        tuple: ({index: {pond position: median}} for ponds with valid pixels,
+        number of scenes read, {index: {pond position: valid pixel count}})
+    """
+    ponds = set(ponds)
+    bands = index_bands(indices)
+    if covered_ponds is not None:
+        images = [item for item in images if ponds & covered_ponds.get(item.id, set())]
+    for name in indices:
+        for i in ponds:
+            accumulators[name][i].clear()
+
+    scenes = read_scenes(images, aoi_gdf, bands, **read_kwargs)
+    for item, windows in zip(images, scenes):
+        if windows is None:
+            continue
+        pond_pixels = slice_pond_pixels(item, windows, aoi_gdf, geometry_cache, index_cache)
+        covered = ponds if covered_ponds is None else ponds & covered_ponds.get(item.id, set())
+        order = [i for i in sorted(covered) if pond_pixels[i] is not None]
+        if not order:
+            continue
+
+        columns = {band: np.concatenate([pond_pixels[i][k] for i in order]) for k, band in enumerate(bands)}
+        splits = np.cumsum([pond_pixels[i][0].size for i in order])[:-1]
+        scaling = reflectance_scaling(item)
+        for name in indices:
+            # Compute the index for all ponds at once, the accumulators keep only valid values
+            values = INDICES[name][1](columns, *scaling)
+            for i, pond_values in zip(order, np.split(values, splits)):
+                accumulators[name][i].add(pond_values)
+
+    # Only scenes whose bands were all read over the farm count as read
+    scenes_read = sum(1 for windows in scenes if windows is not None)
+    medians = {name: {i: accumulators[name][i].median() for i in ponds if len(accumulators[name][i])} for name in indices}
+    pixels = {name: {i: len(accumulators[name][i]) for i in ponds} for name in indices}
+    return medians, scenes_read, pixels
+
+def process_nwi(selected_items_by_year, aoi_gdf, max_workers=None, timeout=None, approximate_median=False,
+                signer=None, chip_cache=None, covered_ponds=None, mode="full", indices=(), plan=None):
     """
     Process NWI for selected images and determine the first year when NWI >= 1 for each pond.
+
+    Scenes are processed for the whole farm at once: every band is read once
+    per scene and the pixels of each pond are sliced from that window. The
+    bands of all scenes of a year are fetched concurrently. Valid pixels of
+    each pond are collected in a reusable float32 accumulator.
+
+    Years are always walked in chronological order. ``mode`` controls how many:
+
+    - "full": the median of every year, for every pond.
+    - "early_exit": a pond is dropped after its first qualifying year, and the
+      walk stops once every pond is resolved.
+    - "bisect": assumes a pond stays a pond once it appears and bisects the
+      years of each pond, reading O(log years) years. Ponds probing the same
+      year share its scene reads.
+
+    In the last two modes 'median_nwi' holds only the years that were read.
+    The number of scenes read is reported in ``df.attrs["scenes_read"]``, the
+    valid pixels accumulated per pond in ``df.attrs["pond_pixels"]`` and their
+    total in ``df.attrs["pixels"]``.
+
+    Other ``indices`` from INDICES are evaluated on the same band reads and
+    add a 'median_<index>' column for each; a scene then needs every band of
+    every index.
     
     Args:
         selected_items_by_year (dict): Dictionary with years as keys and image metadata as values.
         aoi_gdf (GeoDataFrame): GeoDataFrame containing pond polygons with 'pond_id'.
+        max_workers (int, optional): Maximum band reads in flight.
+        timeout (float, optional): Per-request HTTP timeout in seconds.
+        approximate_median (bool): Use a bounded-memory quantile sketch instead
+            of the exact median (see ``pixel_accumulator.QuantileSketch``).
+        signer (SigningCache, optional): Token cache. Defaults to the process-wide cache.
+        chip_cache (ChipCache, optional): Chip cache. Defaults to the process-wide cache.
+        covered_ponds (dict, optional): {item id: set of pond positions}; when given, an
+            image only contributes to the ponds listed for it.
+        mode (str): "full", "early_exit" or "bisect".
+        indices (tuple): Extra indices computed alongside NWI, e.g. ("ndwi", "mndwi").
+        plan (FetchPlan, optional): Shared chips of the run (see ``fetch_plan``).
 
     Returns:
-        DataFrame: Contains 'pond_id', 'nwi_first_year', 'median_nwi'.
+        DataFrame: Contains 'pond_id', 'nwi_first_year', 'median_nwi' and 'median_<index>'
+        for each extra index.
     """
-    nwi_results = []
+    if mode not in NWI_MODES:
+        raise ValueError(f"Unknown NWI mode '{mode}', use one of {list(NWI_MODES)}.")
+
+    indices = ("nwi",) + tuple(name for name in indices if name != "nwi")
+    index_bands(indices)  # Fails early on unknown indices
+    pond_ids = aoi_gdf["pond_id"].tolist()
+    first_nwi_above_1_years = [None] * len(pond_ids)
+    yearly_medians = {name: [{} for _ in pond_ids] for name in indices}
+    accumulators = {name: [make_accumulator(approximate_median) for _ in pond_ids] for name in indices}
+    geometry_cache, index_cache = {}, {}
+    read_kwargs = {
+        "max_workers": max_workers, "timeout": timeout, "signer": signer, "chip_cache": chip_cache, "plan": plan,
+    }
+    years = sorted(selected_items_by_year)
+    scenes_read = 0
+    pond_pixels = [0] * len(pond_ids)
+
+    def evaluate(year, ponds):
+        nonlocal scenes_read
+        medians, read, pixels = _year_stats(
+            selected_items_by_year[year], ponds, aoi_gdf, indices, accumulators, covered_ponds,
+            read_kwargs, geometry_cache, index_cache,
+        )
+        scenes_read += read
+        for i, count in pixels["nwi"].items():
+            pond_pixels[i] += count
+        for name in indices:
+            for i, median in medians[name].items():
+                yearly_medians[name][i][year] = median
+        return medians["nwi"]
 
-    for _, pond in aoi_gdf.iterrows():
-        pond_id = pond["pond_id"]
-        pond_geom = pond["geometry"]
+    if mode == "bisect":
+        # Years in which each pond is covered by at least one image
+        year_ponds = {}
+        for year in years:
+            if covered_ponds is None:
+                year_ponds[year] = set(range(len(pond_ids))) if selected_items_by_year[year] else set()
+            else:
+                year_ponds[year] = set().union(
+                    *(covered_ponds.get(item.id, set()) for item in selected_items_by_year[year])
+                )
+        candidates = [[year for year in years if i in year_ponds[year]] for i in range(len(pond_ids))]
+        lo = [0] * len(pond_ids)
+        hi = [len(years_i) for years_i in candidates]
+
+        while True:
+            probes = {}
+            for i in range(len(pond_ids)):
+                if lo[i] < hi[i]:
+                    probes.setdefault(candidates[i][(lo[i] + hi[i]) // 2], []).append(i)
+            if not probes:
+                break
+            for year in sorted(probes):
+                medians = evaluate(year, probes[year])
+                for i in probes[year]:
+                    mid = (lo[i] + hi[i]) // 2
+                    if i not in medians:
+                        # No valid pixels this year: drop it and probe again
+                        del candidates[i][mid]
+                        hi[i] -= 1
+                    elif medians[i] >= NWI_THRESHOLD:
+                        hi[i] = mid
+                    else:
+                        lo[i] = mid + 1
+
+        for i, years_i in enumerate(candidates):
+            if lo[i] < len(years_i):
+                first_nwi_above_1_years[i] = years_i[lo[i]]
+    else:
+        unresolved = set(range(len(pond_ids)))
+        for year in years:
+            ponds = unresolved if mode == "early_exit" else range(len(pond_ids))
+            if not ponds:
+                break
+            for i, nwi_median in evaluate(year, ponds).items():
+                if first_nwi_above_1_years[i] is None and nwi_median >= NWI_THRESHOLD:
+                    first_nwi_above_1_years[i] = year
+                    unresolved.discard(i)
+
+    nwi_results = []
+    for i, (pond_id, first_year) in enumerate(zip(pond_ids, first_nwi_above_1_years)):
+        # Store results for this pond
+        result = {
+            "pond_id": pond_id,
+            "nwi_first_year": first_year if first_year is not None else np.nan,
+        }
+        for name in indices:
+            result[f"median_{name}"] = yearly_medians[name][i] or None
+        nwi_results.append(result)
 
-        first_nwi_above_1_year = None
-        yearly_nwi_medians = {}
+    nwi_df = pd.DataFrame(nwi_results, columns=["pond_id", "nwi_first_year"] + [f"median_{name}" for name in indices])
+    # Always float, so frames of different pond sets (e.g. a farm and its batch cluster) have the same dtypes
+    nwi_df["nwi_first_year"] = nwi_df["nwi_first_year"].astype("float64")
+    nwi_df.attrs["scenes_read"] = scenes_read
+    nwi_df.attrs["pond_pixels"] = pond_pixels
+    nwi_df.attrs["pixels"] = sum(pond_pixels)
+    return nwi_df
 
-        for year, images in selected_items_by_year.items():
-            yearly_nwi = []
+def process_indices(selected_items_by_year, aoi_gdf, indices=("nwi", "ndwi", "mndwi", "awei_nsh"), max_workers=None,
+                    timeout=None, approximate_median=False, signer=None, chip_cache=None, covered_ponds=None,
+                    plan=None):
+    """
+    Yearly statistics of several water indices per pond, from one read per band and scene.
 
-            for item in images:
-                try:
-                    # Get signed asset URLs
-                    blue_band = planetary_computer.sign(item.assets['blue'].href)
-                    nir_band = planetary_computer.sign(item.assets['nir08'].href)
-                    swir16_band = planetary_computer.sign(item.assets['swir16'].href)
-                    swir22_band = planetary_computer.sign(item.assets['swir22'].href)
-                except KeyError:
-                    continue  # Skip if any required band is missing
+    The union of the bands of ``indices`` is read once per scene and year, and
+    every index is evaluated on those pixels, so each extra index costs CPU
+    time but no I/O.
 
-                # Read raster data
-                with rasterio.open(blue_band) as blue_src, \
-                     rasterio.open(nir_band) as nir_src, \
-                     rasterio.open(swir16_band) as swir16_src, \
-                     rasterio.open(swir22_band) as swir22_src:
+    Args:
+        selected_items_by_year (dict): Dictionary with years as keys and image metadata as values.
+        aoi_gdf (GeoDataFrame): GeoDataFrame containing pond polygons with 'pond_id'.
+        indices (tuple): Names from INDICES.
+        max_workers (int, optional): Maximum band reads in flight.
+        timeout (float, optional): Per-request HTTP timeout in seconds.
+        approximate_median (bool): Use a bounded-memory quantile sketch instead of the exact median.
+        signer (SigningCache, optional): Token cache. Defaults to the process-wide cache.
+        chip_cache (ChipCache, optional): Chip cache. Defaults to the process-wide cache.
+        covered_ponds (dict, optional): {item id: set of pond positions}; when given, an
+            image only contributes to the ponds listed for it.
+        plan (FetchPlan, optional): Shared chips of the run.
 
-                    pond_geom_rep = gpd.GeoSeries([pond_geom], crs=aoi_gdf.crs).to_crs(blue_src.crs)
+    Returns:
+        DataFrame: One row per pond and year with 'pond_id', 'year' and, per index,
+        its median ('<index>', NaN without valid pixels) and '<index>_pixels'.
+    """
+    indices = tuple(indices)
+    index_bands(indices)
+    pond_ids = aoi_gdf["pond_id"].tolist()
+    accumulators = {name: [make_accumulator(approximate_median) for _ in pond_ids] for name in indices}
+    read_kwargs = {
+        "max_workers": max_workers, "timeout": timeout, "signer": signer, "chip_cache": chip_cache, "plan": plan,
+    }
+    geometry_cache, index_cache = {}, {}
+    scenes_read = 0
 
-                    blue, _ = mask(blue_src, pond_geom_rep.geometry, crop=True)
-                    nir, _ = mask(nir_src, pond_geom_rep.geometry, crop=True)
-                    swir16, _ = mask(swir16_src, pond_geom_rep.geometry, crop=True)
-                    swir22, _ = mask(swir22_src, pond_geom_rep.geometry, crop=True)
+    rows = []
+    for year in sorted(selected_items_by_year):
+        medians, read, pixels = _year_stats(
+            selected_items_by_year[year], range(len(pond_ids)), aoi_gdf, indices, accumulators,
+            covered_ponds, read_kwargs, geometry_cache, index_cache,
+        )
+        scenes_read += read
+        for i, pond_id in enumerate(pond_ids):
+            row = {"pond_id": pond_id, "year": year}
+            for name in indices:
+                row[name] = medians[name].get(i, np.nan)
+                row[f"{name}_pixels"] = pixels[name][i]
+            rows.append(row)
 
-                    # Compute NWI
-                    nwi = calculate_nwi(blue, nir, swir16, swir22)
+    columns = ["pond_id", "year"] + [column for name in indices for column in (name, f"{name}_pixels")]
+    stats_df = pd.DataFrame(rows, columns=columns)
+    stats_df.attrs["scenes_read"] = scenes_read
+    return stats_df
 
-                    # Flatten and filter valid values
-                    valid_nwi = nwi.flatten()
-                    valid_nwi = valid_nwi[~np.isnan(valid_nwi)]
-                    yearly_nwi.extend(valid_nwi)
+def process_nwi_by_pond(pond_items, aoi_gdf, **kwargs):
+    """
+    Process NWI for a per-pond image index, reading each image once for all ponds it covers.
 
-            if yearly_nwi:
-                nwi_median = np.nanmedian(yearly_nwi)
-                yearly_nwi_medians[year] = nwi_median
+    Args:
+        pond_items (dict): {pond_id: {year: [items]}}, as returned by ``search_stac_images_by_pond``.
+        aoi_gdf (GeoDataFrame): GeoDataFrame containing pond polygons with 'pond_id'.
+        **kwargs: Passed on to ``process_nwi``.
 
-                if first_nwi_above_1_year is None and nwi_median >= 1:
-                    first_nwi_above_1_year = year
+    Returns:
+        DataFrame: Contains 'pond_id', 'nwi_first_year', 'median_nwi'.
+    """
+    positions = {pond_id: i for i, pond_id in enumerate(aoi_gdf["pond_id"])}
 
-        # Store results for this pond
-        nwi_results.append({
-            "pond_id": pond_id,
-            "nwi_first_year": first_nwi_above_1_year if first_nwi_above_1_year is not None else np.nan,
-            "median_nwi": yearly_nwi_medians if yearly_nwi_medians else None
-        })
+    items_by_year, covered_ponds = {}, {}
+    for pond_id, years in pond_items.items():
+        for year, items in years.items():
+            for item in items:
+                if item.id not in covered_ponds:
+                    covered_ponds[item.id] = set()
+                    items_by_year.setdefault(year, []).append(item)
+                covered_ponds[item.id].add(positions[pond_id])
 
-    return pd.DataFrame(nwi_results)
+    return process_nwi(items_by_year, aoi_gdf, covered_ponds=covered_ponds, **kwargs)
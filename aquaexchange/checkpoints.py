@@ -0,0 +1,131 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from .utils import CACHE_DIR
+from .metrics import metrics
+
+# Root of the per-farm checkpoint directories
+CHECKPOINT_DIR = os.getenv("AQUAEXCHANGE_CHECKPOINT_DIR", os.path.join(CACHE_DIR, "checkpoints"))
+
+# Bump when a stage changes what it computes, to invalidate old checkpoints
+CHECKPOINT_VERSION = 3
+
+# Superseded checkpoints are deleted once unused for this many seconds. Runs
+# of the same farm share a directory, so a file that was just written or
+# reused may still be read by a concurrent run and is never pruned right away.
+PRUNE_AFTER = 24 * 3600
+
+# Pipeline stages, in execution order
+STAGES = ("geojson", "buffer", "search", "nwi", "lulc", "imagery", "upload", "combine")
+
+def digest(value):
+    """SHA-256 of a picklable value, used as its content fingerprint."""
+    return hashlib.sha256(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+class Checkpointer:
+    """
+    Records the output of each pipeline stage under a hash of its inputs and parameters.
+
+    A stage's key combines its name, its parameters and the content digests
+    of the upstream outputs it reads. On a re-run, a stage whose key already
+    has a checkpoint is loaded instead of recomputed. A recomputed stage that
+    produces different output changes the keys of everything downstream, so
+    a run resumes at the first stage whose inputs changed.
+
+    Superseded checkpoints of a stage are deleted once they have not been
+    written or reused for PRUNE_AFTER seconds, so concurrent runs of the same
+    farm never lose a file they are about to read. Without a directory
+    nothing is stored and every stage is computed.
+
+    Args:
+        directory (str, optional): Checkpoint directory, usually one per farm.
+        force_stages (iterable): Stages to recompute even if a checkpoint exists.
+    """
+
+    def __init__(self, directory=None, force_stages=()):
+        unknown = set(force_stages) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stage(s) {sorted(unknown)}, use one of {list(STAGES)}.")
+        self.directory = directory
+        self.force_stages = set(force_stages)
+        self.digests = {}
+        self.report = {}
+
+    @classmethod
+    def for_farm(cls, farm_id, root=None, force_stages=()):
+        """Checkpointer storing under ``<root>/<farm_id>``; root defaults to CHECKPOINT_DIR."""
+        root = CHECKPOINT_DIR if root is None else root
+        return cls(os.path.join(root, str(farm_id)), force_stages)
+
+    def key(self, stage, depends=(), params=None):
+        payload = {
+            "version": CHECKPOINT_VERSION,
+            "stage": stage,
+            "inputs": {name: self.digests[name] for name in depends},
+            "params": params,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def run(self, stage, fn, depends=(), params=None):
+        """
+        Returns the output of a stage, from its checkpoint if the inputs are unchanged.
+
+        Args:
+            stage (str): One of STAGES.
+            fn (callable): Computes the output; called without arguments.
+            depends (iterable): Upstream stages whose output the stage reads.
+            params (dict, optional): JSON-serialisable parameters of the stage.
+
+        Returns:
+            The stage output.
+        """
+        key = self.key(stage, depends, params)
+        path = os.path.join(self.directory, f"{stage}-{key[:24]}.pkl") if self.directory else None
+
+        loaded = False
+        if path and stage not in self.force_stages:
+            try:
+                with open(path, "rb") as f:
+                    output, output_digest = pickle.load(f)
+                os.utime(path)  # Marks the checkpoint as in use for the pruning
+                loaded = True
+            except FileNotFoundError:
+                pass
+
+        if loaded:
+            self.report[stage] = "reused"
+            metrics.increment("checkpoints_reused")
+        else:
+            with metrics.stage(stage):
+                output = fn()
+            output_digest = digest(output)
+            if path:
+                self._store(stage, path, output, output_digest)
+            self.report[stage] = "recomputed"
+
+        self.digests[stage] = output_digest
+        return output
+
+    def _store(self, stage, path, output, output_digest):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a temporary file first so an interrupted run never leaves a partial checkpoint
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((output, output_digest), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        cutoff = time.time() - PRUNE_AFTER
+        for old_path in glob.glob(os.path.join(self.directory, f"{stage}-*.pkl")):
+            try:
+                if old_path != path and os.path.getmtime(old_path) < cutoff:
+                    os.remove(old_path)
+            except FileNotFoundError:
+                pass  # Already pruned by a concurrent run
+
+    def summary(self):
+        """One line per executed stage: 'stage: reused' or 'stage: recomputed'."""
+        return "\n".join(f"{stage}: {self.report[stage]}" for stage in STAGES if stage in self.report)
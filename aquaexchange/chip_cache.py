@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+import numpy as np
+from rasterio.crs import CRS
+from rasterio.transform import Affine
+from .utils import CACHE_DIR
+from .metrics import metrics
+
+# Disk budget for cached chips in bytes; 0 disables the default cache
+CHIP_CACHE_BYTES = int(os.getenv("AQUAEXCHANGE_CHIP_CACHE_BYTES", str(2 * 1024 ** 3)))
+
+def strip_query(href):
+    """Removes the query string (SAS token) from an asset URL."""
+    return urlunsplit(urlsplit(href)._replace(query=""))
+
+class ChipCache:
+    """
+    Local read-through cache of band chips extracted from remote rasters.
+
+    Chips are keyed by (asset href without SAS query, window, resolution) and
+    stored as ``.npy`` files that are memory-mapped on read, with their
+    transform and CRS in a JSON sidecar. The directory is scanned once, when
+    the cache is created; after that an in-memory LRU index of chip sizes is
+    kept up to date by reads and writes, and the least recently used chips
+    (array and sidecar together) are evicted once it exceeds ``max_bytes``.
+
+    Args:
+        directory (str, optional): Cache directory. Defaults to CACHE_DIR/chips.
+        max_bytes (int, optional): Disk budget. Defaults to CHIP_CACHE_BYTES.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = os.path.join(CACHE_DIR, "chips") if directory is None else directory
+        self.max_bytes = CHIP_CACHE_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._index, self._total = self._scan()
+
+    def _scan(self):
+        # Existing chips, least recently used first, with the size of array and sidecar
+        chips = {}
+        for entry in os.scandir(self.directory):
+            key, ext = os.path.splitext(entry.name)
+            if ext not in (".npy", ".json"):
+                continue
+            stat = entry.stat()
+            mtime, size = chips.get(key, (0.0, 0))
+            chips[key] = (max(mtime, stat.st_mtime), size + stat.st_size)
+        index = OrderedDict((key, size) for key, (_, size) in sorted(chips.items(), key=lambda c: c[1][0]))
+        return index, sum(index.values())
+
+    def key(self, href, window, resolution=None):
+        """
+        Cache key of a chip.
+
+        Args:
+            href (str): Asset URL, signed or not.
+            window: JSON-serializable description of the area read.
+            resolution: JSON-serializable output resolution, None for native.
+        """
+        payload = json.dumps([strip_query(href), window, resolution], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + ".npy", base + ".json"
+
+    def get(self, key):
+        """
+        Returns a cached chip as (memory-mapped array, transform, crs), a cached
+        empty result as None, or raises KeyError if the chip is not cached.
+        """
+        array_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            os.utime(meta_path)
+            chip = None
+            if not meta.get("empty"):
+                array = np.load(array_path, mmap_mode="r")
+                os.utime(array_path)
+                chip = array, Affine(*meta["transform"]), CRS.from_wkt(meta["crs"])
+        except (FileNotFoundError, ValueError) as e:
+            raise KeyError(key) from e
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+        return chip
+
+    def put(self, key, chip):
+        """
+        Stores a chip ((array, transform, crs) or None for an empty read) and
+        evicts old chips if the budget is exceeded.
+        """
+        array_path, meta_path = self._paths(key)
+        size = 0
+        if chip is None:
+            meta = {"empty": True}
+        else:
+            array, transform, crs = chip
+            size += self._write(array_path, lambda f: np.save(f, np.ascontiguousarray(array)))
+            meta = {"transform": list(transform)[:6], "crs": crs.to_wkt()}
+        # The sidecar is written last: a chip is visible only once complete
+        size += self._write(meta_path, lambda f: f.write(json.dumps(meta).encode()))
+        with self._lock:
+            self._total += size - self._index.pop(key, 0)
+            self._index[key] = size
+        self.evict()
+
+    def _write(self, path, write_fn):
+        # Returns the number of bytes written
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            write_fn(f)
+            size = f.tell()
+        os.replace(tmp_path, path)
+        return size
+
+    def read(self, href, window, read_fn, resolution=None):
+        """
+        Returns the chip for (href, window, resolution), calling ``read_fn()`` on a miss.
+
+        ``read_fn`` must return (array, transform, crs) or None.
+        """
+        key = self.key(href, window, resolution)
+        try:
+            chip = self.get(key)
+            with self._lock:
+                self.hits += 1
+            metrics.increment("chip_cache_hits")
+            return chip
+        except KeyError:
+            pass
+
+        with self._lock:
+            self.misses += 1
+        metrics.increment("chip_cache_misses")
+        chip = read_fn()
+        self.put(key, chip)
+        return chip
+
+    def evict(self):
+        """Deletes least recently used chips until the cache fits ``max_bytes``."""
+        with self._lock:
+            while self._total > self.max_bytes and self._index:
+                key, size = self._index.popitem(last=False)
+                self._total -= size
+                # Sidecar first, so the chip stops being visible before its array goes
+                for path in reversed(self._paths(key)):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def stats(self):
+        """Returns {'hits': ..., 'misses': ...}."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def default_chip_cache():
+    """Returns the process-wide chip cache, or None if CHIP_CACHE_BYTES is 0."""
+    global _default_cache
+    if CHIP_CACHE_BYTES <= 0:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ChipCache()
+        return _default_cache
+
+def cached_read(href, window, read_fn, resolution=None, chip_cache=None):
+    """
+    Reads a chip through ``chip_cache`` (or the process-wide cache).
+
+    Args:
+        href (str): Unsigned asset URL.
+        window: JSON-serializable description of the area read.
+        read_fn (callable): Performs the remote read on a miss.
+        resolution: JSON-serializable output resolution, None for native.
+        chip_cache (ChipCache, optional): Cache to use.
+
+    Returns:
+        tuple or None: (array, transform, crs) as returned by ``read_fn``.
+    """
+    cache = default_chip_cache() if chip_cache is None else chip_cache
+    if cache is None:
+        return read_fn()
+    return cache.read(href, window, read_fn, resolution)
@@ -1,14 +1,42 @@
 import json
+import logging
 import os
+import pandas as pd
 
 DATA_DIR = "data"
 
-def combine_json_outputs():
-    """Merge the JSON outputs from main_1.py and main_2.py into a single structured response."""
+logger = logging.getLogger(__name__)
+
+def combine_results(initial_results, satellite_results):
+    """
+    Merges the outputs of main_1 and main_2 into a single structured response.
+
+    Args:
+        initial_results (dict): Output of ``process_initial_data``.
+        satellite_results (dict): Output of ``process_farm_data``.
+
+    Returns:
+        dict: Contains 'farmid', 'noofponds', 'ponds', 'Images' and 'Thumbnails'.
+    """
+    return {
+        "farmid": initial_results.get("farmid", "Unknown"),
+        "noofponds": initial_results.get("noofponds", 0),
+        "ponds": initial_results.get("ponds", []),
+        # main_2 writes its URLs under 'images' and 'thumbnails'
+        "Images": satellite_results.get("Images", satellite_results.get("images", [])),
+        "Thumbnails": satellite_results.get("Thumbnails", satellite_results.get("thumbnails", []))
+    }
+
+def combine_json_outputs(data_dir=DATA_DIR):
+    """Merge the JSON outputs from main_1.py and main_2.py into a single structured response.
+
+    Args:
+        data_dir (str): Directory holding both outputs, usually a run workspace.
+    """
     
-    json1_path = os.path.join(DATA_DIR, "output_main_1.json")
-    json2_path = os.path.join(DATA_DIR, "output_main_2.json")
-    final_output_path = os.path.join(DATA_DIR, "final_output.json")
+    json1_path = os.path.join(data_dir, "output_main_1.json")
+    json2_path = os.path.join(data_dir, "output_main_2.json")
+    final_output_path = os.path.join(data_dir, "final_output.json")
 
     # Ensure both files exist before proceeding
     if not os.path.exists(json1_path) or not os.path.exists(json2_path):
@@ -19,18 +47,35 @@ def combine_json_outputs():
         data1 = json.load(f1)
         data2 = json.load(f2)
 
-    # Ensure 'Images' field exists in final output
-    final_output = {
-        "farmid": data1.get("farmid", "Unknown"),
-        "noofponds": data1.get("noofponds", 0),
-        "ponds": data1.get("ponds", []),
-        "Images": data2.get("Images", [])  # Assuming main_2 produces an 'Images' field
-    }
+    final_output = combine_results(data1, data2)
 
     # Save final merged JSON
     with open(final_output_path, "w") as f:
         json.dump(final_output, f, indent=4)
 
-    print(f"Final JSON output saved to {final_output_path}")
+    logger.info("Final JSON output saved to %s", final_output_path)
     return final_output
 
+
+def build_pond_records(nwi_df, lulc_df):
+    """
+    Builds the per-pond entries of the structured output.
+
+    Parameters:
+    - nwi_df (DataFrame): Output of process_nwi ('pond_id', 'nwi_first_year').
+    - lulc_df (DataFrame): Output of assign_previous_lulc_class ('pond_id', 'lulc_class').
+
+    Returns:
+    - list: One dict per pond with 'id', 'Probable Year of Change', 'Previous Class', 'Present Class'.
+    """
+    merged = nwi_df[["pond_id", "nwi_first_year"]].merge(lulc_df[["pond_id", "lulc_class"]], on="pond_id", how="left")
+
+    records = []
+    for pond_id, year, lulc_class in zip(merged["pond_id"], merged["nwi_first_year"], merged["lulc_class"]):
+        records.append({
+            "id": pond_id,
+            "Probable Year of Change": int(year) if pd.notna(year) else "no data",
+            "Previous Class": lulc_class if isinstance(lulc_class, str) else "no data",
+            "Present Class": "Pond"
+        })
+    return records
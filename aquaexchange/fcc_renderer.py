@@ -0,0 +1,144 @@
+from io import BytesIO
+import cv2
+import numpy as np
+
+# OpenCV extension and encoder parameters per output format
+IMAGE_FORMATS = {
+    "png": (".png", [cv2.IMWRITE_PNG_COMPRESSION, 3]),
+    "jpeg": (".jpg", [cv2.IMWRITE_JPEG_QUALITY, 90]),
+    "webp": (".webp", [cv2.IMWRITE_WEBP_QUALITY, 90]),
+}
+
+BOUNDARY_COLOR = (255, 255, 0)  # Yellow (RGB)
+TITLE_HEIGHT = 32
+
+def to_uint8(false_color):
+    """
+    Converts a float RGB composite in [0, 1] to uint8, NaNs becoming black.
+    """
+    image = np.nan_to_num(false_color, nan=0.0)
+    np.clip(image, 0.0, 1.0, out=image)
+    return (image * 255 + 0.5).astype(np.uint8)
+
+def _rings(geom):
+    if geom.geom_type == "Polygon":
+        return [geom.exterior, *geom.interiors]
+    if hasattr(geom, "geoms"):
+        return [ring for part in geom.geoms for ring in _rings(part)]
+    return [geom]  # Lines
+
+def draw_boundaries(image, geometries, transform, source_shape, color=BOUNDARY_COLOR, thickness=2):
+    """
+    Rasterizes geometry outlines onto an RGB image in place.
+
+    Args:
+        image (numpy array): uint8 RGB image, possibly resampled from the source grid.
+        geometries (iterable): Geometries in the CRS of ``transform``.
+        transform (Affine): Transform of the source grid.
+        source_shape (tuple): (height, width) of the source grid.
+        color (tuple): RGB line colour.
+        thickness (int): Line width in output pixels.
+    """
+    scale_x = image.shape[1] / source_shape[1]
+    scale_y = image.shape[0] / source_shape[0]
+    inverse = ~transform
+
+    polylines = []
+    for geom in geometries:
+        for ring in _rings(geom):
+            coords = np.asarray(ring.coords)[:, :2]
+            cols, rows = inverse * (coords[:, 0], coords[:, 1])
+            points = np.column_stack([np.asarray(cols) * scale_x, np.asarray(rows) * scale_y])
+            polylines.append(np.round(points).astype(np.int32))
+
+    cv2.polylines(image, polylines, isClosed=True, color=color, thickness=thickness, lineType=cv2.LINE_AA)
+
+def encode_image(image, image_format="png"):
+    """
+    Encodes a uint8 RGB image with OpenCV.
+
+    Args:
+        image (numpy array): uint8 RGB image.
+        image_format (str): "png", "jpeg" or "webp".
+
+    Returns:
+        bytes: Encoded image.
+    """
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format '{image_format}', use one of {sorted(IMAGE_FORMATS)}.")
+    extension, params = IMAGE_FORMATS[image_format]
+    ok, encoded = cv2.imencode(extension, cv2.cvtColor(image, cv2.COLOR_RGB2BGR), params)
+    if not ok:
+        raise ValueError(f"OpenCV could not encode the image as {image_format}.")
+    return encoded.tobytes()
+
+def resize_to(image, size):
+    """
+    Resizes an image so its longest side is ``size`` pixels, keeping the aspect ratio.
+    """
+    height, width = image.shape[:2]
+    factor = size / max(height, width)
+    new_size = (max(int(round(width * factor)), 1), max(int(round(height * factor)), 1))  # (width, height)
+    interpolation = cv2.INTER_AREA if factor < 1 else cv2.INTER_LINEAR
+    return cv2.resize(image, new_size, interpolation=interpolation)
+
+def render_fcc(false_color, transform, geometries, title=None, image_format="png", size=1024,
+               thumbnail_size=256):
+    """
+    Renders a false-colour composite with AOI outlines directly from the array.
+
+    Args:
+        false_color (numpy array): (height, width, 3) float composite in [0, 1].
+        transform (Affine): Transform of the grid the composite was read on.
+        geometries (iterable): AOI geometries in the CRS of ``transform``.
+        title (str, optional): Caption drawn above the image.
+        image_format (str): "png", "jpeg" or "webp".
+        size (int): Longest side of the full image in pixels.
+        thumbnail_size (int, optional): Longest side of the thumbnail; None for no thumbnail.
+
+    Returns:
+        tuple: (image bytes, thumbnail bytes or None)
+    """
+    source_shape = false_color.shape[:2]
+    image = resize_to(to_uint8(false_color), size)
+    draw_boundaries(image, geometries, transform, source_shape, thickness=max(size // 400, 1))
+
+    if title:
+        banner = np.full((TITLE_HEIGHT, image.shape[1], 3), 255, dtype=np.uint8)
+        cv2.putText(banner, title, (8, TITLE_HEIGHT - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1, cv2.LINE_AA)
+        image = np.vstack([banner, image])
+
+    thumbnail = None
+    if thumbnail_size:
+        thumbnail = encode_image(resize_to(image, thumbnail_size), image_format)
+    return encode_image(image, image_format), thumbnail
+
+def render_fcc_matplotlib(false_color, extent, boundary_gdf, title=None, dpi=300):
+    """
+    Renders a false-colour composite with matplotlib (8x8 inch figure saved as PNG).
+
+    Args:
+        false_color (numpy array): (height, width, 3) float composite in [0, 1].
+        extent (list): [minx, maxx, miny, maxy] of the composite.
+        boundary_gdf (GeoDataFrame): AOI whose boundary is drawn in yellow.
+        title (str, optional): Figure title.
+        dpi (int): Output DPI.
+
+    Returns:
+        bytes: PNG image.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 8))
+    ax.imshow(false_color, extent=extent)
+    boundary_gdf.boundary.plot(ax=ax, edgecolor="yellow", linewidth=2)
+    ax.set_xticks([]), ax.set_yticks([])
+    ax.set_xticklabels([]), ax.set_yticklabels([])
+    if title:
+        plt.title(title)
+
+    # Convert image to bytes
+    img_bytes_io = BytesIO()
+    fig.savefig(img_bytes_io, format="png", dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return img_bytes_io.getvalue()
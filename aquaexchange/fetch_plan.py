@@ -0,0 +1,262 @@
+import math
+import threading
+from rasterio.warp import transform_bounds
+from rasterio.windows import transform as window_transform
+from .calculate_indices import NWI_BANDS, read_band_window_cached, window_from_bounds
+from .satellite_imagery_processor import IMAGE_SIZE, buffered_aoi, select_fcc_scenes
+from .metrics import metrics
+
+# CRS in which the planned windows of an asset are compared and merged
+PLAN_CRS = "EPSG:4326"
+
+# Margin added around every planned window, in degrees (about 55 m, more than a
+# Landsat pixel), so reprojection rounding cannot leave a request outside its chip
+PLAN_PADDING = 0.0005
+
+def _overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+def _contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+def merge_windows(windows):
+    """
+    Merges overlapping windows until none overlap.
+
+    Args:
+        windows (list): (minx, miny, maxx, maxy, uses, native) tuples.
+
+    Returns:
+        list: Merged windows; ``uses`` are summed and ``native`` is True if any part was native.
+    """
+    merged = [list(window) for window in windows]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(len(merged) - 1, i, -1):
+                if _overlaps(merged[i], merged[j]):
+                    other = merged.pop(j)
+                    merged[i] = [
+                        min(merged[i][0], other[0]), min(merged[i][1], other[1]),
+                        max(merged[i][2], other[2]), max(merged[i][3], other[3]),
+                        merged[i][4] + other[4], merged[i][5] or other[5],
+                    ]
+                    changed = True
+    return [tuple(window) for window in merged]
+
+def crop_chip(chip, bounds, bounds_crs):
+    """
+    Cuts the pixels covering ``bounds`` out of an in-memory chip.
+
+    The chip lies on the source pixel grid, so the result is the window a
+    direct read of ``bounds`` would return.
+
+    Returns:
+        tuple or None: (array, transform, crs), or None if the bounds miss the chip.
+    """
+    array, transform, crs = chip
+    window = window_from_bounds(transform_bounds(bounds_crs, crs, *bounds), transform, *array.shape)
+    if window is None:
+        return None
+    return array[window.toslices()], window_transform(window, transform), crs
+
+def asset_gsd(item, href):
+    """Ground sample distance of the asset of ``item`` at ``href``, or None if not published."""
+    for asset in item.assets.values():
+        if asset.href == href:
+            return asset.extra_fields.get("gsd", item.properties.get("gsd"))
+    return item.properties.get("gsd")
+
+class FetchPlan:
+    """
+    Every band window a run will read, merged per asset and shared in memory.
+
+    Branches first declare what they will read (``add``, ``add_items``,
+    ``add_fcc_scenes``). Overlapping windows of the same asset are merged,
+    and an asset window requested more than once is read a single time at
+    native resolution, on first use, and kept in memory. Each request is then
+    cropped from it; a chip is released once all its planned requests were
+    served.
+
+    Only reads at native resolution are shared. Display reads join the plan
+    only when their window fits the display size at native resolution, which
+    is when a direct read returns native pixels too; larger ones keep their
+    own overview read. Windows requested only once are not held: ``read``
+    raises KeyError for them and the caller reads as usual.
+
+    The first request of a shared window fetches the whole merged window,
+    including the parts of requests that may never come (e.g. years skipped
+    by an early-exit NWI walk); such chips are not released early and stay in
+    memory until the plan is dropped.
+
+    Args:
+        signer (SigningCache, optional): Token cache for the shared reads.
+        chip_cache (ChipCache, optional): Disk chip cache the shared reads go through.
+        padding (float): Margin around each window, in PLAN_CRS units.
+    """
+
+    def __init__(self, signer=None, chip_cache=None, padding=PLAN_PADDING):
+        self.signer = signer
+        self.chip_cache = chip_cache
+        self.padding = padding
+        self._requests = {}
+        self._groups = None
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.hits = 0
+
+    def add(self, href, collection, bounds, bounds_crs, native=True):
+        """
+        Declares one window read.
+
+        Args:
+            href (str): Unsigned asset URL.
+            collection (str): Collection of the asset, used for signing.
+            bounds (tuple): (minx, miny, maxx, maxy) of the area to read.
+            bounds_crs: CRS of ``bounds``.
+            native (bool): Needed at native resolution; False for display-resolution reads.
+        """
+        minx, miny, maxx, maxy = transform_bounds(bounds_crs, PLAN_CRS, *bounds)
+        window = (minx - self.padding, miny - self.padding, maxx + self.padding, maxy + self.padding, 1, native)
+        with self._lock:
+            self._requests.setdefault(href, (collection, []))[1].append(window)
+            self._groups = None
+
+    def add_items(self, items, aoi_gdf, bands=NWI_BANDS):
+        """Declares the farm window of ``bands`` of every item, as read by ``read_scenes``."""
+        bounds = tuple(aoi_gdf.total_bounds)
+        for item in items:
+            if all(band in item.assets for band in bands):
+                for band in bands:
+                    self.add(item.assets[band].href, item.collection_id, bounds, aoi_gdf.crs)
+
+    def add_fcc_scenes(self, scenes, buffr_aoi_gdf, size=IMAGE_SIZE):
+        """
+        Declares the display-resolution reads of ``read_fcc_scenes``.
+
+        A read is declared native when its window, at the asset's ground sample
+        distance, is at most ``size`` pixels on its longest side; reads of
+        assets without a published ``gsd`` are never shared.
+
+        Args:
+            scenes (list): Scenes as returned by ``select_fcc_scenes``.
+            buffr_aoi_gdf (GeoDataFrame): Buffered box, in a metric (UTM) CRS.
+            size (int): Longest side of the display reads in pixels.
+        """
+        minx, miny, maxx, maxy = buffr_aoi_gdf.total_bounds
+        for item, bands, _ in scenes:
+            for href in bands.values():
+                gsd = asset_gsd(item, href)
+                # One extra pixel per side for windows not aligned with the grid
+                fits = gsd is not None and math.ceil(max(maxx - minx, maxy - miny) / gsd) + 1 <= size
+                self.add(href, item.collection_id, (minx, miny, maxx, maxy), buffr_aoi_gdf.crs, native=fits)
+
+    def add_imagery(self, ponds, buffer_size=1500, size=IMAGE_SIZE):
+        """Declares the display reads ``render_imagery`` makes for one farm's ponds."""
+        _, buffr_aoi_gdf = buffered_aoi(ponds, buffer_size)
+        self.add_fcc_scenes(select_fcc_scenes(buffr_aoi_gdf), buffr_aoi_gdf, size)
+
+    def _shared_groups(self):
+        # {href: [group]} of the merged windows worth sharing
+        if self._groups is None:
+            self._groups = {}
+            for href, (collection, windows) in self._requests.items():
+                # Display reads that need downsampling never join a shared window
+                for minx, miny, maxx, maxy, uses, _ in merge_windows([w for w in windows if w[5]]):
+                    if uses > 1:
+                        self._groups.setdefault(href, []).append({
+                            "collection": collection,
+                            "bounds": (minx, miny, maxx, maxy),
+                            "remaining": uses,
+                            "chip": None,
+                            "loaded": False,
+                            "lock": threading.Lock(),
+                        })
+        return self._groups
+
+    def shared_windows(self):
+        """Number of asset windows that will be read once and shared."""
+        with self._lock:
+            return sum(len(groups) for groups in self._shared_groups().values())
+
+    def read(self, href, bounds, bounds_crs, size=None):
+        """
+        Serves a planned window from memory, reading its merged chip on first use.
+
+        Args:
+            href (str): Unsigned asset URL.
+            bounds (tuple): (minx, miny, maxx, maxy) of the area to read.
+            bounds_crs: CRS of ``bounds``.
+            size (int, optional): Longest side of a display-resolution read.
+
+        Returns:
+            tuple or None: As ``read_band_window``, or as ``read_display_band`` with ``size``.
+
+        Raises:
+            KeyError: If the window is not shared by the plan, or, with ``size``,
+                if it is larger than ``size`` at native resolution.
+        """
+        request = transform_bounds(bounds_crs, PLAN_CRS, *bounds)
+        with self._lock:
+            group = next(
+                (group for group in self._shared_groups().get(href, []) if _contains(group["bounds"], request)),
+                None,
+            )
+        if group is None:
+            raise KeyError(href)
+
+        with group["lock"]:
+            if group["loaded"]:
+                with self._lock:
+                    self.hits += 1
+                metrics.increment("shared_chip_hits")
+            else:
+                group["chip"] = read_band_window_cached(
+                    href, group["collection"], group["bounds"], PLAN_CRS, self.signer, self.chip_cache,
+                )
+                group["loaded"] = True
+                with self._lock:
+                    self.reads += 1
+                metrics.increment("shared_chip_reads")
+            result = None if group["chip"] is None else crop_chip(group["chip"], bounds, bounds_crs)
+            # A request counts as served even when it falls back, so the chip is still released
+            group["remaining"] -= 1
+            if group["remaining"] <= 0:
+                # All planned requests served: free the chip, later reads go the usual way
+                with self._lock:
+                    groups = self._shared_groups().get(href, [])
+                    if group in groups:
+                        groups.remove(group)
+                group["chip"] = None
+        if size is not None and result is not None and max(result[0].shape) > size:
+            raise KeyError(href)  # Would need downsampling: the overview read is used instead
+        return result
+
+    def stats(self):
+        """Returns {'reads': ..., 'hits': ...}: shared chips read and requests served from memory."""
+        with self._lock:
+            return {"reads": self.reads, "hits": self.hits}
+
+def plan_farm_reads(ponds, buffered, items, bands=NWI_BANDS, buffer_size=1500, image_size=IMAGE_SIZE,
+                    signer=None, chip_cache=None):
+    """
+    Plans the band reads of the NWI and imagery branches of one farm.
+
+    Args:
+        ponds (GeoDataFrame): Ponds; the imagery box is built around them.
+        buffered (GeoDataFrame): Buffered ponds the NWI reads cover.
+        items (list): Scenes the NWI branch may read.
+        bands (tuple): Asset keys read by the NWI branch.
+        buffer_size (int): Imagery buffer around the ponds, in meters.
+        image_size (int): Longest side of the imagery display reads in pixels.
+        signer (SigningCache, optional): Token cache.
+        chip_cache (ChipCache, optional): Disk chip cache.
+
+    Returns:
+        FetchPlan: Plan to pass as ``plan`` to ``process_nwi`` and ``process_satellite_imagery``.
+    """
+    plan = FetchPlan(signer, chip_cache)
+    plan.add_items(items, buffered, bands)
+    plan.add_imagery(ponds, buffer_size, image_size)
+    return plan
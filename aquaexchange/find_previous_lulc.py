@@ -1,30 +1,233 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
 import geopandas as gpd
 import pandas as pd
 import rasterio
+from rasterio.crs import CRS
+from rasterio.transform import Affine
+import shapely
 import xml.etree.ElementTree as ET
 import numpy as np
+from .calculate_indices import pond_pixel_index
+from .utils import CACHE_DIR, to_geodataframe
 
-LULC_FILES = {1999: "data/lulc_with_labels_1999.tif"}
+# LULC epochs; defaults to the data directory shipped with the package, not the working directory
+LULC_DIR = os.getenv("AQUAEXCHANGE_LULC_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+LULC_FILE_PATTERN = re.compile(r"^lulc_with_labels_(\d{4})\.tif$")
 
 def parse_lulc_labels(xml_file):
     tree = ET.parse(xml_file)
     root = tree.getroot()
     return {row[0].text.strip(): row[1].text.strip() for row in root.findall(".//GDALRasterAttributeTable/Row")}
 
-def get_previous_lulc_year(nwi_first_year):
-    return next((y for y in sorted(LULC_FILES.keys(), reverse=True) if y < nwi_first_year), None) if nwi_first_year else None
+class LulcRegistry:
+    """
+    All LULC epochs found in a directory, loaded once and shared.
 
-def get_lulc_class(geom, lulc_year, class_mapping):
-    if lulc_year not in LULC_FILES:
+    Every ``lulc_with_labels_<year>.tif`` (with its ``.tif.aux.xml`` label
+    table) in ``directory`` is an epoch. Year lookups use a bisect index. The
+    band of an epoch is decoded once into a ``.npy`` file under ``cache_dir``
+    and memory-mapped, so worker processes share the same pages instead of
+    each holding a copy. Parsed label tables are cached. The registry can be
+    pickled to worker processes; they re-open the memory maps lazily.
+
+    Args:
+        directory (str): Directory holding the LULC rasters.
+        cache_dir (str, optional): Where decoded bands are kept. Defaults to CACHE_DIR/lulc.
+    """
+
+    def __init__(self, directory=LULC_DIR, cache_dir=None):
+        self.directory = directory
+        self.cache_dir = os.path.join(CACHE_DIR, "lulc") if cache_dir is None else cache_dir
+        self.files = {}
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                match = LULC_FILE_PATTERN.match(name)
+                if match:
+                    self.files[int(match.group(1))] = os.path.join(directory, name)
+        self.years = sorted(self.files)
+        self._bands = {}
+        self._labels = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_bands"], state["_lock"] = {}, None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def previous_year(self, nwi_first_year):
+        """Latest epoch strictly before ``nwi_first_year``, or None."""
+        if not nwi_first_year:
+            return None
+        i = bisect.bisect_left(self.years, nwi_first_year)
+        return self.years[i - 1] if i else None
+
+    def labels(self, year):
+        """Parsed class table {value: class name} of an epoch, {} if it has none."""
+        with self._lock:
+            if year not in self._labels:
+                xml_file = self.files[year] + ".aux.xml"
+                self._labels[year] = parse_lulc_labels(xml_file) if os.path.exists(xml_file) else {}
+            return self._labels[year]
+
+    def band(self, year):
+        """
+        First band of an epoch as (memory-mapped array, transform, crs).
+        """
+        with self._lock:
+            if year not in self._bands:
+                self._bands[year] = self._load_band(self.files[year])
+            return self._bands[year]
+
+    def _load_band(self, path):
+        stat = os.stat(path)
+        key = hashlib.sha256(f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()
+        array_path = os.path.join(self.cache_dir, f"{key}.npy")
+        meta_path = os.path.join(self.cache_dir, f"{key}.json")
+
+        if not os.path.exists(meta_path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with rasterio.open(path) as src:
+                array = src.read(1)
+                meta = {"transform": list(src.transform)[:6], "crs": src.crs.to_wkt()}
+            # Write to temporary files first so concurrent workers never see partial files
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, array_path)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, meta_path)
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        return np.load(array_path, mmap_mode="r"), Affine(*meta["transform"]), CRS.from_wkt(meta["crs"])
+
+_registries = {}
+
+def get_registry(directory=LULC_DIR):
+    """Returns the process-wide registry for ``directory``."""
+    if directory not in _registries:
+        _registries[directory] = LulcRegistry(directory)
+    return _registries[directory]
+
+def get_previous_lulc_year(nwi_first_year, registry=None):
+    registry = get_registry() if registry is None else registry
+    return registry.previous_year(nwi_first_year)
+
+def get_lulc_class(geom, lulc_year, class_mapping, registry=None):
+    registry = get_registry() if registry is None else registry
+    if lulc_year not in registry.files:
         return None, None
-    with rasterio.open(LULC_FILES[lulc_year]) as src:
-        raster_value = next(src.sample([(geom.centroid.x, geom.centroid.y)]))[0]
-        return (int(raster_value), class_mapping.get(str(int(raster_value)), "Unknown Class")) if raster_value else (None, None)
+    band, transform, _ = registry.band(lulc_year)
+    raster_value = sample_points(band, transform, np.array([geom.centroid.x]), np.array([geom.centroid.y]))[0]
+    return (int(raster_value), class_mapping.get(str(int(raster_value)), "Unknown Class")) if raster_value else (None, None)
+
+def sample_points(band, transform, xs, ys):
+    """
+    Samples an in-memory band at many points at once.
+
+    Args:
+        band (numpy array): 2-D band.
+        transform (Affine): Transform of the band.
+        xs, ys (numpy array): Point coordinates in the band CRS.
+
+    Returns:
+        numpy array: Pixel value per point, 0 for points outside the band.
+    """
+    rows, cols = rasterio.transform.rowcol(transform, xs, ys)
+    rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+    values = np.zeros(len(rows), dtype=band.dtype)
+
+    inside = (rows >= 0) & (rows < band.shape[0]) & (cols >= 0) & (cols < band.shape[1])
+    values[inside] = band[rows[inside], cols[inside]]
+    return values
+
+def zonal_majority(band, transform, geometries):
+    """
+    Most frequent non-zero value of an in-memory band inside each geometry.
+
+    Args:
+        band (numpy array): 2-D band.
+        transform (Affine): Transform of the band.
+        geometries (list): Polygons in the band CRS.
+
+    Returns:
+        numpy array: Majority value per geometry, 0 if it covers no labelled pixel.
+    """
+    index = pond_pixel_index(geometries, transform, band.shape)
+    values = np.zeros(len(geometries), dtype=np.int64)
+    for i, entry in enumerate(index):
+        if entry is None:
+            continue
+        rows, cols, inside = entry
+        pixels = band[rows, cols][inside]
+        counts = np.bincount(pixels[pixels > 0].astype(np.int64))
+        if counts.size:
+            values[i] = counts.argmax()
+    return values
+
+def assign_previous_lulc_class(ponds_geojson, nwi_df, xml_file=None, zonal=False, registry=None):
+    """
+    Assigns each pond the LULC class of the latest epoch before its NWI change year.
+
+    Ponds are grouped by LULC epoch and all pond centroids of an epoch are
+    sampled at once from its memory-mapped band, so adding epochs adds no
+    per-pond I/O.
+
+    Args:
+        ponds_geojson (str | GeoDataFrame): Pond GeoJSON path or GeoDataFrame.
+        nwi_df (DataFrame): Output of ``process_nwi`` with 'pond_id' and 'nwi_first_year',
+            one row per pond.
+        xml_file (str, optional): Label table (.aux.xml) to use for every epoch instead
+            of each epoch's own table.
+        zonal (bool): Use the majority class inside the pond instead of the centroid pixel.
+        registry (LulcRegistry, optional): LULC epochs. Defaults to the registry of LULC_DIR.
+
+    Returns:
+        DataFrame: Contains 'pond_id', 'lulc_value', 'lulc_class'.
+    """
+    registry = get_registry() if registry is None else registry
+    gdf = to_geodataframe(ponds_geojson).to_crs("EPSG:4326")
+    class_mapping = parse_lulc_labels(xml_file) if xml_file else None
+
+    if nwi_df.empty:
+        nwi_years = pd.Series([np.nan] * len(gdf))
+    else:
+        # Raises pandas.errors.MergeError if nwi_df has several rows for a pond
+        nwi_years = gdf[["pond_id"]].merge(
+            nwi_df[["pond_id", "nwi_first_year"]], on="pond_id", how="left", validate="many_to_one",
+        )["nwi_first_year"]
+    lulc_years = np.array([registry.previous_year(int(y)) if pd.notna(y) else None for y in nwi_years], dtype=object)
+
+    values = np.zeros(len(gdf), dtype=np.int64)
+    classes = np.full(len(gdf), None, dtype=object)
+    for lulc_year in {y for y in lulc_years if y is not None}:
+        selected = lulc_years == lulc_year
+        band, transform, crs = registry.band(lulc_year)
+        if zonal:
+            geometries = gdf.geometry[selected].to_crs(crs)
+            year_values = zonal_majority(band, transform, list(geometries))
+        else:
+            centroids = gpd.GeoSeries(shapely.centroid(np.asarray(gdf.geometry.values[selected])), crs=gdf.crs).to_crs(crs)
+            year_values = sample_points(band, transform, centroids.x.values, centroids.y.values)
 
-def assign_previous_lulc_class(ponds_geojson, nwi_df, xml_file):
-    gdf = gpd.read_file(ponds_geojson).to_crs("EPSG:4326")
-    class_mapping = parse_lulc_labels(xml_file)
+        labels = registry.labels(lulc_year) if class_mapping is None else class_mapping
+        values[selected] = year_values
+        classes[selected] = [labels.get(str(int(v)), "Unknown Class") if v else None for v in year_values]
 
-    results = [{"pond_id": row["pond_id"], "lulc_value": *get_lulc_class(row["geometry"], get_previous_lulc_year(int(nwi_df.loc[nwi_df["pond_id"] == row["pond_id"], "nwi_first_year"].values[0])) if not nwi_df.empty else None, class_mapping)} for _, row in gdf.iterrows()]
-    
+    results = [
+        {"pond_id": pond_id, "lulc_value": int(value) if value else None, "lulc_class": lulc_class}
+        for pond_id, value, lulc_class in zip(gdf["pond_id"], values, classes)
+    ]
     return pd.DataFrame(results)
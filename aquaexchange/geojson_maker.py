@@ -1,6 +1,52 @@
 import json
 import os
 
+def farm_feature_collection(farm):
+    """
+    Converts one farm's JSON data into a GeoJSON FeatureCollection.
+
+    Parameters:
+    - farm (dict): Farm with 'farmid' and 'ponds'.
+
+    Returns:
+    - dict: FeatureCollection with one polygon feature per pond.
+    """
+    geojson = {
+        "type": "FeatureCollection",
+        "features": []
+    }
+
+    for pond in farm["ponds"]:
+        coordinates = [
+            [float(point["lng"]), float(point["lat"])] for point in pond["boundaries"].values()
+        ]
+        # Close the polygon by repeating the first point at the end
+        coordinates.append(coordinates[0])
+
+        feature = {
+            "type": "Feature",
+            "properties": {"pond_id": pond["id"]},
+            "geometry": {"type": "Polygon", "coordinates": [coordinates]},
+        }
+        geojson["features"].append(feature)
+
+    return geojson
+
+def farm_geodataframe(farm):
+    """
+    Converts one farm's JSON data into a GeoDataFrame without touching disk.
+
+    Parameters:
+    - farm (dict): Farm with 'farmid' and 'ponds'.
+
+    Returns:
+    - GeoDataFrame: One row per pond with 'pond_id' and geometry, in EPSG:4326.
+    """
+    import geopandas as gpd
+
+    features = farm_feature_collection(farm)["features"]
+    return gpd.GeoDataFrame.from_features(features, crs="EPSG:4326")
+
 def create_geojson(farm_data, output_folder):
     """
     Converts farm JSON data into GeoJSON format and saves it.
@@ -18,24 +64,7 @@ def create_geojson(farm_data, output_folder):
     # Process each farm
     for farm in farm_data:
         farm_id = farm["farmid"]
-        geojson = {
-            "type": "FeatureCollection",
-            "features": []
-        }
-
-        for pond in farm["ponds"]:
-            coordinates = [
-                [float(point["lng"]), float(point["lat"])] for point in pond["boundaries"].values()
-            ]
-            # Close the polygon by repeating the first point at the end
-            coordinates.append(coordinates[0])
-
-            feature = {
-                "type": "Feature",
-                "properties": {"pond_id": pond["id"]},
-                "geometry": {"type": "Polygon", "coordinates": [coordinates]},
-            }
-            geojson["features"].append(feature)
+        geojson = farm_feature_collection(farm)
 
         # Save to GeoJSON file
         output_path = os.path.join(output_folder, f"{farm_id}.geojson")
@@ -0,0 +1,136 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
+import shapely
+from pyproj import Transformer
+
+# Processes used to buffer large pond sets; 1 buffers in the calling process
+GEOMETRY_WORKERS = int(os.getenv("AQUAEXCHANGE_GEOMETRY_WORKERS", "1"))
+
+# Geometries per task handed to the process pool
+PARTITION_SIZE = 50000
+
+@lru_cache(maxsize=256)
+def get_transformer(src_crs, dst_crs):
+    """Cached ``pyproj.Transformer`` between two CRS, with x/y (lon/lat) axis order."""
+    return Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+def utm_epsg(lon, lat):
+    """
+    EPSG codes of the WGS84 UTM zones containing the given points.
+
+    Args:
+        lon (array): Longitudes in degrees.
+        lat (array): Latitudes in degrees.
+
+    Returns:
+        numpy array: 326xx codes north of the equator, 327xx south of it.
+    """
+    lon, lat = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+    zone = np.clip(np.floor((lon + 180) / 6).astype(int) + 1, 1, 60)
+    return np.where(lat >= 0, 32600, 32700) + zone
+
+def utm_zones(geometries):
+    """
+    UTM zone (EPSG code) of each geometry, taken at the centre of its bounding box.
+
+    Args:
+        geometries (array): Shapely geometries in EPSG:4326.
+
+    Returns:
+        numpy array: One EPSG code per geometry.
+    """
+    bounds = shapely.bounds(np.asarray(geometries))
+    return utm_epsg((bounds[:, 0] + bounds[:, 2]) / 2, (bounds[:, 1] + bounds[:, 3]) / 2)
+
+def local_utm_crs(geometries):
+    """CRS string of the UTM zone at the centre of all ``geometries`` (EPSG:4326)."""
+    minx, miny, maxx, maxy = shapely.total_bounds(np.asarray(geometries))
+    return f"EPSG:{int(utm_epsg((minx + maxx) / 2, (miny + maxy) / 2))}"
+
+def project_geometries(geometries, src_crs, dst_crs):
+    """
+    Reprojects an array of geometries with a cached transformer, all coordinates at once.
+
+    Args:
+        geometries (array): Shapely geometries.
+        src_crs (str): CRS of ``geometries``, e.g. "EPSG:4326".
+        dst_crs (str): Target CRS.
+
+    Returns:
+        numpy array: Reprojected geometries.
+    """
+    transformer = get_transformer(str(src_crs), str(dst_crs))
+    return shapely.transform(
+        np.asarray(geometries),
+        lambda coords: np.column_stack(transformer.transform(coords[:, 0], coords[:, 1])),
+    )
+
+def _buffer_partition(geometries, epsg, distance):
+    # Runs in worker processes too, so it only takes picklable arguments
+    utm = f"EPSG:{epsg}"
+    projected = project_geometries(geometries, "EPSG:4326", utm)
+    areas = shapely.area(projected)
+    if distance == 0:
+        # Nothing to buffer: skip the round trip, which would move vertices by rounding
+        return geometries, areas
+    buffered = shapely.buffer(projected, distance)
+    return project_geometries(buffered, utm, "EPSG:4326"), areas
+
+def buffer_geometries(geometries, distance, workers=None, partition_size=PARTITION_SIZE):
+    """
+    Buffers geometries by a distance in meters, each in its own UTM zone.
+
+    Geometries are partitioned by UTM zone; every partition is projected with
+    a cached transformer, measured and buffered with vectorized Shapely calls
+    and projected back. With ``workers`` > 1, partitions (split into chunks of
+    ``partition_size``) are processed in a process pool. Results come back in
+    input order.
+
+    Args:
+        geometries (array): Shapely geometries in EPSG:4326.
+        distance (float): Buffer distance in meters; negative values shrink, 0 returns
+            the geometries unchanged.
+        workers (int, optional): Worker processes. Defaults to GEOMETRY_WORKERS.
+        partition_size (int): Maximum geometries per pool task.
+
+    Returns:
+        tuple: (buffered geometries in EPSG:4326, areas in m² before buffering), as
+        numpy arrays in input order.
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    workers = GEOMETRY_WORKERS if workers is None else workers
+    buffered = np.empty(len(geometries), dtype=object)
+    areas = np.full(len(geometries), np.nan)
+    if len(geometries) == 0:
+        return buffered, areas
+
+    valid = ~(shapely.is_missing(geometries) | shapely.is_empty(geometries))
+    buffered[~valid] = geometries[~valid]
+    areas[~valid] = shapely.area(geometries[~valid])
+    positions = np.flatnonzero(valid)
+    zones = utm_zones(geometries[positions])
+
+    tasks = []
+    for epsg in np.unique(zones):
+        members = positions[zones == epsg]
+        step = partition_size if workers > 1 else len(members)
+        for start in range(0, len(members), step):
+            tasks.append((members[start:start + step], int(epsg)))
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(
+                _buffer_partition,
+                [geometries[members] for members, _ in tasks],
+                [epsg for _, epsg in tasks],
+                [distance] * len(tasks),
+            ))
+    else:
+        results = [_buffer_partition(geometries[members], epsg, distance) for members, epsg in tasks]
+
+    for (members, _), (part, part_areas) in zip(tasks, results):
+        buffered[members] = part
+        areas[members] = part_areas
+    return buffered, areas
@@ -1,8 +1,15 @@
-from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPermissions
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import hashlib
+import logging
 import os
+import tempfile
+import threading
 import uuid
 from dotenv import load_dotenv
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
@@ -12,11 +19,157 @@ ACCOUNT_URL = os.getenv("AZURE_ACCOUNT_URL")
 AZURE_CREDENTIALS = os.getenv("AZURE_SAS_TOKEN")
 CONTAINER_NAME = "opensource-product"  # Replace with your container name
 
-# Initialize BlobServiceClient
-blob_service_client = BlobServiceClient(
-    account_url=ACCOUNT_URL,
-    credential=AZURE_CREDENTIALS
-)
+# Blob prefix and upload concurrency for pipeline artifacts
+BLOB_PREFIX = "aquaexchange_images"
+MAX_CONCURRENT_UPLOADS = int(os.getenv("AQUAEXCHANGE_MAX_CONCURRENT_UPLOADS", "8"))
+
+# When set, artifacts are stored in this local directory instead of Azure
+STORAGE_DIR = os.getenv("AQUAEXCHANGE_STORAGE_DIR")
+
+_blob_service_client = None
+_client_lock = threading.Lock()
+
+def get_blob_service_client():
+    """Returns the BlobServiceClient, created on first use."""
+    from azure.storage.blob import BlobServiceClient
+
+    global _blob_service_client
+    with _client_lock:
+        if _blob_service_client is None:
+            _blob_service_client = BlobServiceClient(
+                account_url=ACCOUNT_URL,
+                credential=AZURE_CREDENTIALS
+            )
+        return _blob_service_client
+
+class StorageBackend:
+    """
+    Where pipeline artifacts are stored. Implementations must be thread-safe.
+    """
+
+    def exists(self, blob_name):
+        """Whether ``blob_name`` is already stored."""
+        raise NotImplementedError
+
+    def upload(self, blob_name, data):
+        """Stores ``data`` (bytes) under ``blob_name``."""
+        raise NotImplementedError
+
+    def url(self, blob_name):
+        """URL under which ``blob_name`` can be read."""
+        raise NotImplementedError
+
+class AzureBlobBackend(StorageBackend):
+    """
+    Azure Blob Storage container. The container is checked (and created) once, on first use.
+    """
+
+    def __init__(self, container_name=CONTAINER_NAME):
+        self.container_name = container_name
+        self._container_client = None
+        self._lock = threading.Lock()
+
+    def _container(self):
+        with self._lock:
+            if self._container_client is None:
+                container_client = get_blob_service_client().get_container_client(self.container_name)
+                # Ensure the container exists, if not create it
+                if not container_client.exists():
+                    container_client.create_container()
+                self._container_client = container_client
+            return self._container_client
+
+    def exists(self, blob_name):
+        return self._container().get_blob_client(blob_name).exists()
+
+    def upload(self, blob_name, data):
+        self._container().get_blob_client(blob_name).upload_blob(data, overwrite=True)
+
+    def url(self, blob_name):
+        return generate_sas_url(self.container_name, blob_name)
+
+class LocalFileBackend(StorageBackend):
+    """
+    Local directory, for running and benchmarking the pipeline without Azure.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, blob_name):
+        return os.path.join(self.root, *blob_name.split("/"))
+
+    def exists(self, blob_name):
+        return os.path.exists(self._path(blob_name))
+
+    def upload(self, blob_name, data):
+        path = self._path(blob_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def url(self, blob_name):
+        return "file://" + os.path.abspath(self._path(blob_name))
+
+def get_storage_backend():
+    """
+    Default backend: a LocalFileBackend if AQUAEXCHANGE_STORAGE_DIR is set, Azure otherwise.
+    """
+    if STORAGE_DIR:
+        return LocalFileBackend(STORAGE_DIR)
+    return AzureBlobBackend()
+
+def content_blob_name(filename, data, prefix=BLOB_PREFIX):
+    """
+    Blob name derived from the content hash, so identical artifacts share one blob.
+    """
+    extension = os.path.splitext(filename)[1]
+    return f"{prefix}/{hashlib.sha256(data).hexdigest()}{extension}"
+
+def upload_artifacts(artifacts, backend=None, max_workers=None):
+    """
+    Uploads in-memory artifacts concurrently, skipping content that is already stored.
+
+    Parameters:
+    - artifacts (dict): {filename: bytes}
+    - backend (StorageBackend, optional): Destination. Defaults to get_storage_backend().
+    - max_workers (int, optional): Maximum uploads in flight. Defaults to MAX_CONCURRENT_UPLOADS.
+
+    Returns:
+    - dict: {filename: blob_name}, blob_name None if the upload failed.
+    """
+    backend = get_storage_backend() if backend is None else backend
+    max_workers = MAX_CONCURRENT_UPLOADS if max_workers is None else max_workers
+
+    blob_names = {filename: content_blob_name(filename, data) for filename, data in artifacts.items()}
+    unique = {}
+    for filename, blob_name in blob_names.items():
+        unique.setdefault(blob_name, artifacts[filename])
+
+    def upload(blob_name, data):
+        try:
+            if backend.exists(blob_name):
+                metrics.increment("upload_skips")
+            else:
+                backend.upload(blob_name, data)
+                metrics.increment("uploads")
+            return blob_name
+        except Exception as e:
+            logger.error("Failed to upload %s: %s", blob_name, e, extra={"blob_name": blob_name})
+            return None
+
+    if not unique:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(min(max_workers, len(unique)), 1)) as pool:
+        uploaded = dict(zip(unique, pool.map(lambda entry: upload(*entry), unique.items())))
+
+    return {filename: uploaded[blob_name] for filename, blob_name in blob_names.items()}
+
+# Function to upload in-memory bytes to Azure Blob Storage
+def upload_bytes_to_azure(container_name: str, filename: str, data: bytes) -> str:
+    return upload_artifacts({filename: data}, AzureBlobBackend(container_name))[filename]
 
 # Function to upload a file from disk to Azure Blob Storage
 def upload_local_file_to_azure(container_name: str, file_path: str) -> str:
@@ -26,7 +179,7 @@ def upload_local_file_to_azure(container_name: str, file_path: str) -> str:
             raise FileNotFoundError(f"File {file_path} not found.")
 
         # Get container client
-        container_client = blob_service_client.get_container_client(container_name)
+        container_client = get_blob_service_client().get_container_client(container_name)
 
         # Ensure the container exists, if not create it
         if not container_client.exists():
@@ -45,11 +198,13 @@ def upload_local_file_to_azure(container_name: str, file_path: str) -> str:
         # Return the uploaded blob name (path in Azure)
         return blob_name
     except Exception as e:
-        print(f"Failed to upload file: {str(e)}")
+        logger.error("Failed to upload file %s: %s", file_path, e)
         return None
 
 # Function to generate a pre-signed URL (SAS URL)
 def generate_sas_url(container_name: str, blob_name: str) -> str:
+    from azure.storage.blob import generate_blob_sas, BlobSasPermissions
+
     try:
         # Generate a SAS token for the blob
         sas_token = generate_blob_sas(
@@ -64,5 +219,5 @@ def generate_sas_url(container_name: str, blob_name: str) -> str:
         # Construct the SAS URL
         return f"{ACCOUNT_URL}/{container_name}/{blob_name}?{sas_token}"
     except Exception as e:
-        print(f"Failed to generate SAS URL: {str(e)}")
+        logger.error("Failed to generate SAS URL for %s: %s", blob_name, e)
         return None
@@ -1,31 +1,49 @@
 import geopandas as gpd
 import os
+from .utils import to_geodataframe
 
-def merge_geojson(input_geojson, output_folder):
+def merge_ponds(ponds):
     """
-    Merges all pond boundaries for a single farm into a single GeoJSON file.
+    Merges all pond boundaries for a single farm into one geometry, in memory.
 
     Parameters:
-    - input_geojson (str): Path to the input farm-level GeoJSON file.
-    - output_folder (str): Path to save the merged GeoJSON.
+    - ponds (str | GeoDataFrame): Farm-level ponds, as a GeoJSON path or a GeoDataFrame.
 
     Returns:
-    - str: Path to the merged GeoJSON file.
+    - GeoDataFrame: A single row holding the merged boundary.
     """
-    os.makedirs(output_folder, exist_ok=True)
-
-    # Load the input GeoJSON file
-    gdf = gpd.read_file(input_geojson)
+    gdf = to_geodataframe(ponds)
 
     if gdf.empty:
-        raise ValueError(f"Error: Input GeoJSON '{input_geojson}' is empty.")
+        raise ValueError("Error: Input ponds are empty.")
 
     # Merge all pond boundaries into a single polygon
     merged_boundary = gdf.dissolve().unary_union
-    merged_gdf = gpd.GeoDataFrame(geometry=[merged_boundary], crs=gdf.crs)
+    return gpd.GeoDataFrame(geometry=[merged_boundary], crs=gdf.crs)
+
+def merge_geojson(input_geojson, output_folder, farm_id=None):
+    """
+    Merges all pond boundaries for a single farm into a single GeoJSON file.
+
+    Parameters:
+    - input_geojson (str | GeoDataFrame): The input farm-level GeoJSON file or GeoDataFrame.
+    - output_folder (str): Path to save the merged GeoJSON.
+    - farm_id (str, optional): Name of the output file. Defaults to the input file name;
+      required when ``input_geojson`` is a GeoDataFrame.
+
+    Returns:
+    - str: Path to the merged GeoJSON file.
+    """
+    if farm_id is None:
+        if not isinstance(input_geojson, (str, os.PathLike)):
+            raise ValueError("Error: farm_id is required when merging a GeoDataFrame.")
+        farm_id = os.path.splitext(os.path.basename(input_geojson))[0]
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    merged_gdf = merge_ponds(input_geojson)
 
     # Generate the output file path
-    farm_id = os.path.splitext(os.path.basename(input_geojson))[0]
     output_path = os.path.join(output_folder, f"{farm_id}_merged.geojson")
 
     # Save the merged GeoJSON
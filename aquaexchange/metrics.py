@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+# Collect metrics; when off, every call returns immediately
+ENABLED = os.getenv("AQUAEXCHANGE_METRICS", "0") == "1"
+
+# Farms kept in the per-farm table; the oldest are dropped first
+MAX_FARMS = 1000
+
+PROMETHEUS_PREFIX = "aquaexchange"
+
+# Counters recorded across the package
+COUNTERS = {
+    "remote_opens": "Raster datasets opened for reading.",
+    "bytes_read": "Decoded pixel bytes read from rasters.",
+    "stac_requests": "STAC searches sent to the API.",
+    "stac_cache_hits": "STAC searches served from the on-disk cache.",
+    "sign_calls": "Asset hrefs signed.",
+    "sign_token_requests": "SAS tokens requested from the token endpoint.",
+    "chip_cache_hits": "Band windows served from the chip cache.",
+    "chip_cache_misses": "Band windows missing from the chip cache.",
+    "shared_chip_reads": "Merged band windows read once for several pipeline branches.",
+    "shared_chip_hits": "Band windows served from a shared in-memory chip.",
+    "uploads": "Artifacts uploaded to storage.",
+    "upload_skips": "Artifacts already in storage and not uploaded again.",
+    "checkpoints_reused": "Pipeline stages loaded from a checkpoint.",
+}
+
+_LOG_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None)))
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as one JSON object per line, including ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _LOG_RECORD_FIELDS})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level=logging.INFO, json_format=False):
+    """
+    Sends the package's log records to stderr.
+
+    Args:
+        level (int): Minimum level, e.g. logging.DEBUG for per-pond details.
+        json_format (bool): One JSON object per line instead of plain text.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        JsonFormatter() if json_format else logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+    )
+    logger = logging.getLogger("aquaexchange")
+    logger.handlers[:] = [handler]
+    logger.setLevel(level)
+
+class Metrics:
+    """
+    Stage timings, I/O counters and per-farm pixel counts of a process.
+
+    Args:
+        enabled (bool): Collect metrics. Defaults to AQUAEXCHANGE_METRICS=1.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = ENABLED if enabled is None else enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.counters = dict.fromkeys(COUNTERS, 0)
+            self.stages = {}
+            self.farms = OrderedDict()
+
+    def increment(self, name, value=1):
+        """Adds ``value`` to a counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def stage(self, name):
+        """Context manager timing one run of a stage."""
+        if not self.enabled:
+            return nullcontext()
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stage = self.stages.setdefault(name, {"runs": 0, "seconds": 0.0, "max_seconds": 0.0})
+                stage["runs"] += 1
+                stage["seconds"] += elapsed
+                stage["max_seconds"] = max(stage["max_seconds"], elapsed)
+
+    def record_farm(self, farm_id, **values):
+        """Adds per-farm counts, e.g. ``record_farm("F1", ponds=12, pixels=3400)``."""
+        if not self.enabled:
+            return
+        with self._lock:
+            farm = self.farms.pop(str(farm_id), {})
+            for name, value in values.items():
+                farm[name] = farm.get(name, 0) + value
+            self.farms[str(farm_id)] = farm
+            while len(self.farms) > MAX_FARMS:
+                self.farms.popitem(last=False)
+
+    def report(self):
+        """Run report as a JSON-serialisable dict."""
+        with self._lock:
+            return {
+                "started": self.started,
+                "elapsed_seconds": round(time.time() - self.started, 3),
+                "counters": dict(self.counters),
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+                "farms": {farm_id: dict(farm) for farm_id, farm in self.farms.items()},
+            }
+
+    def save_report(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=4)
+
+    def to_prometheus(self):
+        """Metrics in the Prometheus text exposition format."""
+        report = self.report()
+        lines = []
+        for name, value in report["counters"].items():
+            metric = f"{PROMETHEUS_PREFIX}_{name}_total"
+            if name in COUNTERS:
+                lines.append(f"# HELP {metric} {COUNTERS[name]}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        for field, metric, help_text in (
+            ("runs", "stage_runs_total", "Completed runs per stage."),
+            ("seconds", "stage_seconds_total", "Wall time spent per stage."),
+        ):
+            metric = f"{PROMETHEUS_PREFIX}_{metric}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for stage, values in report["stages"].items():
+                lines.append(f'{metric}{{stage="{stage}"}} {values[field]}')
+
+        farm_fields = sorted({field for farm in report["farms"].values() for field in farm})
+        for field in farm_fields:
+            metric = f"{PROMETHEUS_PREFIX}_farm_{field}"
+            lines.append(f"# TYPE {metric} gauge")
+            for farm_id, farm in report["farms"].items():
+                if field in farm:
+                    label = farm_id.replace("\\", "\\\\").replace('"', '\\"')
+                    lines.append(f'{metric}{{farm="{label}"}} {farm[field]}')
+        return "\n".join(lines) + "\n"
+
+# Process-wide metrics used by the package
+metrics = Metrics()
+
+def enable_metrics(enabled=True):
+    """Turns process-wide metric collection on or off."""
+    metrics.enabled = enabled
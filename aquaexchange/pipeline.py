@@ -0,0 +1,203 @@
+import os
+from .geojson_maker import farm_geodataframe
+from .buffer import buffer_ponds
+from .merge_geojson import merge_ponds
+from .search_stack_images import TIME_RANGE, search_stac_images_by_pond
+from .calculate_indices import process_nwi_by_pond
+from .find_previous_lulc import assign_previous_lulc_class, get_registry
+from .satellite_imagery_processor import render_imagery
+from .fetch_plan import plan_farm_reads
+from .image_uploader import get_storage_backend, upload_artifacts
+from .combine_outputs import build_pond_records, combine_results
+from .checkpoints import Checkpointer
+from .metrics import metrics
+from .utils import save_geojson
+
+# Analysis settings. Unlike the performance settings of the other modules,
+# these change the values in the outputs, so they live here together and can
+# be reviewed, and overridden, on their own. Every run searches images per
+# pond (``search_stac_images_by_pond``) over the ponds buffered by BUFFER_DISTANCE.
+
+# Buffer applied to the ponds before NWI, in meters. The default 0 analyses
+# the ponds as drawn; a negative value (e.g. -15, half a Landsat pixel) makes
+# NWI skip mixed edge pixels but changes the change years
+BUFFER_DISTANCE = float(os.getenv("AQUAEXCHANGE_BUFFER_DISTANCE", "0"))
+
+# NWI engine mode, one of calculate_indices.NWI_MODES. Outputs only need each
+# pond's first change year ("early_exit"), not every yearly median ("full")
+NWI_MODE = os.getenv("AQUAEXCHANGE_NWI_MODE", "early_exit")
+
+def _debug_geojson(gdf, debug_dir, filename):
+    if debug_dir:
+        os.makedirs(debug_dir, exist_ok=True)
+        save_geojson(gdf, os.path.join(debug_dir, filename))
+
+def record_nwi(farm_id, nwi_df):
+    """Adds a farm's pond, scene and pixel counts to the process-wide metrics."""
+    metrics.record_farm(
+        farm_id,
+        ponds=len(nwi_df),
+        scenes_read=nwi_df.attrs.get("scenes_read", 0),
+        pixels=nwi_df.attrs.get("pixels", 0),
+    )
+
+def pond_scene_items(pond_items):
+    """Distinct scenes of a per-pond image index, in first-seen order."""
+    items = {item.id: item for years in pond_items.values() for images in years.values() for item in images}
+    return list(items.values())
+
+def analyse_ponds(ponds, buffer_distance=BUFFER_DISTANCE, registry=None, debug_dir=None, farm_id=None,
+                  **nwi_kwargs):
+    """
+    Buffering, Landsat search, NWI and LULC for one farm, entirely in memory.
+
+    Args:
+        ponds (GeoDataFrame): Ponds with 'pond_id', in EPSG:4326.
+        buffer_distance (float): Buffer applied before NWI extraction, in meters.
+        registry (LulcRegistry, optional): LULC epochs.
+        debug_dir (str, optional): Also write the buffered ponds here.
+        farm_id (str, optional): Farm the per-farm metrics are recorded under.
+        **nwi_kwargs: Passed on to ``process_nwi``; ``mode`` defaults to NWI_MODE.
+
+    Returns:
+        dict: {"noofponds": ..., "ponds": [pond records]}
+    """
+    with metrics.stage("buffer"):
+        buffered = buffer_ponds(ponds, buffer_distance)
+    _debug_geojson(buffered, debug_dir, "buffered.geojson")
+
+    nwi_kwargs.setdefault("mode", NWI_MODE)
+    with metrics.stage("search"):
+        pond_items = search_stac_images_by_pond(buffered)
+    with metrics.stage("nwi"):
+        nwi_df = process_nwi_by_pond(pond_items, buffered, **nwi_kwargs)
+    if farm_id is not None:
+        record_nwi(farm_id, nwi_df)
+    with metrics.stage("lulc"):
+        lulc_df = assign_previous_lulc_class(ponds, nwi_df, registry=registry)
+    return {
+        "noofponds": len(ponds),
+        "ponds": build_pond_records(nwi_df, lulc_df)
+    }
+
+def upload_imagery(images, thumbnails, backend):
+    """Uploads the output of ``render_imagery``; returns {"images": ..., "thumbnails": ...} blob names."""
+    return {"images": upload_artifacts(images, backend), "thumbnails": upload_artifacts(thumbnails, backend)}
+
+def imagery_urls(blob_names, backend):
+    """URLs of uploaded imagery, as {"images": [...], "thumbnails": [...]}."""
+    return {
+        kind: [backend.url(blob_name) for blob_name in names.values() if blob_name]
+        for kind, names in blob_names.items()
+    }
+
+def farm_images(ponds, backend=None, debug_dir=None, **imagery_kwargs):
+    """
+    Renders the farm's false colour images and uploads them, without intermediate files.
+
+    Args:
+        ponds (GeoDataFrame): Ponds in EPSG:4326.
+        backend (StorageBackend, optional): Destination. Defaults to get_storage_backend().
+        debug_dir (str, optional): Also write the merged boundary here.
+        **imagery_kwargs: Passed on to ``render_imagery``.
+
+    Returns:
+        dict: {"images": [image URLs], "thumbnails": [thumbnail URLs]}
+    """
+    merged = merge_ponds(ponds)
+    _debug_geojson(merged, debug_dir, "merged.geojson")
+
+    with metrics.stage("imagery"):
+        images, thumbnails = render_imagery(merged, **imagery_kwargs)
+    backend = get_storage_backend() if backend is None else backend
+    with metrics.stage("upload"):
+        blob_names = upload_imagery(images, thumbnails, backend)
+    return imagery_urls(blob_names, backend)
+
+def _backend_params(backend):
+    return {"backend": type(backend).__name__, "location": getattr(backend, "root", getattr(backend, "container_name", None))}
+
+def _registry_params(registry):
+    return {year: [path, os.stat(path).st_mtime_ns] for year, path in registry.files.items()}
+
+def run_farm(farm_json, backend=None, registry=None, debug_dir=None, checkpoints=None):
+    """
+    Runs the full pipeline for one farm with no disk I/O between stages.
+
+    Stages hand GeoDataFrames to each other; files are only written when
+    ``debug_dir`` is given. With a Checkpointer, every stage (geojson,
+    buffer, search, nwi, lulc, imagery, upload, combine) is checkpointed
+    and a re-run resumes at the first stage whose inputs changed. Image URLs
+    are never checkpointed; they are requested from the backend on every
+    run, so expiring SAS URLs are always fresh. The NWI and imagery stages
+    share one fetch plan, so a band window both need is read once.
+
+    Args:
+        farm_json (dict): Farm in the input JSON format.
+        backend (StorageBackend, optional): Image destination.
+        registry (LulcRegistry, optional): LULC epochs.
+        debug_dir (str, optional): Directory for the intermediate GeoJSONs.
+        checkpoints (Checkpointer, optional): Stage checkpoints. Defaults to none.
+
+    Returns:
+        dict: Final structured output (see ``combine_results``).
+    """
+    checkpoints = Checkpointer() if checkpoints is None else checkpoints
+    backend = get_storage_backend() if backend is None else backend
+    registry = get_registry() if registry is None else registry
+
+    ponds = checkpoints.run("geojson", lambda: farm_geodataframe(farm_json), params={"farm": farm_json})
+    _debug_geojson(ponds, debug_dir, "ponds.geojson")
+
+    buffered = checkpoints.run(
+        "buffer", lambda: buffer_ponds(ponds, BUFFER_DISTANCE),
+        depends=["geojson"], params={"buffer_distance": BUFFER_DISTANCE},
+    )
+    _debug_geojson(buffered, debug_dir, "buffered.geojson")
+
+    pond_items = checkpoints.run(
+        "search", lambda: search_stac_images_by_pond(buffered),
+        depends=["buffer"], params={"time_range": TIME_RANGE},
+    )
+    plan = None
+
+    def fetch_plan():
+        # Planned on first use, so a run resuming after both stages searches nothing
+        nonlocal plan
+        if plan is None:
+            plan = plan_farm_reads(ponds, buffered, pond_scene_items(pond_items))
+        return plan
+
+    nwi_df = checkpoints.run(
+        "nwi", lambda: process_nwi_by_pond(pond_items, buffered, mode=NWI_MODE, plan=fetch_plan()),
+        depends=["buffer", "search"], params={"mode": NWI_MODE},
+    )
+    record_nwi(farm_json.get("farmid", "Unknown"), nwi_df)
+    lulc_df = checkpoints.run(
+        "lulc", lambda: assign_previous_lulc_class(ponds, nwi_df, registry=registry),
+        depends=["geojson", "nwi"], params={"epochs": _registry_params(registry)},
+    )
+
+    def render():
+        merged = merge_ponds(ponds)
+        _debug_geojson(merged, debug_dir, "merged.geojson")
+        return render_imagery(merged, plan=fetch_plan())
+
+    images, thumbnails = checkpoints.run("imagery", render, depends=["geojson"])
+    blob_names = checkpoints.run(
+        "upload", lambda: upload_imagery(images, thumbnails, backend),
+        depends=["imagery"], params=_backend_params(backend),
+    )
+
+    initial_results = checkpoints.run(
+        "combine",
+        lambda: {
+            "farmid": farm_json.get("farmid", "Unknown"),
+            "noofponds": len(ponds),
+            "ponds": build_pond_records(nwi_df, lulc_df),
+        },
+        depends=["geojson", "nwi", "lulc"],
+    )
+
+    # Only blob names are checkpointed: URLs (e.g. expiring SAS URLs) are issued anew on every run
+    return combine_results(initial_results, imagery_urls(blob_names, backend))
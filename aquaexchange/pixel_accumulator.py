@@ -0,0 +1,121 @@
+import numpy as np
+
+def partition_median(values):
+    """
+    Median of a 1-D array using an in-place partition (the array is reordered).
+
+    Args:
+        values (numpy array): Values without NaNs.
+
+    Returns:
+        float: Median, or NaN if ``values`` is empty.
+    """
+    size = values.size
+    if size == 0:
+        return float("nan")
+    mid = size // 2
+    if size % 2:
+        values.partition(mid)
+        return float(values[mid])
+    values.partition([mid - 1, mid])
+    return (float(values[mid - 1]) + float(values[mid])) / 2
+
+class PixelAccumulator:
+    """
+    Collects pixel values into a growable float32 buffer.
+
+    Values are copied straight into the buffer (which doubles when full) and
+    the median is taken with an in-place partition, so no Python float
+    objects or list-to-array conversions are involved. ``clear`` keeps the
+    buffer, so one accumulator can be reused year after year.
+    """
+
+    def __init__(self, capacity=64):
+        self._buffer = np.empty(capacity, dtype=np.float32)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def add(self, values):
+        """Appends the non-NaN entries of ``values``."""
+        values = np.asarray(values).ravel()
+        values = values[~np.isnan(values)]
+        needed = self._size + values.size
+        if needed > self._buffer.size:
+            grown = np.empty(max(needed, 2 * self._buffer.size), dtype=np.float32)
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+        self._buffer[self._size:needed] = values
+        self._size = needed
+
+    def median(self):
+        """Exact median of the collected values (reorders the buffer)."""
+        return partition_median(self._buffer[:self._size])
+
+    def clear(self):
+        """Forgets all values but keeps the allocated buffer."""
+        self._size = 0
+
+class QuantileSketch:
+    """
+    Bounded-memory approximate median for very large AOIs.
+
+    Keeps a uniform random sample of at most ``sample_size`` values: every
+    value gets a random priority and only the lowest priorities are kept, so
+    memory stays O(sample_size) however many pixels are added. The result is
+    exact while fewer than ``sample_size`` values have been added.
+
+    Error bound: by the Dvoretzky-Kiefer-Wolfowitz inequality, the rank of the
+    returned median among all n values differs from n / 2 by more than
+    ``epsilon * n`` with probability at most ``2 * exp(-2 * sample_size * epsilon**2)``.
+    With the default sample_size of 65536 the rank error is below 0.8 % of n
+    with 99.9 % probability.
+    """
+
+    def __init__(self, sample_size=65536, seed=0):
+        self.sample_size = sample_size
+        self._rng = np.random.default_rng(seed)
+        self._values = np.empty(0, dtype=np.float32)
+        self._priorities = np.empty(0, dtype=np.float64)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, values):
+        """Adds the non-NaN entries of ``values`` to the sample."""
+        values = np.asarray(values, dtype=np.float32).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self._count += values.size
+        priorities = self._rng.random(values.size)
+
+        # Once the sample is full, only values that beat the current worst priority can enter
+        if self._values.size == self.sample_size:
+            candidates = priorities < self._priorities.max()
+            values, priorities = values[candidates], priorities[candidates]
+
+        values = np.concatenate([self._values, values])
+        priorities = np.concatenate([self._priorities, priorities])
+        if values.size > self.sample_size:
+            keep = np.argpartition(priorities, self.sample_size - 1)[:self.sample_size]
+            values, priorities = values[keep], priorities[keep]
+        self._values, self._priorities = values, priorities
+
+    def median(self):
+        """Approximate median of all values added so far."""
+        return partition_median(self._values.copy())
+
+    def clear(self):
+        """Forgets all values."""
+        self._values = np.empty(0, dtype=np.float32)
+        self._priorities = np.empty(0, dtype=np.float64)
+        self._count = 0
+
+def make_accumulator(approximate=False, sample_size=65536):
+    """
+    Creates an exact accumulator, or a bounded-memory sketch if ``approximate``.
+    """
+    return QuantileSketch(sample_size) if approximate else PixelAccumulator()
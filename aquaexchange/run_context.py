@@ -0,0 +1,85 @@
+import os
+import shutil
+import uuid
+
+# Parent directory of the per-run workspaces
+RUNS_DIR = os.getenv("AQUAEXCHANGE_RUNS_DIR", os.path.join("data", "runs"))
+
+# Workspace subdirectories holding intermediate files
+INTERMEDIATE_DIRS = ("geojsons", "buffered_geojsons", "merged_geojsons", "images")
+
+class RunContext:
+    """
+    Private workspace of one pipeline run.
+
+    Every run gets its own directory ``<base_dir>/<farm_id>-<run_id>``, and all
+    stages take their paths from the context instead of fixed locations under
+    ``data/``. Cleanup only touches this workspace, so any number of runs
+    can share a host, in threads or in processes.
+
+    Args:
+        farm_id (str): Farm processed by the run, used in the workspace name.
+        base_dir (str, optional): Parent directory. Defaults to RUNS_DIR.
+        run_id (str, optional): Run identifier. Defaults to a random id.
+    """
+
+    def __init__(self, farm_id="Unknown", base_dir=None, run_id=None):
+        self.farm_id = str(farm_id)
+        self.run_id = uuid.uuid4().hex[:12] if run_id is None else str(run_id)
+        base_dir = RUNS_DIR if base_dir is None else base_dir
+        self.workspace = os.path.join(base_dir, f"{self.farm_id}-{self.run_id}")
+        os.makedirs(base_dir, exist_ok=True)
+        # Fails if the workspace exists, so two runs can never share one
+        os.makedirs(self.workspace)
+
+    def path(self, *parts):
+        """Path inside the workspace; parent directories are created."""
+        path = os.path.join(self.workspace, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def directory(self, name):
+        """Subdirectory of the workspace, created if needed."""
+        path = os.path.join(self.workspace, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @property
+    def geojson_dir(self):
+        return self.directory("geojsons")
+
+    @property
+    def buffered_dir(self):
+        return self.directory("buffered_geojsons")
+
+    @property
+    def merged_dir(self):
+        return self.directory("merged_geojsons")
+
+    @property
+    def images_dir(self):
+        return self.directory("images")
+
+    def cleanup(self, keep_outputs=True):
+        """
+        Deletes this run's intermediate files.
+
+        Parameters:
+        - keep_outputs (bool): Keep the JSON outputs in the workspace root; if False
+          the whole workspace is removed.
+        """
+        if not keep_outputs:
+            shutil.rmtree(self.workspace, ignore_errors=True)
+            return
+        for name in INTERMEDIATE_DIRS:
+            shutil.rmtree(os.path.join(self.workspace, name), ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+    def __repr__(self):
+        return f"RunContext(farm_id={self.farm_id!r}, workspace={self.workspace!r})"
@@ -1,34 +1,231 @@
 import json
 import numpy as np
-import matplotlib.pyplot as plt
 from shapely.geometry import box, shape
 import geopandas as gpd
 import rasterio
-from rasterio.mask import mask
-import cv2
-from io import BytesIO
-from pystac_client import Client
-import planetary_computer
+from rasterio.enums import Resampling
+from rasterio.transform import Affine
+from rasterio.warp import transform_bounds
+from .band_fetcher import fetch_all
+from .signing_cache import sign_href
+from .stac_cache import search_items
+from .chip_cache import cached_read
+from .calculate_indices import window_from_bounds
+from .fcc_renderer import IMAGE_FORMATS, render_fcc, render_fcc_matplotlib
+from .utils import to_geodataframe
+from .geometry_engine import local_utm_crs
+from .metrics import metrics
 
-def process_satellite_imagery(geojson_path, buffer_size=1500, dpi=300):
+# Asset keys of the false-colour bands per collection
+FCC_BANDS = {
+    "landsat-c2-l2": {"nir": "nir08", "red": "red", "green": "green"},
+    "sentinel-2-l2a": {"nir": "B08", "red": "B04", "green": "B03"},
+}
+
+# Longest side of the rendered images in pixels
+IMAGE_SIZE = 1024
+
+# Longest side of the thumbnails made by ``render_imagery``
+THUMBNAIL_SIZE = 256
+
+def display_shape(height, width, size=IMAGE_SIZE):
+    """
+    Shape to read a window at so its longest side is at most ``size`` pixels.
+
+    Windows already smaller than ``size`` are read at native resolution;
+    they are only upsampled when rendered.
+    """
+    factor = size / max(height, width)
+    if factor >= 1:
+        return height, width
+    return max(int(round(height * factor)), 1), max(int(round(width * factor)), 1)
+
+def read_display_band(band_url, collection, aoi_gdf, size=IMAGE_SIZE, signer=None, chip_cache=None, plan=None):
+    """
+    Reads one band over the AOI bounds at display resolution, through the run's
+    fetch plan and the local chip cache.
+
+    The output shape is chosen first and requested from the source with
+    ``out_shape``, so GDAL serves it from COG overviews and only about
+    ``size`` x ``size`` pixels are transferred. A window shared by ``plan``
+    with the NWI branch is instead cut from its in-memory chip.
+
+    Args:
+        band_url (str): Unsigned URL of the band raster; signed only on a cache miss.
+        collection (str): Collection of the asset, used for signing.
+        aoi_gdf (GeoDataFrame): Area to read.
+        size (int): Longest side of the output in pixels.
+        signer (SigningCache, optional): Token cache.
+        chip_cache (ChipCache, optional): Chip cache. Defaults to the process-wide cache.
+        plan (FetchPlan, optional): Shared chips of the run.
+
+    Returns:
+        tuple or None: (2-D band array, transform, CRS of the band), or None if the
+        AOI falls outside the raster.
+    """
+    if plan is not None:
+        try:
+            return plan.read(band_url, tuple(aoi_gdf.total_bounds), aoi_gdf.crs, size=size)
+        except KeyError:
+            pass  # Not shared, read it as usual
+
+    def read():
+        metrics.increment("remote_opens")
+        with rasterio.open(sign_href(band_url, collection, signer)) as src:
+            bounds = transform_bounds(aoi_gdf.crs, src.crs, *aoi_gdf.total_bounds)
+            window = window_from_bounds(bounds, src.transform, src.height, src.width)
+            if window is None:
+                return None
+
+            out_shape = display_shape(window.height, window.width, size)
+            band = src.read(1, window=window, out_shape=out_shape, resampling=Resampling.average)
+            metrics.increment("bytes_read", band.nbytes)
+            transform = src.window_transform(window) * Affine.scale(
+                window.width / out_shape[1], window.height / out_shape[0]
+            )
+            return band, transform, src.crs
+
+    window = ("display", [round(float(v), 6) for v in aoi_gdf.total_bounds], str(aoi_gdf.crs))
+    return cached_read(band_url, window, read, resolution=size, chip_cache=chip_cache)
+
+def buffered_aoi(geojson_path, buffer_size=1500):
+    """
+    Loads the AOI and builds the buffered box used for imagery retrieval.
+
+    Args:
+        geojson_path (str | GeoDataFrame): AOI as a GeoJSON path or a GeoDataFrame.
+        buffer_size (int): Buffer size in meters around the AOI.
+
+    Returns:
+        tuple: (AOI GeoDataFrame, buffered box GeoDataFrame), both in the UTM zone
+        at the centre of the AOI.
+    """
+    aoi = to_geodataframe(geojson_path).to_crs("EPSG:4326")
+    aoi = aoi.to_crs(local_utm_crs(aoi.geometry.values))
+    min_x, min_y, max_x, max_y = aoi.total_bounds
+    expanded_bbox = box(min_x - buffer_size, min_y - buffer_size, max_x + buffer_size, max_y + buffer_size)
+    return aoi, gpd.GeoDataFrame(geometry=[expanded_bbox], crs=aoi.crs)
+
+def select_fcc_scenes(buffr_aoi_gdf):
+    """
+    Searches the best Landsat and Sentinel-2 scene for the false-colour images.
+
+    Returns:
+        list: (item, {"nir": href, "red": href, "green": href}, title prefix) per scene.
+    """
+    search_aoi = buffr_aoi_gdf.to_crs("epsg:4326").geometry.iloc[0]
+    landsat_items = search_items(
+        ["landsat-c2-l2"],
+        search_aoi,
+        "2000-01-01/2016-12-31",
+        query={"platform": {"neq": "landsat-7"}},
+    )
+    selected_landsat_items = sorted(
+        [item for item in landsat_items if item.properties['eo:cloud_cover'] < 10], 
+        key=lambda img: img.properties['eo:cloud_cover']
+    )[:1]  # Take the best image
+
+    sentinel_items = search_items(["sentinel-2-l2a"], search_aoi, "2018-01-01/2024-12-31")
+    selected_sentinel_items = sorted(
+        [item for item in sentinel_items if item.properties['eo:cloud_cover'] < 10], 
+        key=lambda img: img.properties['eo:cloud_cover']
+    )[:1]
+
+    scenes = []
+    for items, title_prefix in ((selected_landsat_items, "FCC Image Landsat"),
+                                (selected_sentinel_items, "FCC Image Sentinel-2")):
+        for item in items:
+            assets = FCC_BANDS[item.collection_id]
+            bands = {key: item.assets[asset].href for key, asset in assets.items()}
+            scenes.append((item, bands, title_prefix))
+    return scenes
+
+def read_fcc_scenes(scenes, buffr_aoi_gdf, max_workers=None, timeout=None, signer=None, chip_cache=None,
+                    image_size=IMAGE_SIZE, plan=None):
+    """
+    Fetches the bands of all scenes concurrently at display resolution; results
+    come back in scene order. Scenes that do not overlap the AOI are dropped.
+
+    Returns:
+        list: (item, {"nir": array, "red": array, "green": array}, band transform, band CRS,
+        title prefix) per scene.
+    """
+    tasks = [
+        (band_url, item.collection_id, buffr_aoi_gdf, image_size, signer, chip_cache, plan)
+        for item, bands, _ in scenes for band_url in bands.values()
+    ]
+    results = iter(fetch_all(read_display_band, tasks, max_workers, timeout))
+
+    masked_scenes = []
+    for item, bands, title_prefix in scenes:
+        chips = {key: next(results) for key in bands}
+        if any(chip is None for chip in chips.values()):
+            continue
+        masked_bands = {key: band for key, (band, _, _) in chips.items()}
+        _, band_transform, band_crs = chips["nir"]
+        masked_scenes.append((item, masked_bands, band_transform, band_crs, title_prefix))
+    return masked_scenes
+
+def process_satellite_imagery(geojson_path, buffer_size=1500, dpi=300, max_workers=None, timeout=None,
+                              signer=None, chip_cache=None, renderer="opencv", image_format="png",
+                              image_size=1024, plan=None):
     """
     Processes satellite imagery and returns images as bytes.
 
+    Bands of all selected scenes are fetched concurrently; images are then
+    rendered in scene order. The default renderer draws the AOI boundary
+    straight onto the composite and encodes it with OpenCV;
+    ``renderer="matplotlib"`` keeps the former figure-based PNG output. Use
+    ``render_imagery`` to also get thumbnails.
+
     Args:
-        geojson_path (str): Path to the GeoJSON file defining the Area of Interest (AOI).
+        geojson_path (str | GeoDataFrame): Area of Interest (AOI), as a GeoJSON path or
+            an in-memory GeoDataFrame.
         buffer_size (int): Buffer size in meters around the AOI for imagery retrieval.
         dpi (int): DPI for saving high-quality images.
+        max_workers (int, optional): Maximum band reads in flight.
+        timeout (float, optional): Per-request HTTP timeout in seconds.
+        signer (SigningCache, optional): Token cache. Defaults to the process-wide cache.
+        chip_cache (ChipCache, optional): Chip cache. Defaults to the process-wide cache.
+        renderer (str): "opencv" or "matplotlib".
+        image_format (str): "png", "jpeg" or "webp" (OpenCV renderer only).
+        image_size (int): Longest side of the image in pixels. Bands are read at
+            this resolution and only upsampled when the source is coarser.
+        plan (FetchPlan, optional): Band windows shared with the NWI branch (see ``fetch_plan``).
     
     Returns:
         dict: {filename: image_bytes}
     """
-    
+    images, _ = render_imagery(
+        geojson_path, buffer_size, dpi, max_workers, timeout, signer, chip_cache, renderer, image_format,
+        image_size, thumbnail_size=None, plan=plan,
+    )
+    return images  # Return dictionary of {filename: image_bytes}
+
+def render_imagery(geojson_path, buffer_size=1500, dpi=300, max_workers=None, timeout=None,
+                   signer=None, chip_cache=None, renderer="opencv", image_format="png",
+                   image_size=1024, thumbnail_size=THUMBNAIL_SIZE, plan=None):
+    """
+    ``process_satellite_imagery`` that also returns a ``<date>_thumb``
+    thumbnail of every image, kept apart from the images.
+
+    The OpenCV renderer makes thumbnails from the rendered image; the
+    matplotlib renderer makes none.
+
+    Args:
+        thumbnail_size (int, optional): Longest side of the thumbnails; None for none.
+        Others: As for ``process_satellite_imagery``.
+
+    Returns:
+        tuple: ({filename: image_bytes} of the images, {filename: image_bytes} of the thumbnails)
+    """
+    if renderer not in ("opencv", "matplotlib"):
+        raise ValueError(f"Unknown renderer '{renderer}', use 'opencv' or 'matplotlib'.")
+    if renderer == "opencv" and image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Unsupported image format '{image_format}', use one of {sorted(IMAGE_FORMATS)}.")
+
     # Load and process AOI
-    aoi = gpd.read_file(geojson_path).to_crs(epsg=32644)
-    geom = aoi.geometry.iloc[0]
-    min_x, min_y, max_x, max_y = aoi.total_bounds
-    expanded_bbox = box(min_x - buffer_size, min_y - buffer_size, max_x + buffer_size, max_y + buffer_size)
-    buffr_aoi_gdf = gpd.GeoDataFrame(geometry=[expanded_bbox], crs=aoi.crs)
+    aoi, buffr_aoi_gdf = buffered_aoi(geojson_path, buffer_size)
 
     # Helper functions
     def contrast_stretch(band):
@@ -38,87 +235,49 @@ def process_satellite_imagery(geojson_path, buffer_size=1500, dpi=300):
         band = np.clip(band, min_val, max_val)
         return (band - min_val) / (max_val - min_val)
 
-    def bilinear_resample(image, scale=2.0):
-        height, width = image.shape[:2]
-        new_size = (int(height * scale), int(width * scale))
-        return cv2.resize(image, new_size, cv2.INTER_LINEAR)
-
     def process_band(band):
-        return bilinear_resample(contrast_stretch(band), scale=2)
+        # Bands already have the display resolution; the renderer upsamples coarser ones
+        return contrast_stretch(band.astype(np.float32))
 
-    # Function to process and return image as bytes
-    def process_and_return_image(item, bands_dict, title_prefix, aoi):
+    # Function to process and return image and thumbnail as bytes
+    def process_and_return_image(item, masked_bands, band_transform, band_crs, title_prefix, aoi):
         date = item.properties['datetime'][:10]
-        masked_bands = {}
-        for key, band_url in bands_dict.items():
-            with rasterio.open(band_url) as src:
-                aoi_rep = buffr_aoi_gdf.to_crs(src.crs)
-                band, _ = mask(src, aoi_rep.geometry, crop=True)
-                masked_bands[key] = band.squeeze()
+        title = f"{title_prefix} - {date}"
 
         processed_bands = {key: process_band(band) for key, band in masked_bands.items()}
         false_color = np.dstack([processed_bands["nir"], processed_bands["red"], processed_bands["green"]])
-        minx, miny, maxx, maxy = aoi_rep.total_bounds
-
-        fig, ax = plt.subplots(figsize=(8, 8))
-        ax.imshow(false_color, extent=[minx, maxx, miny, maxy])
-        aoi.boundary.plot(ax=ax, edgecolor="yellow", linewidth=2)
-        ax.set_xticks([]), ax.set_yticks([])
-        ax.set_xticklabels([]), ax.set_yticklabels([])
-        plt.title(f"{title_prefix} - {date}")
 
-        # Convert image to bytes
-        img_bytes_io = BytesIO()
-        fig.savefig(img_bytes_io, format="png", dpi=dpi, bbox_inches='tight')
-        plt.close(fig)
+        if renderer == "matplotlib":
+            minx, miny, maxx, maxy = buffr_aoi_gdf.to_crs(band_crs).total_bounds
+            image = render_fcc_matplotlib(false_color, [minx, maxx, miny, maxy], aoi.to_crs(band_crs), title, dpi)
+            return {f"{date}.png": image}, {}  # Return image in memory
 
-        return {f"{date}.png": img_bytes_io.getvalue()}  # Return image in memory
+        extension = IMAGE_FORMATS[image_format][0]
+        image, thumbnail = render_fcc(
+            false_color,
+            band_transform,
+            aoi.to_crs(band_crs).geometry,
+            title=title,
+            image_format=image_format,
+            size=image_size,
+            thumbnail_size=thumbnail_size,
+        )
+        thumbnails = {} if thumbnail is None else {f"{date}_thumb{extension}": thumbnail}
+        return {f"{date}{extension}": image}, thumbnails  # Return images in memory
 
     # Fetch Landsat and Sentinel-2 images
-    images = {}
-    
-    landsat_catalog = Client.open("https://planetarycomputer.microsoft.com/api/stac/v1")
-    landsat_time_range = "2000-01-01/2016-12-31"
-    landsat_search = landsat_catalog.search(
-        collections=["landsat-c2-l2"],
-        intersects=buffr_aoi_gdf.to_crs("epsg:4326").geometry.iloc[0],
-        datetime=landsat_time_range,
-        query={"platform": {"neq": "landsat-7"}}
+    images, thumbnails = {}, {}
+    scenes = select_fcc_scenes(buffr_aoi_gdf)
+    masked_scenes = read_fcc_scenes(
+        scenes, buffr_aoi_gdf, max_workers, timeout, signer, chip_cache, image_size, plan
     )
-    landsat_items = landsat_search.item_collection()
-    selected_landsat_items = sorted(
-        [item for item in landsat_items if item.properties['eo:cloud_cover'] < 10], 
-        key=lambda img: img.properties['eo:cloud_cover']
-    )[:1]  # Take the best image
-
-    sentinel_catalog = Client.open("https://planetarycomputer.microsoft.com/api/stac/v1")
-    sentinel_time_range = "2018-01-01/2024-12-31"
-    sentinel_search = sentinel_catalog.search(
-        collections=["sentinel-2-l2a"],
-        intersects=buffr_aoi_gdf.to_crs("epsg:4326").geometry.iloc[0],
-        datetime=sentinel_time_range
-    )
-    sentinel_items = sentinel_search.item_collection()
-    selected_sentinel_items = sorted(
-        [item for item in sentinel_items if item.properties['eo:cloud_cover'] < 10], 
-        key=lambda img: img.properties['eo:cloud_cover']
-    )[:1]
 
     # Process images
-    for item in selected_landsat_items:
-        bands = {
-            "nir": planetary_computer.sign(item.assets['nir08'].href),
-            "red": planetary_computer.sign(item.assets['red'].href),
-            "green": planetary_computer.sign(item.assets['green'].href),
-        }
-        images.update(process_and_return_image(item, bands, "FCC Image Landsat", aoi))
-
-    for item in selected_sentinel_items:
-        bands = {
-            "nir": planetary_computer.sign(item.assets['B08'].href),
-            "red": planetary_computer.sign(item.assets['B04'].href),
-            "green": planetary_computer.sign(item.assets['B03'].href),
-        }
-        images.update(process_and_return_image(item, bands, "FCC Image Sentinel-2", aoi))
+    for item, masked_bands, band_transform, band_crs, title_prefix in masked_scenes:
+        scene_images, scene_thumbnails = process_and_return_image(
+            item, masked_bands, band_transform, band_crs, title_prefix, aoi
+        )
+        images.update(scene_images)
+        thumbnails.update(scene_thumbnails)
 
-    return images  # Return dictionary of {filename: image_bytes}
+    return images, thumbnails
@@ -1,39 +1,34 @@
 import json
-import os
-import geopandas as gpd
-import pandas as pd
-from aquaexchange.buffer import buffer_ponds
-from aquaexchange.search_stac_images import search_stac_images
-from aquaexchange.calculate_indices import process_nwi
-from aquaexchange.find_previous_lulc import assign_previous_lulc_class
+from aquaexchange.geojson_maker import farm_geodataframe
+from aquaexchange.pipeline import analyse_ponds
+from aquaexchange.run_context import RunContext
 
-DATA_DIR = "data"
-os.makedirs(DATA_DIR, exist_ok=True)
-
-def process_initial_data(farm_json):
+def process_initial_data(farm_json, ctx=None, debug=False):
     """
-    Processes farm data and saves the JSON output in data/.
+    Processes farm data and saves the JSON output in the run workspace.
+
+    Stages (GeoJSON, Landsat search, NWI, LULC) pass data in memory;
+    intermediate GeoJSONs are only written with ``debug=True``. NWI runs on
+    the ponds as drawn, without any buffer.
+
+    Parameters:
+    - farm_json (dict): Farm in the input JSON format.
+    - ctx (RunContext, optional): Workspace of the run. A new one is created if omitted.
+    - debug (bool): Write the intermediate GeoJSONs into the workspace.
+
+    Returns:
+    - dict: Structured output with the NWI change year and previous class of every pond.
     """
     farm_id = farm_json.get("farmid", "Unknown")
-    
-    # (Processing steps remain unchanged...)
-
-    final_output = {
-        "farmid": farm_id,
-        "noofponds": len(gdf),
-        "ponds": []
-    }
+    ctx = RunContext(farm_id) if ctx is None else ctx
 
-    for _, row in merged_df.iterrows():
-        final_output["ponds"].append({
-            "id": row["pond_id"],
-            "Probable Year of Change": row.get("nwi_first_year", "no data"),
-            "Previous Class": row.get("lulc_class", "no data"),
-            "Present Class": "Pond"
-        })
+    ponds = farm_geodataframe(farm_json)
+    final_output = {"farmid": farm_id}
+    final_output.update(
+        analyse_ponds(ponds, buffer_distance=0, debug_dir=ctx.geojson_dir if debug else None, farm_id=farm_id)
+    )
 
-    # ✅ Save JSON output inside data/
-    output_path = os.path.join(DATA_DIR, "output_main_1.json")
+    output_path = ctx.path("output_main_1.json")
     with open(output_path, "w") as f:
         json.dump(final_output, f, indent=4)
 
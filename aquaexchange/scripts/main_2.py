@@ -1,39 +1,35 @@
 import json
-import os
-from aquaexchange.geojson_maker import create_geojson
-from aquaexchange.merge_geojson import merge_geojson
-from aquaexchange.satellite_imagery_processor import process_satellite_imagery
-from aquaexchange.image_uploader import upload_bytes_to_azure, generate_sas_url
+from aquaexchange.geojson_maker import farm_geodataframe
+from aquaexchange.pipeline import farm_images
+from aquaexchange.run_context import RunContext
 
-DATA_DIR = "data"
-GEOJSON_DIR = os.path.join(DATA_DIR, "geojsons")
-MERGED_DIR = os.path.join(DATA_DIR, "merged_geojsons")
+def process_farm_data(farm_json, ctx=None, debug=False):
+    """
+    Renders and uploads the farm's false colour images.
 
-def process_farm_data(farm_json):
-    print("Processing farm data...")
+    The merged farm boundary is handed to the imagery stage in memory;
+    intermediate GeoJSONs are only written with ``debug=True``.
 
-    os.makedirs(GEOJSON_DIR, exist_ok=True)
-    os.makedirs(MERGED_DIR, exist_ok=True)
+    Parameters:
+    - farm_json (dict): Farm in the input JSON format.
+    - ctx (RunContext, optional): Workspace of the run. A new one is created if omitted.
+    - debug (bool): Write the intermediate GeoJSONs into the workspace.
 
-    create_geojson(farm_json, output_dir=GEOJSON_DIR)
-    farm_id = farm_json["farmid"]
-    input_geojson = os.path.join(GEOJSON_DIR, f"{farm_id}.geojson")
+    Returns:
+    - dict: {"images": [image URLs], "thumbnails": [thumbnail URLs]}
+    """
+    print("Processing farm data...")
 
-    merged_geojson_path = merge_geojson(input_geojson, MERGED_DIR)
+    farm_id = farm_json["farmid"]
+    ctx = RunContext(farm_id) if ctx is None else ctx
 
     print(f"Processing satellite imagery for {farm_id}...")
-    image_dict = process_satellite_imagery(merged_geojson_path)
-
-    azure_urls = []
-    for filename, image_bytes in image_dict.items():
-        blob_name = upload_bytes_to_azure("opensource-product", filename, image_bytes)
-        if blob_name:
-            azure_urls.append(generate_sas_url("opensource-product", blob_name))
+    ponds = farm_geodataframe(farm_json)
+    output = farm_images(ponds, debug_dir=ctx.merged_dir if debug else None)
 
-    output = {"images": azure_urls}
-    
-    with open(os.path.join(DATA_DIR, "output_main_2.json"), "w") as f:
+    output_path = ctx.path("output_main_2.json")
+    with open(output_path, "w") as f:
         json.dump(output, f, indent=4)
 
-    print("Saved processed JSON to output_main_2.json")
+    print(f"Saved processed JSON to {output_path}")
     return output
@@ -0,0 +1,55 @@
+import sys
+from aquaexchange.buffer import buffer_ponds
+from aquaexchange.search_stack_images import search_stac_images_by_pond
+from aquaexchange.calculate_indices import read_scenes
+from aquaexchange.satellite_imagery_processor import buffered_aoi, select_fcc_scenes, read_fcc_scenes
+from aquaexchange.merge_geojson import merge_ponds
+from aquaexchange.fetch_plan import plan_farm_reads
+from aquaexchange.pipeline import BUFFER_DISTANCE, pond_scene_items
+from aquaexchange.chip_cache import default_chip_cache
+from aquaexchange.utils import to_geodataframe
+
+def prefetch_farm(geojson_path, chip_cache=None):
+    """
+    Warms the chip cache with every band window a pipeline run reads for one farm.
+
+    Windows are derived exactly as in ``pipeline.run_farm`` (inward buffer,
+    per-pond search, fetch plan), so the chip keys match those of the run.
+
+    Parameters:
+    - geojson_path (str | GeoDataFrame): The farm's ponds, as a GeoJSON path or a GeoDataFrame.
+    - chip_cache (ChipCache, optional): Cache to warm. Defaults to the process-wide cache.
+    """
+    ponds = to_geodataframe(geojson_path)
+    buffered = buffer_ponds(ponds, BUFFER_DISTANCE)
+    items = pond_scene_items(search_stac_images_by_pond(buffered))
+    plan = plan_farm_reads(ponds, buffered, items, chip_cache=chip_cache)
+
+    # NWI windows: every candidate scene over the buffered ponds
+    read_scenes(items, buffered, chip_cache=chip_cache, plan=plan)
+
+    # Imagery windows: the buffered box of the best Landsat and Sentinel-2 scene
+    _, buffr_aoi_gdf = buffered_aoi(merge_ponds(ponds))
+    read_fcc_scenes(select_fcc_scenes(buffr_aoi_gdf), buffr_aoi_gdf, chip_cache=chip_cache, plan=plan)
+
+def prefetch_farms(geojson_paths, chip_cache=None):
+    """
+    Warms the chip cache for a list of farm GeoJSONs ahead of a batch.
+
+    Parameters:
+    - geojson_paths (list): Paths of the farm GeoJSON files.
+    - chip_cache (ChipCache, optional): Cache to warm. Defaults to the process-wide cache.
+    """
+    chip_cache = default_chip_cache() if chip_cache is None else chip_cache
+    for geojson_path in geojson_paths:
+        print(f"Prefetching chips for {geojson_path}...")
+        prefetch_farm(geojson_path, chip_cache)
+
+    if chip_cache is not None:
+        print(f"Chip cache: {chip_cache.stats()}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python prefetch_chips.py <farm.geojson> [<farm.geojson> ...]")
+    else:
+        prefetch_farms(sys.argv[1:])
@@ -0,0 +1,13 @@
+import json
+import sys
+from aquaexchange.batch_runner import run_batch
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python run_batch.py <path_to_farms_json> <output_dir> [max_workers]")
+    else:
+        with open(sys.argv[1], "r") as f:
+            farm_data = json.load(f)
+        max_workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        outputs = run_batch(farm_data, sys.argv[2], max_workers)
+        print(f"Batch completed: {len(outputs)} farms processed.")
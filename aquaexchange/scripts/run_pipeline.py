@@ -1,70 +1,89 @@
+import argparse
 import json
-import os
-import shutil
-from scripts.main_1 import process_initial_data
-from scripts.main_2 import process_farm_data
-from aquaexchange.combine_outputs import combine_results
+from aquaexchange.checkpoints import STAGES, Checkpointer
+from aquaexchange.metrics import configure_logging, enable_metrics, metrics
+from aquaexchange.pipeline import run_farm
+from aquaexchange.run_context import RunContext
 
-DATA_DIR = "data"
-
-def cleanup_intermediate_files():
+def cleanup_intermediate_files(ctx):
     """
-    Deletes intermediate GeoJSON and temporary files while keeping input JSON,
-    final output JSON, and essential files (.tif, .xml).
+    Deletes the run's intermediate GeoJSON and image files while keeping its
+    JSON outputs. Other runs and shared inputs under data/ are never touched.
+
+    Parameters:
+    - ctx (RunContext): Workspace of the run.
     """
-    for root, dirs, files in os.walk(DATA_DIR, topdown=False):
-        for file in files:
-            if not (file.endswith(".json") or file.endswith(".tif") or file.endswith(".xml")):
-                os.remove(os.path.join(root, file))
-        for dir in dirs:
-            if dir in ["geojsons", "merged_geojsons", "images"]:
-                shutil.rmtree(os.path.join(root, dir), ignore_errors=True)
+    ctx.cleanup(keep_outputs=True)
 
-def run_pipeline(farm_json_path):
+def run_pipeline(farm_json_path, base_dir=None, keep_intermediate=False, checkpoint_dir=None, force_stages=()):
     """
     Executes the full processing pipeline for a given farm JSON input.
-    
+
+    Every call works in its own RunContext workspace, so several pipelines
+    can run at the same time. Each stage is checkpointed per farm: a re-run
+    reuses the stages whose inputs and parameters are unchanged and resumes
+    at the first one that is not.
+
     Parameters:
     - farm_json_path (str): Path to the input farm JSON file.
-    
+    - base_dir (str, optional): Parent of the run workspace. Defaults to RUNS_DIR.
+    - keep_intermediate (bool): Write the intermediate GeoJSONs into the workspace
+      and keep them, for debugging. Stages otherwise pass data in memory.
+    - checkpoint_dir (str, optional): Root of the checkpoints. Defaults to CHECKPOINT_DIR.
+    - force_stages (iterable): Stages to recompute even if their checkpoint is valid.
+
     Returns:
-    - None
+    - dict: Final structured output.
     """
     # Load the input JSON
     with open(farm_json_path, "r") as f:
         farm_json = json.load(f)
 
-    # Step 1: Process initial data (buffering, Landsat search, NWI, LULC)
-    initial_results = process_initial_data(farm_json)
+    farm_id = farm_json.get("farmid", "Unknown")
+    ctx = RunContext(farm_id, base_dir)
+    checkpoints = Checkpointer.for_farm(farm_id, checkpoint_dir, force_stages)
 
-    # Save intermediate structured output
-    initial_output_path = os.path.join(DATA_DIR, "initial_output.json")
-    with open(initial_output_path, "w") as f:
-        json.dump(initial_results, f, indent=4)
+    # GeoJSON, buffering, Landsat search, NWI, LULC, imagery, upload and combine
+    final_results = run_farm(
+        farm_json,
+        debug_dir=ctx.geojson_dir if keep_intermediate else None,
+        checkpoints=checkpoints,
+    )
 
-    # Step 2: Process farm data (GeoJSON conversion, merging, satellite processing)
-    satellite_results = process_farm_data(farm_json)
-
-    # Save another intermediate structured output
-    satellite_output_path = os.path.join(DATA_DIR, "satellite_output.json")
-    with open(satellite_output_path, "w") as f:
-        json.dump(satellite_results, f, indent=4)
-
-    # Step 3: Combine results into a final output JSON
-    final_results = combine_results(initial_results, satellite_results)
-
-    final_output_path = os.path.join(DATA_DIR, "final_output.json")
+    final_output_path = ctx.path("final_output.json")
     with open(final_output_path, "w") as f:
         json.dump(final_results, f, indent=4)
 
-    # Cleanup intermediate files
-    cleanup_intermediate_files()
+    # Record which stages were reused and which were recomputed
+    with open(ctx.path("checkpoint_report.json"), "w") as f:
+        json.dump(checkpoints.report, f, indent=4)
+    print(checkpoints.summary())
+
+    # Cleanup this run's intermediate files
+    if not keep_intermediate:
+        cleanup_intermediate_files(ctx)
 
     print(f"Pipeline completed. Final output saved at: {final_output_path}")
+    return final_results
 
 if __name__ == "__main__":
-    import sys
-    if len(sys.argv) < 2:
-        print("Usage: python run_pipeline.py <path_to_farm_json>")
-    else:
-        run_pipeline(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Run the AquaExchange pipeline for one farm.")
+    parser.add_argument("farm_json", help="Path to the farm JSON file.")
+    parser.add_argument("--runs-dir", help="Parent directory of the run workspace.")
+    parser.add_argument("--checkpoint-dir", help="Root directory of the stage checkpoints.")
+    parser.add_argument("--force-stage", action="append", default=[], choices=STAGES,
+                        help="Recompute this stage even if its checkpoint is valid (repeatable).")
+    parser.add_argument("--keep-intermediate", action="store_true", help="Keep the intermediate GeoJSONs.")
+    parser.add_argument("--metrics", help="Write a JSON run report here, and <path>.prom in Prometheus format.")
+    parser.add_argument("--log-level", default="INFO", help="Logging level, e.g. DEBUG for per-pond details.")
+    parser.add_argument("--log-json", action="store_true", help="Log one JSON object per line.")
+    args = parser.parse_args()
+
+    configure_logging(args.log_level.upper(), args.log_json)
+    if args.metrics:
+        enable_metrics()
+    run_pipeline(args.farm_json, args.runs_dir, args.keep_intermediate, args.checkpoint_dir, args.force_stage)
+    if args.metrics:
+        metrics.save_report(args.metrics)
+        with open(args.metrics + ".prom", "w") as f:
+            f.write(metrics.to_prometheus())
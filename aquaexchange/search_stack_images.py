@@ -1,6 +1,36 @@
-from pystac_client import Client
+import numpy as np
+import shapely
 from shapely.geometry import shape
-from datetime import datetime
+from .stac_cache import search_items
+
+# Time range for image search
+TIME_RANGE = "1999-05-01/2024-12-31"
+
+def _item_years_and_clouds(items):
+    # pystac parses the datetime, with or without fractional seconds
+    years = [item.datetime.year for item in items]
+    clouds = [item.properties["eo:cloud_cover"] for item in items]
+    return years, clouds
+
+def _select_by_year(indices, items, years, clouds, cloud_cover_threshold):
+    """
+    Groups the given items by year and keeps the (max 5) lowest cloud cover ones per year.
+    """
+    # Organize items by year
+    items_by_year = {}
+    for i in indices:
+        items_by_year.setdefault(years[i], []).append(i)
+
+    # Select images with the lowest cloud cover (max 5 per year)
+    selected_items_by_year = {}
+    for year, candidates in items_by_year.items():
+        selected = [i for i in candidates if clouds[i] <= cloud_cover_threshold]
+
+        if selected:
+            selected.sort(key=lambda i: clouds[i])
+            selected_items_by_year[year] = [items[i] for i in selected[:5]]  # Keep max 5 per year
+
+    return selected_items_by_year
 
 def search_stac_images(aoi, cloud_cover_threshold=20, collections=None):
     """
@@ -14,45 +44,61 @@ def search_stac_images(aoi, cloud_cover_threshold=20, collections=None):
     Returns:
         dict: Dictionary of images grouped by year.
     """
-    catalog = Client.open("https://planetarycomputer.microsoft.com/api/stac/v1")
-
-    # Define the time range for image search
-    time_range = "1999-05-01/2024-12-31"
-
     # Default collections if none are provided
     if collections is None:
         collections = ["landsat-c2-l2", "sentinel-2-l2a"]
 
-    # Perform the search
-    search = catalog.search(
-        collections=collections,
-        intersects=aoi.geometry.iloc[0],
-        datetime=time_range,
-    )
+    # Perform the search (served from the on-disk cache when possible)
+    geom = aoi.geometry.iloc[0]
+    items = search_items(collections, geom, TIME_RANGE)
 
-    # Fetch all items
-    items = search.item_collection()
+    # Filter items that fully cover the AOI, with one bulk predicate
+    footprints = np.array([shape(item.geometry) for item in items], dtype=object)
+    fully_covering = np.flatnonzero(shapely.contains(footprints, geom)) if len(items) else []
 
-    # Filter items that fully cover the AOI
-    fully_covering_items = [
-        item for item in items if shape(item.geometry).contains(aoi.geometry.iloc[0])
-    ]
+    years, clouds = _item_years_and_clouds(items)
+    return _select_by_year(fully_covering, items, years, clouds, cloud_cover_threshold)
 
-    # Organize items by year
-    items_by_year = {}
-    for item in fully_covering_items:
-        year = datetime.strptime(item.properties["datetime"], "%Y-%m-%dT%H:%M:%S.%fZ").year
-        if year not in items_by_year:
-            items_by_year[year] = []
-        items_by_year[year].append(item)
+def search_stac_images_by_pond(ponds_gdf, cloud_cover_threshold=20, collections=None):
+    """
+    Runs one search for all ponds and assigns each image to every pond it fully covers.
 
-    # Select images with the lowest cloud cover (max 5 per year)
-    selected_items_by_year = {}
-    for year, images in items_by_year.items():
-        selected_images = [img for img in images if img.properties["eo:cloud_cover"] <= cloud_cover_threshold]
-        
-        if selected_images:
-            selected_images.sort(key=lambda img: img.properties["eo:cloud_cover"])
-            selected_items_by_year[year] = selected_images[:5]  # Keep max 5 per year
+    The search uses the bounds of all ponds; images are matched to ponds with
+    a single STRtree query instead of a per-item containment loop.
 
-    return selected_items_by_year
+    Args:
+        ponds_gdf (GeoDataFrame): Pond polygons in EPSG:4326 with 'pond_id'.
+        cloud_cover_threshold (int): Maximum allowable cloud cover percentage.
+        collections (list, optional): List of STAC collections to search. Defaults to Landsat and Sentinel.
+
+    Returns:
+        dict: {pond_id: {year: [items]}}, years in chronological order, max 5 images
+        with the lowest cloud cover per pond and year.
+    """
+    if collections is None:
+        collections = ["landsat-c2-l2", "sentinel-2-l2a"]
+
+    pond_geoms = np.asarray(ponds_gdf.geometry.values, dtype=object)
+    search_area = shapely.box(*shapely.total_bounds(pond_geoms))
+    items = search_items(collections, search_area, TIME_RANGE)
+
+    pond_ids = ponds_gdf["pond_id"].tolist()
+    if not items:
+        return {pond_id: {} for pond_id in pond_ids}
+
+    # (pond, item) pairs where the pond lies within the item footprint
+    footprints = np.array([shape(item.geometry) for item in items], dtype=object)
+    pond_index, item_index = shapely.STRtree(footprints).query(pond_geoms, predicate="within")
+
+    order = np.lexsort((item_index, pond_index))
+    pond_index, item_index = pond_index[order], item_index[order]
+    splits = np.flatnonzero(np.diff(pond_index)) + 1
+
+    years, clouds = _item_years_and_clouds(items)
+    items_by_pond = {pond_id: {} for pond_id in pond_ids}
+    for ponds, matches in zip(np.split(pond_index, splits), np.split(item_index, splits)):
+        if ponds.size == 0:
+            continue
+        selected = _select_by_year(matches, items, years, clouds, cloud_cover_threshold)
+        items_by_pond[pond_ids[ponds[0]]] = dict(sorted(selected.items()))
+    return items_by_pond
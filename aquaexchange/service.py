@@ -0,0 +1,334 @@
+"""
+HTTP service running the pipeline as background jobs.
+
+    POST /jobs                 submit a farm (input JSON format), returns a job id
+    GET  /jobs/{job_id}        poll the job status and, once done, its result
+    GET  /jobs/{job_id}/stream server-sent events until the job finishes
+    GET  /stats                queue depth, throughput and latency
+    GET  /metrics              pipeline metrics in Prometheus text format
+
+Jobs wait in a bounded queue; when it is full, submissions are rejected with
+503 and a Retry-After header. A fixed pool of workers drains the queue. A
+worker takes every farm queued at that moment (up to BATCH_SIZE), groups
+the ones that share Landsat and Sentinel-2 scenes, and runs NWI for each
+group with one read per scene.
+
+STAC and storage come from the usual configuration, so the service runs
+locally against a static catalog (AQUAEXCHANGE_STAC_URL=<catalog.json>)
+and a LocalFileBackend (AQUAEXCHANGE_STORAGE_DIR=<dir>):
+
+    python -m aquaexchange.service
+"""
+
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+import numpy as np
+import shapely
+from fastapi import Body, FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from .batch_runner import cluster_farms, cluster_nwi
+from .combine_outputs import build_pond_records, combine_results
+from .find_previous_lulc import assign_previous_lulc_class, get_registry
+from .geojson_maker import farm_geodataframe
+from .image_uploader import get_storage_backend
+from .metrics import metrics
+from .pipeline import farm_images, record_nwi
+
+# Worker threads processing jobs
+SERVICE_WORKERS = int(os.getenv("AQUAEXCHANGE_SERVICE_WORKERS", "2"))
+
+# Jobs that may wait in the queue before submissions are rejected
+MAX_QUEUED_JOBS = int(os.getenv("AQUAEXCHANGE_MAX_QUEUED_JOBS", "64"))
+
+# Most farms a worker takes from the queue at once
+BATCH_SIZE = int(os.getenv("AQUAEXCHANGE_BATCH_SIZE", "16"))
+
+# Finished jobs kept for polling; the oldest are forgotten first
+JOB_RETENTION = 10000
+
+# Seconds between status events of a stream
+STREAM_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    """One submitted farm and its progress."""
+
+    def __init__(self, farm):
+        self.id = uuid.uuid4().hex
+        self.farm = farm
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        job = {"job_id": self.id, "farmid": self.farm.get("farmid"), "status": self.status}
+        if self.result is not None:
+            job["result"] = self.result
+        if self.error is not None:
+            job["error"] = self.error
+        if self.finished is not None:
+            job["latency"] = round(self.finished - self.submitted, 3)
+        return job
+
+def process_group(farms, backend=None, registry=None):
+    """
+    Runs the pipeline for farms that share scenes, reading each scene once for all of them.
+
+    NWI goes through ``cluster_nwi``, which buffers the ponds like ``run_farm``,
+    so a farm gets the same results as from the command-line pipeline.
+
+    Args:
+        farms (list): Farms in the input JSON format.
+        backend (StorageBackend, optional): Image destination.
+        registry (LulcRegistry, optional): LULC epochs.
+
+    Returns:
+        list: Final structured output per farm (see ``combine_results``), in input order.
+    """
+    backend = get_storage_backend() if backend is None else backend
+    registry = get_registry() if registry is None else registry
+
+    farm_gdfs = [farm_geodataframe(farm) for farm in farms]
+    results = []
+    for farm, ponds, nwi_df in zip(farms, farm_gdfs, cluster_nwi(farm_gdfs)):
+        record_nwi(farm.get("farmid", "Unknown"), nwi_df)
+        with metrics.stage("lulc"):
+            lulc_df = assign_previous_lulc_class(ponds, nwi_df, registry=registry)
+        initial_results = {
+            "farmid": farm.get("farmid", "Unknown"),
+            "noofponds": len(ponds),
+            "ponds": build_pond_records(nwi_df, lulc_df),
+        }
+        results.append(combine_results(initial_results, farm_images(ponds, backend)))
+    return results
+
+class JobManager:
+    """
+    Bounded job queue drained by a fixed pool of worker threads.
+
+    Args:
+        workers (int, optional): Worker threads. Defaults to SERVICE_WORKERS.
+        max_queued (int, optional): Queue capacity. Defaults to MAX_QUEUED_JOBS.
+        batch_size (int, optional): Most farms a worker takes at once. Defaults to BATCH_SIZE.
+        process_fn (callable, optional): Runs a group of farms sharing scenes; defaults to
+            ``process_group``.
+    """
+
+    def __init__(self, workers=None, max_queued=None, batch_size=None, process_fn=None):
+        self.workers = SERVICE_WORKERS if workers is None else workers
+        self.batch_size = BATCH_SIZE if batch_size is None else batch_size
+        self.process_fn = process_group if process_fn is None else process_fn
+        self._queue = queue.Queue(MAX_QUEUED_JOBS if max_queued is None else max_queued)
+        self._jobs = OrderedDict()
+        self._latencies = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._stop = threading.Event()
+        self.started = time.time()
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+
+    def start(self):
+        self._stop.clear()
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, farm):
+        """Queues a farm; raises queue.Full when the queue is at capacity."""
+        job = Job(farm)
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.rejected += 1
+                raise
+            self._jobs[job.id] = job
+            while len(self._jobs) > JOB_RETENTION:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.finished is None:
+                    break
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _take_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _groups(self, batch):
+        if len(batch) == 1:
+            return [batch]
+        geometries = [
+            shapely.union_all(np.asarray(farm_geodataframe(job.farm).geometry.values)) for job in batch
+        ]
+        return [[batch[i] for i in members] for members in cluster_farms(geometries).values()]
+
+    def _work(self):
+        while not self._stop.is_set():
+            batch = self._take_batch()
+            if not batch:
+                continue
+            try:
+                groups = self._groups(batch)
+            except Exception as e:
+                logger.warning("Could not group %d farms by scene, processing them one by one: %s", len(batch), e)
+                groups = [[job] for job in batch]
+            for group in groups:
+                self._run(group)
+
+    def _run(self, group):
+        started = time.time()
+        for job in group:
+            job.status, job.started = "running", started
+        try:
+            results = self.process_fn([job.farm for job in group])
+            error = None
+        except Exception as e:
+            logger.exception("Group of %d farms failed", len(group))
+            results, error = [None] * len(group), str(e)
+
+        finished = time.time()
+        with self._lock:
+            self.batches += 1
+            for job, result in zip(group, results):
+                job.result, job.error = result, error
+                job.status = "failed" if error else "done"
+                job.finished = finished  # Set last: streams stop once it is set
+                if error:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                    self._latencies.append(finished - job.submitted)
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self._latencies, dtype=float)
+            elapsed = time.time() - self.started
+            stats = {
+                "queued": self._queue.qsize(),
+                "capacity": self._queue.maxsize,
+                "workers": self.workers,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "batches": self.batches,
+                "throughput_per_min": round(60 * self.completed / elapsed, 3) if elapsed else 0.0,
+            }
+        if latencies.size:
+            stats["latency_p50"] = round(float(np.percentile(latencies, 50)), 3)
+            stats["latency_p95"] = round(float(np.percentile(latencies, 95)), 3)
+        return stats
+
+def create_app(manager=None):
+    """
+    Builds the FastAPI application around a JobManager.
+
+    Args:
+        manager (JobManager, optional): Job queue and workers. Defaults to a new JobManager.
+
+    Returns:
+        FastAPI: The application; workers run while it is being served.
+    """
+    manager = JobManager() if manager is None else manager
+
+    @asynccontextmanager
+    async def lifespan(app):
+        manager.start()
+        yield
+        manager.stop()
+
+    app = FastAPI(title="AquaExchange", lifespan=lifespan)
+    app.state.manager = manager
+
+    @app.post("/jobs", status_code=202)
+    def submit_job(farm: dict = Body(...)):
+        if not farm.get("farmid") or not farm.get("ponds"):
+            raise HTTPException(status_code=422, detail="Farm JSON needs 'farmid' and 'ponds'.")
+        try:
+            job = manager.submit(farm)
+        except queue.Full:
+            return JSONResponse(
+                {"detail": "Job queue is full, retry later."}, status_code=503, headers={"Retry-After": "5"}
+            )
+        return job.to_dict()
+
+    @app.get("/jobs/{job_id}")
+    def get_job(job_id: str):
+        job = manager.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+        return job.to_dict()
+
+    @app.get("/jobs/{job_id}/stream")
+    async def stream_job(job_id: str):
+        job = manager.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+
+        async def events():
+            status = None
+            while True:
+                finished = job.finished is not None
+                if job.status != status:
+                    status = job.status
+                    yield f"event: {status}\ndata: {json.dumps(job.to_dict())}\n\n"
+                if finished:
+                    return
+                await asyncio.sleep(STREAM_INTERVAL)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    def get_stats():
+        return manager.stats()
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def get_metrics():
+        # Pipeline metrics in the Prometheus text format (empty unless AQUAEXCHANGE_METRICS=1)
+        return metrics.to_prometheus()
+
+    return app
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host=os.getenv("AQUAEXCHANGE_SERVICE_HOST", "127.0.0.1"),
+        port=int(os.getenv("AQUAEXCHANGE_SERVICE_PORT", "8000")),
+    )
@@ -0,0 +1,161 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, parse_qsl, urlencode, urlparse, urlsplit, urlunsplit
+from .metrics import metrics
+
+# Tokens are renewed this long before they expire
+EXPIRY_MARGIN = timedelta(minutes=5)
+
+# Storage account of public thumbnails, which planetary_computer.sign leaves unsigned
+PUBLIC_ASSETS_NETLOC = "ai4edatasetspublicassets.blob.core.windows.net"
+
+def fetch_container_token(account, container):
+    """
+    Requests a read SAS token for a storage container with ``planetary_computer``.
+
+    Args:
+        account (str): Storage account name.
+        container (str): Container name.
+
+    Returns:
+        tuple: (token, expiry as an aware UTC datetime).
+    """
+    # Imported here: planetary_computer is slow to import and only needed for remote assets
+    from planetary_computer.sas import get_token
+
+    sas_token = get_token(account, container)
+    return sas_token.token, sas_token.expiry
+
+def blob_container(href):
+    """
+    (storage account, container) of a URL ``planetary_computer.sign`` would sign, or None.
+
+    URLs outside Azure Blob Storage, public thumbnails and URLs that already
+    carry a SAS token are left unsigned, as by ``planetary_computer.sign``.
+    """
+    parsed = urlparse(href.rstrip("/"))
+    if not parsed.netloc.endswith(".blob.core.windows.net") or parsed.netloc == PUBLIC_ASSETS_NETLOC:
+        return None
+    if set(parse_qs(parsed.query)) & {"st", "se", "sp"}:
+        return None
+
+    from planetary_computer.utils import parse_blob_url
+
+    return parse_blob_url(parsed)
+
+def add_token(href, token):
+    """
+    Appends a SAS token to the query string of a URL.
+
+    Parameters already in the URL are kept; those also present in the token
+    (e.g. an expired signature) take the token's value.
+    """
+    parts = urlsplit(href)
+    params = dict(parse_qsl(parts.query, keep_blank_values=True))
+    params.update(parse_qsl(token, keep_blank_values=True))
+    return urlunsplit(parts._replace(query=urlencode(params)))
+
+class SigningCache:
+    """
+    Thread-safe cache of ``planetary_computer`` SAS tokens keyed by storage container.
+
+    URLs are signed as by ``planetary_computer.sign``, but a token is looked
+    up once per storage account and container and reused until shortly before
+    it expires. ``hits`` and ``misses`` count token lookups, so ``misses`` is
+    the number of calls made to the token endpoint.
+
+    Args:
+        token_fn (callable): ``token_fn(account, container) -> (token, expiry)``.
+            Defaults to ``planetary_computer.sas.get_token``; tests can pass a fake.
+        margin (timedelta): Renew tokens this long before expiry.
+    """
+
+    def __init__(self, token_fn=fetch_container_token, margin=EXPIRY_MARGIN):
+        self._token_fn = token_fn
+        self._margin = margin
+        self._tokens = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def token(self, account, container):
+        """Returns a valid token for a storage container, fetching one if needed."""
+        now = datetime.now(timezone.utc)
+        # The lock is held while fetching so concurrent callers share one request
+        with self._lock:
+            cached = self._tokens.get((account, container))
+            if cached is not None and cached[1] - self._margin > now:
+                self.hits += 1
+                return cached[0]
+
+            self.misses += 1
+            metrics.increment("sign_token_requests")
+            token, expiry = self._token_fn(account, container)
+            self._tokens[(account, container)] = (token, expiry)
+            return token
+
+    def sign_href(self, href, collection=None):
+        """
+        Signs one asset URL; URLs ``planetary_computer.sign`` leaves alone are returned unchanged.
+
+        ``collection`` is accepted for callers that pass the asset's collection;
+        tokens are scoped to the storage container of the URL.
+        """
+        container = blob_container(href)
+        if container is None:
+            return href
+        metrics.increment("sign_calls")
+        return add_token(href, self.token(*container))
+
+    def sign_item(self, item, asset_keys=None):
+        """
+        Signs the assets of an item, with one token lookup per storage container.
+
+        Args:
+            item (pystac.Item): Item to sign; it is not modified.
+            asset_keys (iterable, optional): Assets to sign. Defaults to all assets.
+
+        Returns:
+            dict: {asset_key: signed_href}, in ``asset_keys`` order.
+
+        Raises:
+            KeyError: If the item lacks one of ``asset_keys``.
+        """
+        asset_keys = list(item.assets) if asset_keys is None else list(asset_keys)
+        hrefs = {key: item.assets[key].href for key in asset_keys}
+
+        tokens = {}
+        signed = {}
+        for key, href in hrefs.items():
+            container = blob_container(href)
+            if container is None:
+                signed[key] = href
+                continue
+            if container not in tokens:
+                tokens[container] = self.token(*container)
+            metrics.increment("sign_calls")
+            signed[key] = add_token(href, tokens[container])
+        return signed
+
+    def stats(self):
+        """Returns {'hits': ..., 'misses': ..., 'containers': ["account/container", ...]}."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "containers": sorted(f"{account}/{container}" for account, container in self._tokens)}
+
+# Process-wide cache shared by process_nwi and process_satellite_imagery
+default_signing_cache = SigningCache()
+
+def sign_item(item, asset_keys=None, signer=None):
+    """
+    Signs the assets of an item using ``signer`` or the process-wide cache.
+    """
+    signer = default_signing_cache if signer is None else signer
+    return signer.sign_item(item, asset_keys)
+
+def sign_href(href, collection=None, signer=None):
+    """
+    Signs one asset URL using ``signer`` or the process-wide cache.
+    """
+    signer = default_signing_cache if signer is None else signer
+    return signer.sign_href(href, collection)
@@ -0,0 +1,220 @@
+import gzip
+import hashlib
+import json
+import operator
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+import pystac
+from pystac_client import Client
+from shapely import wkt
+from shapely.geometry import shape
+from .utils import CACHE_DIR
+from .metrics import metrics
+
+STAC_URL = os.getenv("AQUAEXCHANGE_STAC_URL", "https://planetarycomputer.microsoft.com/api/stac/v1")
+
+# Serve searches from the cache only, never from the network
+OFFLINE = os.getenv("AQUAEXCHANGE_STAC_OFFLINE", "0") == "1"
+
+# Results ending before January 1st of the year RECENT_DAYS ago are treated as
+# historic and cached forever; the recent tail expires after RECENT_TTL seconds.
+RECENT_DAYS = 180
+RECENT_TTL = 24 * 3600
+
+# Decimal places kept when hashing the search geometry
+GEOMETRY_PRECISION = 6
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+_QUERY_OPERATORS = {
+    "eq": operator.eq, "neq": operator.ne,
+    "lt": operator.lt, "lte": operator.le,
+    "gt": operator.gt, "gte": operator.ge,
+}
+
+class StaticCatalogClient:
+    """
+    Minimal stand-in for ``pystac_client.Client`` that searches a local static catalog.
+
+    Supports the ``collections``, ``intersects``, ``datetime`` and ``query``
+    (eq/neq/lt/lte/gt/gte) parameters used by this package.
+    """
+
+    def __init__(self, catalog_path):
+        self._items = list(pystac.Catalog.from_file(catalog_path).get_items(recursive=True))
+
+    def search(self, collections=None, intersects=None, datetime=None, query=None):
+        start, end = _parse_range(datetime) if datetime else (None, None)
+        aoi = shape(intersects) if isinstance(intersects, dict) else intersects
+        matches = []
+        for item in self._items:
+            if collections and item.collection_id not in collections:
+                continue
+            if aoi is not None and not shape(item.geometry).intersects(aoi):
+                continue
+            item_date = item.datetime.date() if item.datetime else None
+            if start and (item_date is None or item_date < start):
+                continue
+            if end and (item_date is None or item_date > end):
+                continue
+            if query and not _matches_query(item.properties, query):
+                continue
+            matches.append(item)
+        return _StaticSearch(matches)
+
+class _StaticSearch:
+    def __init__(self, items):
+        self._items = items
+
+    def item_collection(self):
+        return pystac.ItemCollection(self._items)
+
+def _matches_query(properties, query):
+    for name, conditions in query.items():
+        value = properties.get(name)
+        for op, expected in conditions.items():
+            if value is None or not _QUERY_OPERATORS[op](value, expected):
+                return False
+    return True
+
+def get_client(url=None):
+    """
+    Returns the STAC client for ``url``, opening it once per process.
+
+    A local path to a static ``catalog.json`` yields a ``StaticCatalogClient``.
+
+    Args:
+        url (str, optional): STAC API URL or catalog path. Defaults to STAC_URL.
+    """
+    url = STAC_URL if url is None else url
+    with _clients_lock:
+        if url not in _clients:
+            if os.path.exists(url):
+                _clients[url] = StaticCatalogClient(url)
+            else:
+                _clients[url] = Client.open(url)
+        return _clients[url]
+
+def _parse_range(datetime_range):
+    start, _, end = datetime_range.partition("/")
+    start = None if start in ("", "..") else date.fromisoformat(start[:10])
+    end = None if end in ("", "..") else date.fromisoformat(end[:10])
+    return start, end
+
+def _split_range(datetime_range, today=None):
+    """
+    Splits a date range into its historic part and its recent tail.
+
+    Returns:
+        list: (range string, ttl) pairs; ttl is None for historic segments.
+    """
+    today = date.today() if today is None else today
+    cutoff = date((today - timedelta(days=RECENT_DAYS)).year, 1, 1)
+    start, end = _parse_range(datetime_range)
+
+    if end is not None and end < cutoff:
+        return [(datetime_range, None)]
+
+    end_text = ".." if end is None else end.isoformat()
+    if start is not None and start >= cutoff:
+        return [(datetime_range, RECENT_TTL)]
+
+    start_text = ".." if start is None else start.isoformat()
+    historic_end = cutoff - timedelta(days=1)
+    return [
+        (f"{start_text}/{historic_end.isoformat()}", None),
+        (f"{cutoff.isoformat()}/{end_text}", RECENT_TTL),
+    ]
+
+def search_key(collections, intersects, datetime_range, query=None):
+    """
+    Cache key of a search: (collections, rounded AOI geometry, datetime range, query).
+    """
+    geometry = shape(intersects) if isinstance(intersects, dict) else intersects
+    geometry_hash = hashlib.sha256(
+        wkt.dumps(geometry, rounding_precision=GEOMETRY_PRECISION).encode()
+    ).hexdigest()
+    payload = {
+        "collections": sorted(collections),
+        "geometry": geometry_hash,
+        "datetime": datetime_range,
+        "query": query,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def _cache_path(cache_dir, key):
+    return os.path.join(cache_dir, "stac", f"{key}.json.gz")
+
+def _load(path, ttl):
+    if not os.path.exists(path):
+        return None
+    if ttl is not None and time.time() - os.path.getmtime(path) > ttl:
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [pystac.Item.from_dict(d) for d in json.load(f)]
+
+def _store(path, items):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first so concurrent runs never see partial files
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+        json.dump(
+            [item.to_dict(include_self_link=False, transform_hrefs=False) for item in items],
+            f, separators=(",", ":"),
+        )
+    os.replace(tmp_path, path)
+
+def search_items(collections, intersects, datetime_range, query=None, offline=None, cache_dir=None, url=None):
+    """
+    STAC search with an on-disk result cache.
+
+    The range is split into a historic part, cached forever, and a recent
+    tail that is re-fetched once older than RECENT_TTL.
+
+    Args:
+        collections (list): Collections to search.
+        intersects: AOI geometry in EPSG:4326 (Shapely geometry or GeoJSON dict).
+        datetime_range (str): "start/end" dates; either side may be "..".
+        query (dict, optional): STAC query extension filter.
+        offline (bool, optional): Serve purely from cache. Defaults to OFFLINE.
+        cache_dir (str, optional): Cache root. Defaults to CACHE_DIR.
+        url (str, optional): STAC API URL or static catalog path. Defaults to STAC_URL.
+
+    Returns:
+        list: pystac.Item objects, historic segment first, without duplicates.
+
+    Raises:
+        FileNotFoundError: In offline mode, if a segment is not cached.
+    """
+    offline = OFFLINE if offline is None else offline
+    cache_dir = CACHE_DIR if cache_dir is None else cache_dir
+
+    items, seen = [], set()
+    for segment, ttl in _split_range(datetime_range):
+        path = _cache_path(cache_dir, search_key(collections, intersects, segment, query))
+        segment_items = _load(path, ttl)
+
+        if segment_items is not None:
+            metrics.increment("stac_cache_hits")
+        else:
+            if offline:
+                raise FileNotFoundError(f"STAC search for {segment} is not cached ({path}).")
+            metrics.increment("stac_requests")
+            search = get_client(url).search(
+                collections=collections,
+                intersects=intersects,
+                datetime=segment,
+                query=query,
+            )
+            segment_items = list(search.item_collection())
+            _store(path, segment_items)
+
+        for item in segment_items:
+            if item.id not in seen:
+                seen.add(item.id)
+                items.append(item)
+    return items
@@ -1,6 +1,8 @@
 import os
 import json
-import geopandas as gpd
+
+# Root directory for on-disk caches (STAC results, ...)
+CACHE_DIR = os.getenv("AQUAEXCHANGE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "aquaexchange"))
 
 def ensure_directory_exists(directory):
     """
@@ -58,8 +60,32 @@ def load_geojson(filepath):
     Returns:
     - GeoDataFrame: Geospatial data.
     """
+    import geopandas as gpd
+
     return gpd.read_file(filepath)
 
+def to_geodataframe(source, crs="EPSG:4326"):
+    """
+    Returns pond geometries as a GeoDataFrame, whatever form they are passed in.
+
+    Parameters:
+    - source (str | GeoDataFrame | GeoSeries | array): GeoJSON path, GeoDataFrame,
+      or Shapely geometries.
+    - crs (str): CRS assumed for bare Shapely geometries (default: EPSG:4326).
+
+    Returns:
+    - GeoDataFrame: The input itself if it already is one, otherwise a new frame.
+    """
+    import geopandas as gpd
+
+    if isinstance(source, gpd.GeoDataFrame):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        return gpd.read_file(source)
+    if isinstance(source, gpd.GeoSeries):
+        return gpd.GeoDataFrame(geometry=source)
+    return gpd.GeoDataFrame(geometry=list(source), crs=crs)
+
 def save_geojson(gdf, filepath):
     """
     Saves a GeoDataFrame as a GeoJSON file.
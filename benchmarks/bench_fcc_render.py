@@ -0,0 +1,49 @@
+"""
+Compares the OpenCV false-colour renderer with the matplotlib one.
+
+Renders a synthetic composite (the size of a 2x-resampled 1500 m Landsat
+box) with a pond outline and reports time and output size per variant.
+
+Usage: python benchmarks/bench_fcc_render.py [pixels] [repeats]
+"""
+import sys
+import time
+import geopandas as gpd
+import numpy as np
+from rasterio.transform import from_origin
+from shapely.geometry import box
+from aquaexchange.fcc_renderer import render_fcc, render_fcc_matplotlib
+
+def synthetic_scene(pixels):
+    rng = np.random.default_rng(0)
+    false_color = rng.random((pixels, pixels, 3), dtype=np.float32)
+    transform = from_origin(500000, 2000000, 15, 15)  # 2x-resampled 30 m pixels
+    minx, maxy = 500000 + pixels * 5, 2000000 - pixels * 5
+    pond = box(minx, maxy - pixels * 5, minx + pixels * 5, maxy)
+    extent = [500000, 500000 + pixels * 15, 2000000 - pixels * 15, 2000000]
+    return false_color, transform, gpd.GeoDataFrame(geometry=[pond], crs="EPSG:32644"), extent
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return (time.perf_counter() - start) / repeats, result
+
+def main(pixels=220, repeats=5):
+    false_color, transform, aoi, extent = synthetic_scene(pixels)
+    variants = {
+        "matplotlib png (dpi=300)": lambda: (render_fcc_matplotlib(false_color, extent, aoi, "bench"), None),
+    }
+    for image_format in ("png", "jpeg", "webp"):
+        variants[f"opencv {image_format} 1024px"] = lambda image_format=image_format: render_fcc(
+            false_color, transform, aoi.geometry, title="bench", image_format=image_format
+        )
+
+    print(f"{'variant':<28}{'time (ms)':>10}{'image (KiB)':>13}{'thumb (KiB)':>13}")
+    for name, fn in variants.items():
+        elapsed, (image, thumbnail) = timed(fn, repeats)
+        thumb_size = f"{len(thumbnail) / 1024:.1f}" if thumbnail else "-"
+        print(f"{name:<28}{elapsed * 1000:>10.1f}{len(image) / 1024:>13.1f}{thumb_size:>13}")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
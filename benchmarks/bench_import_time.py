@@ -0,0 +1,53 @@
+"""
+Import-time regression check for ``import aquaexchange``.
+
+Imports the package in fresh interpreters, reports the best wall time and
+fails (exit status 1) if it exceeds the budget or pulls in any heavy
+dependency; those must only load on first use of a public name.
+
+Usage: python benchmarks/bench_import_time.py [budget_ms]
+"""
+import json
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = 150
+REPEATS = 5
+HEAVY_MODULES = (
+    "numpy", "pandas", "geopandas", "shapely", "rasterio", "pystac_client",
+    "planetary_computer", "matplotlib", "cv2", "azure", "dotenv",
+)
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import aquaexchange
+elapsed = time.perf_counter() - start
+loaded = sorted({name.split(".")[0] for name in sys.modules} & set(json.loads(sys.argv[1])))
+print(json.dumps({"ms": elapsed * 1000, "loaded": loaded}))
+"""
+
+def measure():
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, json.dumps(HEAVY_MODULES)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output)
+
+def main(budget_ms=IMPORT_BUDGET_MS):
+    runs = [measure() for _ in range(REPEATS)]
+    best_ms = min(run["ms"] for run in runs)
+    loaded = runs[0]["loaded"]
+    print(f"import aquaexchange: best of {REPEATS} = {best_ms:.1f} ms (budget {budget_ms} ms)")
+
+    failures = []
+    if best_ms > budget_ms:
+        failures.append(f"import took {best_ms:.1f} ms, over the {budget_ms} ms budget")
+    if loaded:
+        failures.append(f"heavy modules imported eagerly: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main(*(float(arg) for arg in sys.argv[1:2])))
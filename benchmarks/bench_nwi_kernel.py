@@ -0,0 +1,64 @@
+"""
+Micro-benchmark of the fused NWI kernel against the previous np.where version.
+
+Reports wall time and peak traced allocations for a synthetic uint16 window
+and checks the result against a float64 reference.
+
+Usage: python benchmarks/bench_nwi_kernel.py [size] [block_rows]
+"""
+import sys
+import time
+import tracemalloc
+import numpy as np
+from aquaexchange.calculate_indices import calculate_nwi
+
+def previous_nwi(blue, nir, swir16, swir22):
+    # Implementation before the fused kernel (integer inputs promoted to float64 first)
+    blue, nir, swir16, swir22 = (band.astype(np.float64) for band in (blue, nir, swir16, swir22))
+    denominator = blue + (nir + swir16 + swir22)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, (blue - (nir + swir16 + swir22)) / denominator, np.nan)
+
+def reference_nwi(blue, nir, swir16, swir22, scale, offset):
+    blue, nir, swir16, swir22 = (band.astype(np.float64) * scale + offset for band in (blue, nir, swir16, swir22))
+    denominator = blue + nir + swir16 + swir22
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator != 0, (blue - (nir + swir16 + swir22)) / denominator, np.nan)
+
+def measure(fn, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main(size=4096, block_rows=256):
+    rng = np.random.default_rng(0)
+    bands = [rng.integers(7000, 30000, size=(size, size), dtype=np.uint16) for _ in range(4)]
+    scale, offset = 0.0000275, -0.2
+
+    _, old_time, old_peak = measure(previous_nwi, *bands)
+    fused, fused_time, fused_peak = measure(calculate_nwi, *bands, scale=scale, offset=offset)
+    out = np.empty((size, size), dtype=np.float32)
+    _, block_time, block_peak = measure(
+        calculate_nwi, *bands, scale=scale, offset=offset, out=out, block_rows=block_rows
+    )
+
+    reference = reference_nwi(*bands, scale, offset)
+    max_error = float(np.nanmax(np.abs(fused - reference)))
+    assert np.allclose(fused, reference, atol=1e-5, equal_nan=True), max_error
+    assert np.array_equal(out, fused, equal_nan=True)
+
+    print(f"{size}x{size} uint16 window, max abs error vs float64 reference: {max_error:.2e}")
+    print(f"{'variant':<28}{'time (s)':>10}{'peak (MiB)':>12}")
+    for name, elapsed, peak in (
+        ("previous np.where", old_time, old_peak),
+        ("fused", fused_time, fused_peak),
+        (f"fused, out=, {block_rows} rows", block_time, block_peak),
+    ):
+        print(f"{name:<28}{elapsed:>10.3f}{peak / 2 ** 20:>12.1f}")
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,186 @@
+"""
+Benchmarks every pipeline stage on synthetic data, without network access.
+
+For each farm size a synthetic dataset (see synthetic_data.py) is generated,
+the STAC client is pointed at its static catalog and each stage runs in a
+fresh process, so wall time, peak RSS and bytes read are those of the
+stage alone. Stage inputs are prepared before the measurement starts.
+
+Stages: buffer, merge, search, nwi, lulc, imagery.
+
+Results are written as JSON; with --compare, stages more than --tolerance
+slower than in an earlier result file are reported and the exit code is 1.
+
+Usage: python benchmarks/bench_pipeline_stages.py [--sizes 10,1000,100000] [--output results.json]
+       [--workdir dir] [--years 6] [--vertices 8] [--compare old.json] [--tolerance 0.2]
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_data import make_dataset
+
+STAGES = ("buffer", "merge", "search", "nwi", "lulc", "imagery")
+
+def _read_bytes():
+    """Bytes this process has read through read() calls (Linux), or None."""
+    try:
+        with open("/proc/self/io") as f:
+            return next(int(line.split()[1]) for line in f if line.startswith("rchar:"))
+    except (OSError, StopIteration):
+        return None
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")  # Resets VmHWM to the current RSS
+    except OSError:
+        pass
+
+def _peak_rss():
+    """Peak resident set size in bytes."""
+    try:
+        with open("/proc/self/status") as f:
+            return next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def _prepare(stage, dataset):
+    """Builds the stage's inputs and returns a callable running only the stage."""
+    import numpy as np
+    import pandas as pd
+    from aquaexchange.utils import load_json
+    from aquaexchange.geojson_maker import farm_geodataframe
+    from aquaexchange.buffer import buffer_ponds
+    from aquaexchange.merge_geojson import merge_ponds
+    from aquaexchange.search_stack_images import search_stac_images_by_pond
+    from aquaexchange.calculate_indices import process_nwi_by_pond
+    from aquaexchange.find_previous_lulc import LulcRegistry, assign_previous_lulc_class
+    from aquaexchange.satellite_imagery_processor import process_satellite_imagery
+
+    ponds = farm_geodataframe(load_json(dataset["farm"]))
+    if stage == "buffer":
+        return lambda: buffer_ponds(ponds, -15)
+    if stage == "merge":
+        return lambda: merge_ponds(ponds)
+    if stage == "search":
+        return lambda: search_stac_images_by_pond(ponds)
+    if stage == "nwi":
+        pond_items = search_stac_images_by_pond(ponds)
+        return lambda: process_nwi_by_pond(pond_items, ponds, mode="full")
+    if stage == "lulc":
+        registry = LulcRegistry(dataset["lulc"])
+        years = [dataset["change_years"].get(pond_id) for pond_id in ponds["pond_id"]]
+        nwi_df = pd.DataFrame({"pond_id": ponds["pond_id"], "nwi_first_year": [y or np.nan for y in years]})
+        return lambda: assign_previous_lulc_class(ponds, nwi_df, registry=registry)
+    if stage == "imagery":
+        merged = merge_ponds(ponds)
+        return lambda: process_satellite_imagery(merged)
+    raise ValueError(f"Unknown stage '{stage}'")
+
+def _run_stage(stage, dataset, results):
+    # Silence per-pond progress output; it would dominate the timings at 100k ponds
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        fn = _prepare(stage, dataset)
+        _reset_peak_rss()
+        read_before = _read_bytes()
+        start = time.perf_counter()
+        fn()
+        wall = time.perf_counter() - start
+        read_after = _read_bytes()
+    results.put({
+        "wall_s": round(wall, 4),
+        "peak_rss_bytes": _peak_rss(),
+        "bytes_read": None if read_before is None else read_after - read_before,
+    })
+
+def run_stage(stage, dataset):
+    """Runs one stage in a fresh process, with empty caches, and returns its measurements."""
+    cache_dir = tempfile.mkdtemp(prefix=f"aquaexchange-bench-{stage}-")
+    os.environ.update({
+        "AQUAEXCHANGE_STAC_URL": os.path.abspath(dataset["catalog"]),
+        "AQUAEXCHANGE_CACHE_DIR": cache_dir,
+        "AQUAEXCHANGE_CHIP_CACHE_BYTES": "0",  # Measure real reads, not the chip cache
+    })
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_run_stage, args=(stage, dataset, results))
+    process.start()
+    measured = results.get() if _wait(process) else {"error": f"exit code {process.exitcode}"}
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return measured
+
+def _wait(process):
+    process.join()
+    return process.exitcode == 0
+
+def compare(results, baseline, tolerance):
+    """Lists (size, stage, ratio) for stages slower than ``baseline`` by more than ``tolerance``."""
+    regressions = []
+    for size, stages in results["sizes"].items():
+        for stage, measured in stages.items():
+            before = baseline.get("sizes", {}).get(size, {}).get(stage, {})
+            if "wall_s" in measured and before.get("wall_s"):
+                ratio = measured["wall_s"] / before["wall_s"]
+                if ratio > 1 + tolerance:
+                    regressions.append((size, stage, ratio))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10,1000,100000", help="Comma-separated pond counts.")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma-separated stages to run.")
+    parser.add_argument("--workdir", default=os.path.join("benchmarks", "synthetic"), help="Synthetic data directory.")
+    parser.add_argument("--output", default=os.path.join("benchmarks", "results", "stages.json"))
+    parser.add_argument("--years", type=int, default=6, help="Years of synthetic scenes.")
+    parser.add_argument("--vertices", type=int, default=8, help="Corners per pond polygon.")
+    parser.add_argument("--compare", help="Earlier result file to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown, as a fraction.")
+    args = parser.parse_args()
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "years": args.years,
+        "vertices": args.vertices,
+        "sizes": {},
+    }
+    for size in (int(s) for s in args.sizes.split(",")):
+        data_dir = os.path.join(args.workdir, f"ponds_{size}_v{args.vertices}_y{args.years}")
+        print(f"{size} ponds: generating data in {data_dir}")
+        dataset = make_dataset(data_dir, size, range(2013, 2013 + args.years), args.vertices)
+
+        results["sizes"][str(size)] = {}
+        for stage in args.stages.split(","):
+            measured = run_stage(stage, dataset)
+            results["sizes"][str(size)][stage] = measured
+            if "error" in measured:
+                print(f"  {stage:8s} failed: {measured['error']}")
+                continue
+            read = measured["bytes_read"]
+            print(f"  {stage:8s} {measured['wall_s']:9.3f} s  peak RSS {measured['peak_rss_bytes'] / 2**20:8.1f} MiB"
+                  f"  read {'n/a' if read is None else f'{read / 2**20:.1f} MiB'}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for size, stage, ratio in regressions:
+            print(f"REGRESSION {size} ponds, {stage}: {ratio:.2f}x slower")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,81 @@
+"""
+Load test for the job service (aquaexchange.service).
+
+Submits ``jobs`` farms from ``concurrency`` client threads, retrying when
+the service answers 503, polls every job to completion and reports
+throughput, end-to-end latency percentiles and the service's /stats.
+Farms are taken round-robin from a farms JSON file (a list in the input
+format) with a unique farmid per job.
+
+Start the service locally with a static catalog and local storage first:
+
+    AQUAEXCHANGE_STAC_URL=<catalog.json> AQUAEXCHANGE_STORAGE_DIR=/tmp/blobs python -m aquaexchange.service
+
+Usage: python benchmarks/load_test_service.py <farms.json> [jobs] [concurrency] [url]
+"""
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+def request(url, payload=None):
+    data = None if payload is None else json.dumps(payload).encode()
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=30) as response:
+        return json.load(response)
+
+def run_job(url, farm, poll_interval, rejections, lock):
+    start = time.perf_counter()
+    while True:
+        try:
+            job = request(f"{url}/jobs", farm)
+            break
+        except urllib.error.HTTPError as e:
+            if e.code != 503:
+                raise
+            with lock:
+                rejections[0] += 1
+            time.sleep(float(e.headers.get("Retry-After", 1)))
+
+    while job["status"] not in ("done", "failed"):
+        time.sleep(poll_interval)
+        job = request(f"{url}/jobs/{job['job_id']}")
+    return job["status"], time.perf_counter() - start
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        farms = json.load(f)
+    jobs = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    url = (sys.argv[4] if len(sys.argv) > 4 else "http://127.0.0.1:8000").rstrip("/")
+
+    payloads = []
+    for i in range(jobs):
+        farm = dict(farms[i % len(farms)])
+        farm["farmid"] = f"{farm['farmid']}-load{i}"
+        payloads.append(farm)
+
+    rejections, lock = [0], threading.Lock()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda farm: run_job(url, farm, 0.5, rejections, lock), payloads))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for status, latency in results if status == "done"]
+    failed = sum(1 for status, _ in results if status == "failed")
+    print(f"{jobs} jobs, {concurrency} clients: {elapsed:.1f} s, "
+          f"{60 * len(latencies) / elapsed:.1f} farms/min, {failed} failed, {rejections[0]} rejected (503)")
+    if latencies:
+        print(f"latency p50 {percentile(latencies, 50):.2f} s, p95 {percentile(latencies, 95):.2f} s, "
+              f"max {max(latencies):.2f} s")
+    print("service stats:", json.dumps(request(f"{url}/stats")))
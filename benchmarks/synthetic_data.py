@@ -0,0 +1,219 @@
+"""
+Synthetic inputs for the stage benchmarks: farms, Landsat-like COG scenes,
+a local static STAC catalog pointing at them, and a labelled LULC raster.
+
+Everything is laid out in EPSG:32644 (UTM 44N, the zone the imagery
+module picks for these ponds) around ORIGIN. Ponds turn into water in a random change year, so NWI,
+search and LULC follow their real code paths.
+
+Usage: python benchmarks/synthetic_data.py <output_dir> [ponds] [years] [vertices]
+"""
+import json
+import os
+import sys
+from datetime import datetime, timezone
+import numpy as np
+import pystac
+import rasterio
+import rasterio.shutil
+from pyproj import Transformer
+from rasterio.features import rasterize
+from rasterio.io import MemoryFile
+from rasterio.transform import from_origin
+from rasterio.warp import transform_bounds
+from shapely.geometry import Polygon, box, mapping
+
+CRS = "EPSG:32644"
+
+# South-west corner of the farm area (UTM 44N, coastal Andhra Pradesh)
+ORIGIN = (800000.0, 1820000.0)
+
+# Pond grid spacing and mean pond radius, in meters
+POND_SPACING = 100.0
+POND_RADIUS = 30.0
+
+# Raster margin around the ponds; covers the 1500 m imagery buffer
+MARGIN = 2000.0
+
+LANDSAT_BANDS = ("blue", "green", "red", "nir08", "swir16", "swir22")
+LANDSAT_RESOLUTION = 30.0
+LULC_RESOLUTION = 10.0
+LULC_CLASSES = {1: "Mangrove", 2: "Vegetation/Coastal Wetlands", 3: "Pond", 4: "Waterbodies", 5: "Crop Land"}
+
+# Digital numbers giving land and water reflectance with the Landsat C2 L2 scaling
+LAND_DN = {"blue": 9100, "green": 10500, "red": 11000, "nir08": 18200, "swir16": 16400, "swir22": 12700}
+WATER_DN = {"blue": 9100, "green": 8500, "red": 7600, "nir08": 7100, "swir16": 7100, "swir22": 7100}
+
+def pond_polygons(n_ponds, vertices=8, seed=0):
+    """
+    ``n_ponds`` jittered polygons with ``vertices`` corners each, on a square grid, in CRS.
+    """
+    rng = np.random.default_rng(seed)
+    side = int(np.ceil(np.sqrt(n_ponds)))
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    polygons = []
+    for i in range(n_ponds):
+        cx = ORIGIN[0] + MARGIN + (i % side) * POND_SPACING
+        cy = ORIGIN[1] + MARGIN + (i // side) * POND_SPACING
+        radii = POND_RADIUS * rng.uniform(0.7, 1.3, vertices)
+        polygons.append(Polygon(np.column_stack([cx + radii * np.cos(angles), cy + radii * np.sin(angles)])))
+    return polygons
+
+def make_farm(polygons, farm_id="synthetic"):
+    """Farm JSON (input format) for polygons in CRS."""
+    to_wgs84 = Transformer.from_crs(CRS, "EPSG:4326", always_xy=True)
+    ponds = []
+    for i, polygon in enumerate(polygons):
+        lngs, lats = to_wgs84.transform(*np.asarray(polygon.exterior.coords[:-1]).T)
+        boundaries = {f"p{j + 1}": {"lat": float(lat), "lng": float(lng)} for j, (lat, lng) in enumerate(zip(lats, lngs))}
+        ponds.append({"id": f"pond_{i + 1}", "boundaries": boundaries})
+    return {"farmid": farm_id, "ponds": ponds}
+
+def raster_grid(polygons, resolution):
+    """(transform, (height, width)) of a grid covering the ponds plus MARGIN."""
+    minx, miny, maxx, maxy = np.array([p.bounds for p in polygons]).T
+    minx, miny = minx.min() - MARGIN, miny.min() - MARGIN
+    maxx, maxy = maxx.max() + MARGIN, maxy.max() + MARGIN
+    width = int(np.ceil((maxx - minx) / resolution))
+    height = int(np.ceil((maxy - miny) / resolution))
+    return from_origin(minx, maxy, resolution, resolution), (height, width)
+
+def write_cog(path, array, transform, crs=CRS, nodata=None):
+    """Writes a single-band Cloud Optimized GeoTIFF with overviews."""
+    profile = {
+        "driver": "GTiff", "height": array.shape[0], "width": array.shape[1], "count": 1,
+        "dtype": array.dtype.name, "crs": crs, "transform": transform, "nodata": nodata,
+    }
+    with MemoryFile() as memfile:
+        with memfile.open(**profile) as dst:
+            dst.write(array, 1)
+        with memfile.open() as src:
+            rasterio.shutil.copy(src, path, driver="COG", compress="DEFLATE", blocksize=512,
+                                 overview_resampling="average")
+
+def make_scenes(directory, polygons, years, scenes_per_year=2, seed=0):
+    """
+    Landsat-like scenes (one COG per band) plus their STAC items.
+
+    Each pond becomes water from a random change year on (a fifth never
+    changes). Returns the items and {pond index: change year or None}.
+    """
+    rng = np.random.default_rng(seed)
+    transform, shape = raster_grid(polygons, LANDSAT_RESOLUTION)
+    change_years = rng.choice(list(years[1:]) + [0], size=len(polygons),
+                              p=[0.8 / (len(years) - 1)] * (len(years) - 1) + [0.2])
+    change_raster = rasterize(
+        ((polygon, int(year)) for polygon, year in zip(polygons, change_years) if year),
+        out_shape=shape, transform=transform, fill=0, dtype="int32",
+    )
+
+    left, top = transform.c, transform.f
+    right, bottom = left + shape[1] * LANDSAT_RESOLUTION, top - shape[0] * LANDSAT_RESOLUTION
+    footprint = box(*transform_bounds(CRS, "EPSG:4326", left, bottom, right, top))
+
+    items = []
+    for year in years:
+        water = (change_raster > 0) & (change_raster <= year)
+        for k in range(scenes_per_year):
+            scene_id = f"LC08_SYN_{year}_{k}"
+            scene_dir = os.path.join(directory, scene_id)
+            os.makedirs(scene_dir, exist_ok=True)
+            item = pystac.Item(
+                id=scene_id,
+                geometry=mapping(footprint),
+                bbox=list(footprint.bounds),
+                datetime=datetime(year, 2 + 3 * k, 15, 5, tzinfo=timezone.utc),
+                properties={
+                    "eo:cloud_cover": float(rng.uniform(0, 9)),
+                    "platform": "landsat-8",
+                    "landsat:wrs_path": "142",
+                    "landsat:wrs_row": "048",
+                },
+                collection="landsat-c2-l2",
+            )
+
+            for band in LANDSAT_BANDS:
+                noise = rng.integers(-300, 300, size=shape, dtype=np.int32)
+                array = np.where(water, WATER_DN[band], LAND_DN[band]) + noise
+                path = os.path.join(scene_dir, f"{band}.tif")
+                write_cog(path, array.astype(np.uint16), transform, nodata=0)
+                item.add_asset(band, pystac.Asset(href=os.path.abspath(path), media_type=pystac.MediaType.COG))
+            items.append(item)
+
+    return items, {i: int(year) or None for i, year in enumerate(change_years)}
+
+def make_catalog(directory, items):
+    """Saves a self-contained static STAC catalog of ``items``; returns the catalog.json path."""
+    catalog = pystac.Catalog(id="synthetic", description="Synthetic Landsat scenes for benchmarks")
+    catalog.add_items(items)
+    catalog.normalize_hrefs(directory)
+    catalog.save(catalog_type=pystac.CatalogType.SELF_CONTAINED)
+    return os.path.join(directory, "catalog.json")
+
+def make_lulc(directory, polygons, years=(1999, 2005, 2011), seed=0):
+    """
+    ``lulc_with_labels_<year>.tif`` epochs with their ``.aux.xml`` label tables.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    transform, shape = raster_grid(polygons, LULC_RESOLUTION)
+    rows = "".join(
+        f"<Row index=\"{i}\"><F>{value}</F><F>{name}</F></Row>"
+        for i, (value, name) in enumerate(LULC_CLASSES.items())
+    )
+    labels = f"<PAMDataset><PAMRasterBand band=\"1\"><GDALRasterAttributeTable>{rows}</GDALRasterAttributeTable></PAMRasterBand></PAMDataset>"
+
+    for year in years:
+        # Blocky classes, 500 m patches upsampled to the LULC grid
+        coarse = rng.integers(1, len(LULC_CLASSES) + 1, size=(shape[0] // 50 + 1, shape[1] // 50 + 1), dtype=np.uint8)
+        array = np.repeat(np.repeat(coarse, 50, axis=0), 50, axis=1)[:shape[0], :shape[1]]
+        path = os.path.join(directory, f"lulc_with_labels_{year}.tif")
+        write_cog(path, np.ascontiguousarray(array), transform, nodata=0)
+        with open(path + ".aux.xml", "w") as f:
+            f.write(labels)
+    return directory
+
+def make_dataset(output_dir, n_ponds, years=range(2013, 2019), vertices=8, scenes_per_year=2, seed=0):
+    """
+    Generates a full synthetic dataset, or loads the one already in ``output_dir``.
+
+    Returns:
+        dict: Paths of 'farm' (JSON), 'catalog' (catalog.json) and 'lulc' (directory),
+        plus 'change_years' {pond id: year or None}.
+    """
+    manifest_path = os.path.join(output_dir, "dataset.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    os.makedirs(output_dir, exist_ok=True)
+    polygons = pond_polygons(n_ponds, vertices, seed)
+
+    farm_path = os.path.join(output_dir, "farm.json")
+    farm = make_farm(polygons)
+    with open(farm_path, "w") as f:
+        json.dump(farm, f)
+
+    items, change_years = make_scenes(os.path.join(output_dir, "scenes"), polygons, list(years), scenes_per_year, seed)
+    catalog_path = make_catalog(os.path.join(output_dir, "stac"), items)
+    lulc_dir = make_lulc(os.path.join(output_dir, "lulc"), polygons, seed=seed)
+    dataset = {
+        "farm": farm_path,
+        "catalog": catalog_path,
+        "lulc": lulc_dir,
+        "change_years": {farm["ponds"][i]["id"]: year for i, year in change_years.items()},
+    }
+    # Written last, so an interrupted generation is redone
+    with open(manifest_path, "w") as f:
+        json.dump(dataset, f)
+    return dataset
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    n_ponds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    n_years = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+    vertices = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+    dataset = make_dataset(sys.argv[1], n_ponds, range(2013, 2013 + n_years), vertices)
+    print(json.dumps({key: value for key, value in dataset.items() if key != "change_years"}, indent=4))
@@ -4,6 +4,7 @@ setup(
     name="aquaexchange",
     version="0.1.0",
     packages=find_packages(),
+    package_data={"aquaexchange": ["data/*.tif", "data/*.tif.aux.xml"]},
     install_requires=[
         "geopandas",
         "pystac-client",
@@ -15,7 +16,8 @@ setup(
         "lxml",
         "fastapi",
         "azure-storage-blob",
-        "python-dotenv"
+        "python-dotenv",
+        "uvicorn"
     ],
     author="Swaraj Saha",
     description="A package for processing farm pond data using Landsat imagery.",
@@ -30,5 +32,7 @@ setup(
         "scripts/main_1.py",
         "scripts/main_2.py",
         "scripts/run_pipeline.py",
+        "scripts/prefetch_chips.py",
+        "scripts/run_batch.py",
     ],
 )
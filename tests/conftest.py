@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+@pytest.fixture(scope="session")
+def synthetic_dataset(tmp_path_factory):
+    """
+    A small synthetic dataset (see benchmarks/synthetic_data.py): 6 ponds, 3 years.
+
+    Ponds are made larger than in the benchmarks so they keep Landsat pixels
+    after the inward buffer.
+    """
+    pytest.importorskip("rasterio")
+    pytest.importorskip("geopandas")
+    synthetic_data = pytest.importorskip("synthetic_data")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(synthetic_data, "POND_RADIUS", 90.0)
+        mp.setattr(synthetic_data, "POND_SPACING", 300.0)
+        return synthetic_data.make_dataset(str(tmp_path_factory.mktemp("synthetic")), 6, range(2013, 2016))
+
+@pytest.fixture
+def offline_catalog(synthetic_dataset, tmp_path, monkeypatch):
+    """Points STAC searches at the synthetic static catalog, with empty caches."""
+    from aquaexchange import chip_cache, stac_cache
+
+    monkeypatch.setattr(stac_cache, "STAC_URL", os.path.abspath(synthetic_dataset["catalog"]))
+    monkeypatch.setattr(stac_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(chip_cache, "CHIP_CACHE_BYTES", 0)
+    return synthetic_dataset
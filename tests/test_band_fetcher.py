@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+np = pytest.importorskip("numpy")
+rasterio = pytest.importorskip("rasterio")
+
+# Seconds the server stalls on /slow/ requests, well above the test timeout
+STALL = 5
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler with the single-range support GDAL's /vsicurl/ relies on."""
+
+    def do_GET(self):
+        if self.path.startswith("/slow/"):
+            time.sleep(STALL)
+            self.path = self.path[len("/slow"):]
+        path = self.translate_path(self.path)
+        header = self.headers.get("Range")
+        if not header or not os.path.isfile(path):
+            return super().do_GET()
+
+        size = os.path.getsize(path)
+        start, _, end = header.split("=", 1)[1].partition("-")
+        start, end = int(start), min(int(end) if end else size - 1, size - 1)
+        with open(path, "rb") as f:
+            f.seek(start)
+            body = f.read(end - start + 1)
+        self.send_response(206)
+        self.send_header("Content-Type", "image/tiff")
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        if self.path.startswith("/slow/"):
+            time.sleep(STALL)
+            self.path = self.path[len("/slow"):]
+        return super().do_HEAD()
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def geotiff_server(tmp_path):
+    """Serves four small GeoTIFFs over HTTP; yields their base URL."""
+    from rasterio.transform import from_origin
+
+    for i in range(4):
+        with rasterio.open(tmp_path / f"band{i}.tif", "w", driver="GTiff", width=128, height=128, count=1,
+                           dtype="uint16", crs="EPSG:32644", tiled=True, blockxsize=64, blockysize=64,
+                           transform=from_origin(500000, 1800000, 30, 30)) as dst:
+            dst.write((np.arange(128 * 128, dtype="uint16") + i).reshape(1, 128, 128))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(RangeRequestHandler, directory=str(tmp_path)))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with rasterio.Env(GDAL_DISABLE_READDIR_ON_OPEN="EMPTY_DIR", CPL_VSIL_CURL_USE_HEAD="NO"):
+            yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_parallel_reads_match_serial_reads(geotiff_server):
+    from aquaexchange.band_fetcher import fetch_all
+    from aquaexchange.calculate_indices import read_band_window
+
+    bounds, crs = (501000, 1797000, 502500, 1798500), "EPSG:32644"
+    tasks = [(f"{geotiff_server}/band{i}.tif", bounds, crs) for i in range(4)]
+
+    serial = fetch_all(read_band_window, tasks, max_workers=1, timeout=10)
+    parallel = fetch_all(read_band_window, tasks, max_workers=4, timeout=10)
+
+    assert len(parallel) == len(serial) == 4
+    for (s_array, s_transform, s_crs), (p_array, p_transform, p_crs) in zip(serial, parallel):
+        assert (s_array == p_array).all()
+        assert s_transform == p_transform and s_crs == p_crs
+    # Results come back in task order
+    assert [int(array[0, 0]) for array, _, _ in parallel] == [int(serial[0][0][0, 0]) + i for i in range(4)]
+
+def test_stalled_read_times_out(geotiff_server):
+    from aquaexchange.band_fetcher import fetch_all
+    from aquaexchange.calculate_indices import read_band_window
+
+    bounds, crs = (501000, 1797000, 502500, 1798500), "EPSG:32644"
+    tasks = [(f"{geotiff_server}/slow/band{i}.tif", bounds, crs) for i in range(2)]
+
+    started = time.monotonic()
+    with pytest.raises(rasterio.errors.RasterioIOError):
+        fetch_all(read_band_window, tasks, max_workers=2, timeout=1)
+    assert time.monotonic() - started < STALL
@@ -0,0 +1,68 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+def _single_farm_nwi(ponds):
+    # NWI as computed by pipeline.run_farm for one farm
+    from aquaexchange.buffer import buffer_ponds
+    from aquaexchange.calculate_indices import process_nwi_by_pond
+    from aquaexchange.pipeline import BUFFER_DISTANCE, NWI_MODE
+    from aquaexchange.search_stack_images import search_stac_images_by_pond
+
+    buffered = buffer_ponds(ponds, BUFFER_DISTANCE)
+    return process_nwi_by_pond(search_stac_images_by_pond(buffered), buffered, mode=NWI_MODE)
+
+@pytest.mark.parametrize("buffer_distance", [0, -15])
+def test_cluster_nwi_matches_single_farm_runs(offline_catalog, monkeypatch, buffer_distance):
+    from aquaexchange import batch_runner, pipeline
+    from aquaexchange.batch_runner import cluster_nwi
+    from aquaexchange.combine_outputs import build_pond_records
+    from aquaexchange.geojson_maker import farm_geodataframe
+    from aquaexchange.utils import load_json
+
+    monkeypatch.setattr(pipeline, "BUFFER_DISTANCE", buffer_distance)
+    monkeypatch.setattr(batch_runner, "BUFFER_DISTANCE", buffer_distance)
+    farm = load_json(offline_catalog["farm"])
+    farms = [
+        {"farmid": "A", "ponds": farm["ponds"][:3]},
+        {"farmid": "B", "ponds": farm["ponds"][3:]},
+    ]
+    farm_gdfs = [farm_geodataframe(f) for f in farms]
+
+    no_lulc = pd.DataFrame({"pond_id": pd.Series(dtype=object), "lulc_class": pd.Series(dtype=object)})
+    batch = cluster_nwi(farm_gdfs)
+    for ponds, batch_df in zip(farm_gdfs, batch):
+        single_df = _single_farm_nwi(ponds)
+        pd.testing.assert_frame_equal(batch_df, single_df, check_like=True)
+        assert build_pond_records(batch_df, no_lulc) == build_pond_records(single_df, no_lulc)
+        assert batch_df["nwi_first_year"].notna().any()
+
+def test_batch_imagery_matches_single_farm_runs(offline_catalog, tmp_path, monkeypatch):
+    pytest.importorskip("cv2")
+    from aquaexchange import batch_runner, fetch_plan
+    from aquaexchange.batch_runner import process_cluster
+    from aquaexchange.geojson_maker import farm_geodataframe
+    from aquaexchange.merge_geojson import merge_ponds
+    from aquaexchange.satellite_imagery_processor import render_imagery
+    from aquaexchange.utils import load_json
+    from synthetic_data import LANDSAT_RESOLUTION
+
+    farm = load_json(offline_catalog["farm"])
+    farm_gdfs = [farm_geodataframe({"ponds": farm["ponds"][:3]}), farm_geodataframe({"ponds": farm["ponds"][3:]})]
+
+    # The synthetic catalog publishes no gsd; with it, the farms' display reads share the cluster plan
+    monkeypatch.setattr(fetch_plan, "asset_gsd", lambda item, href: LANDSAT_RESOLUTION)
+    plans = []
+    monkeypatch.setattr(batch_runner, "FetchPlan", lambda: plans.append(fetch_plan.FetchPlan()) or plans[-1])
+
+    results = process_cluster(["A", "B"], farm_gdfs, str(tmp_path))
+    assert plans[0].hits > 0
+    for ponds, (farm_id, output, _) in zip(farm_gdfs, results):
+        images, thumbnails = render_imagery(merge_ponds(ponds))
+        assert images
+        for kind, files in (("Images", images), ("Thumbnails", thumbnails)):
+            written = {}
+            for path in output[kind]:
+                with open(path, "rb") as f:
+                    written[path.rsplit("/", 1)[-1]] = f.read()
+            assert written == files
@@ -0,0 +1,16 @@
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+
+def test_zero_distance_keeps_ponds_as_drawn():
+    from shapely.geometry import box
+    from aquaexchange.buffer import buffer_ponds
+
+    ponds = gpd.GeoDataFrame({"pond_id": ["a", "b"]}, geometry=[box(80, 16, 80.001, 16.001), box(80.002, 16, 80.003, 16.001)],
+                             crs="EPSG:4326")
+    buffered = buffer_ponds(ponds, 0)
+    assert list(buffered.geometry) == list(ponds.geometry)
+    assert (buffered["area_m2"] > 10000).all()
+
+    shrunk = buffer_ponds(ponds, -15)
+    assert (shrunk.geometry.area < ponds.geometry.area).all()
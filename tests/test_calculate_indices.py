@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("pandas")
+
+def test_scenes_read_counts_successful_reads_only(offline_catalog, tmp_path):
+    import numpy as np
+    import rasterio
+    from rasterio.transform import from_origin
+    from aquaexchange import calculate_indices
+    from aquaexchange.geojson_maker import farm_geodataframe
+    from aquaexchange.search_stack_images import search_stac_images_by_pond
+    from aquaexchange.utils import load_json
+
+    ponds = farm_geodataframe(load_json(offline_catalog["farm"]))
+    pond_items = search_stac_images_by_pond(ponds)
+    full = calculate_indices.process_nwi_by_pond(pond_items, ponds, mode="full")
+    assert full.attrs["scenes_read"] > 0
+
+    # A scene with every band whose raster lies far from the farm reads nothing
+    outside = str(tmp_path / "outside.tif")
+    with rasterio.open(outside, "w", driver="GTiff", width=8, height=8, count=1, dtype="uint16",
+                       crs="EPSG:32644", transform=from_origin(200000, 900000, 30, 30)) as dst:
+        dst.write(np.ones((1, 8, 8), dtype="uint16"))
+    first = next(iter(next(iter(pond_items.values())).values()))[0]
+    missed = first.clone()
+    missed.id = "missed-scene"
+    for asset in missed.assets.values():
+        asset.href = outside
+    year = missed.datetime.year
+    for years in pond_items.values():
+        years.setdefault(year, []).append(missed)
+
+    with_missed = calculate_indices.process_nwi_by_pond(pond_items, ponds, mode="full")
+    assert with_missed.attrs["scenes_read"] == full.attrs["scenes_read"]
@@ -0,0 +1,42 @@
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("rasterio")
+
+def _chip(value):
+    from rasterio.crs import CRS
+    from rasterio.transform import Affine
+
+    return np.full((8, 8), value, dtype="float32"), Affine(30, 0, 0, 0, -30, 0), CRS.from_epsg(32644)
+
+def test_eviction_removes_chip_and_sidecar_together(tmp_path):
+    from aquaexchange.chip_cache import ChipCache
+
+    cache = ChipCache(str(tmp_path), max_bytes=10 ** 9)
+    keys = [cache.key(f"https://example.com/{i}.tif", [0, 0, 8, 8]) for i in range(4)]
+    for i, key in enumerate(keys):
+        cache.put(key, _chip(i))
+    chip_size = cache._total // len(keys)
+
+    # Reading the first chip makes the second the least recently used one
+    cache.get(keys[0])
+    cache.max_bytes = 3 * chip_size
+    cache.evict()
+
+    with pytest.raises(KeyError):
+        cache.get(keys[1])
+    assert not any(name.startswith(keys[1]) for name in os.listdir(tmp_path))
+    assert cache.get(keys[0])[0][0, 0] == 0
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{key}{ext}" for key in (keys[0], keys[2], keys[3]) for ext in (".npy", ".json"))
+
+def test_index_is_rebuilt_from_disk(tmp_path):
+    from aquaexchange.chip_cache import ChipCache
+
+    cache = ChipCache(str(tmp_path), max_bytes=10 ** 9)
+    key = cache.key("https://example.com/a.tif", [0, 0, 8, 8])
+    cache.put(key, _chip(1))
+    cache.put(cache.key("https://example.com/b.tif", [0, 0, 8, 8]), None)
+
+    reopened = ChipCache(str(tmp_path), max_bytes=10 ** 9)
+    assert reopened._total == cache._total == sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path))
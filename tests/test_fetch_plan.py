@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("rasterio")
+pytest.importorskip("geopandas")
+
+HREF = "https://example.com/B04.tif"
+
+def test_only_native_reads_are_shared():
+    from aquaexchange.fetch_plan import FetchPlan
+
+    plan = FetchPlan()
+    plan.add(HREF, "sentinel-2-l2a", (80.0, 16.0, 80.01, 16.01), "EPSG:4326")
+    # A display read needing downsampling overlaps the NWI window but does not share it
+    plan.add(HREF, "sentinel-2-l2a", (79.9, 15.9, 80.1, 16.1), "EPSG:4326", native=False)
+    assert plan.shared_windows() == 0
+
+    plan.add(HREF, "sentinel-2-l2a", (80.005, 16.005, 80.02, 16.02), "EPSG:4326")
+    assert plan.shared_windows() == 1
+
+def test_display_read_larger_than_size_falls_back(tmp_path, monkeypatch):
+    import numpy as np
+    import rasterio
+    from rasterio.transform import from_origin
+    from aquaexchange import chip_cache
+    from aquaexchange.fetch_plan import FetchPlan
+
+    monkeypatch.setattr(chip_cache, "CHIP_CACHE_BYTES", 0)
+
+    href = str(tmp_path / "band.tif")
+    with rasterio.open(href, "w", driver="GTiff", width=64, height=64, count=1, dtype="uint16",
+                       crs="EPSG:32644", transform=from_origin(500000, 1800000, 30, 30)) as dst:
+        dst.write(np.arange(64 * 64, dtype="uint16").reshape(1, 64, 64))
+
+    bounds, crs = (500300, 1798500, 501200, 1799400), "EPSG:32644"  # 30 x 30 pixels
+    plan = FetchPlan()
+    for _ in range(3):
+        plan.add(href, "local", bounds, crs)
+
+    # Too large for a 16-pixel display read: the caller's overview read is used instead
+    with pytest.raises(KeyError):
+        plan.read(href, bounds, crs, size=16)
+    band, _, _ = plan.read(href, bounds, crs, size=64)
+    with rasterio.open(href) as src:
+        expected = src.read(1, window=src.window(*bounds))
+    assert band.shape == expected.shape
+    assert (band == expected).all()
+
+    # The fallback request was counted: the last one releases the chip
+    assert plan.shared_windows() == 1
+    plan.read(href, bounds, crs)
+    assert plan.shared_windows() == 0
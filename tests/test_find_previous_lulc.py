@@ -0,0 +1,29 @@
+import os
+import pytest
+
+pd = pytest.importorskip("pandas")
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("rasterio")
+
+def test_lulc_dir_does_not_depend_on_the_working_directory(tmp_path, monkeypatch):
+    import aquaexchange
+    from aquaexchange import find_previous_lulc
+
+    monkeypatch.chdir(tmp_path)
+    assert find_previous_lulc.LULC_DIR == os.path.join(os.path.dirname(os.path.abspath(aquaexchange.__file__)), "data")
+    assert os.path.isdir(find_previous_lulc.LULC_DIR)
+
+def test_duplicate_pond_ids_in_nwi_are_rejected(tmp_path):
+    from shapely.geometry import box
+    from aquaexchange.find_previous_lulc import LulcRegistry, assign_previous_lulc_class
+
+    ponds = gpd.GeoDataFrame({"pond_id": ["a", "b"]}, geometry=[box(80, 16, 80.001, 16.001), box(80.002, 16, 80.003, 16.001)],
+                             crs="EPSG:4326")
+    registry = LulcRegistry(str(tmp_path))
+
+    nwi_df = pd.DataFrame({"pond_id": ["a", "b"], "nwi_first_year": [2005.0, None]})
+    assert list(assign_previous_lulc_class(ponds, nwi_df, registry=registry)["pond_id"]) == ["a", "b"]
+
+    duplicated = pd.DataFrame({"pond_id": ["a", "a", "b"], "nwi_first_year": [2005.0, 2010.0, None]})
+    with pytest.raises(pd.errors.MergeError):
+        assign_previous_lulc_class(ponds, duplicated, registry=registry)
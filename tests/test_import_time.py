@@ -0,0 +1,20 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys
+import aquaexchange
+print(json.dumps(sorted({name.split(".")[0] for name in sys.modules})))
+"""
+
+def test_import_does_not_load_heavy_dependencies():
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    loaded = set(json.loads(output))
+    assert "aquaexchange" in loaded
+    assert not loaded & {"geopandas", "rasterio", "cv2"}
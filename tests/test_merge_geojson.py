@@ -0,0 +1,25 @@
+import os
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+
+def _ponds():
+    from shapely.geometry import box
+
+    return gpd.GeoDataFrame({"pond_id": ["a", "b"]}, geometry=[box(80, 16, 80.001, 16.001), box(80.002, 16, 80.003, 16.001)],
+                            crs="EPSG:4326")
+
+def test_frame_without_farm_id_is_rejected(tmp_path):
+    from aquaexchange.merge_geojson import merge_geojson
+
+    with pytest.raises(ValueError, match="farm_id"):
+        merge_geojson(_ponds(), str(tmp_path / "merged"))
+    assert not os.path.exists(tmp_path / "merged")
+
+def test_farm_id_defaults_to_file_name(tmp_path):
+    from aquaexchange.merge_geojson import merge_geojson
+
+    path = tmp_path / "farm_7.geojson"
+    _ponds().to_file(path, driver="GeoJSON")
+    assert merge_geojson(str(path), str(tmp_path)) == os.path.join(str(tmp_path), "farm_7_merged.geojson")
+    assert merge_geojson(_ponds(), str(tmp_path), farm_id="f8").endswith("f8_merged.geojson")
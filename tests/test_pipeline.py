@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("cv2")
+
+def test_run_farm_end_to_end(offline_catalog, tmp_path):
+    from aquaexchange.checkpoints import Checkpointer
+    from aquaexchange.find_previous_lulc import LulcRegistry
+    from aquaexchange.image_uploader import LocalFileBackend
+    from aquaexchange.pipeline import run_farm
+    from aquaexchange.utils import load_json
+
+    farm = load_json(offline_catalog["farm"])
+    backend = LocalFileBackend(str(tmp_path / "blobs"))
+    registry = LulcRegistry(offline_catalog["lulc"], cache_dir=str(tmp_path / "lulc"))
+
+    def run():
+        checkpoints = Checkpointer(str(tmp_path / "checkpoints"))
+        return run_farm(farm, backend, registry, checkpoints=checkpoints), checkpoints.report
+
+    output, _ = run()
+    assert output["noofponds"] == len(farm["ponds"])
+    assert [pond["id"] for pond in output["ponds"]] == [pond["id"] for pond in farm["ponds"]]
+    assert any(isinstance(pond["Probable Year of Change"], int) for pond in output["ponds"])
+    assert output["Images"] and len(output["Thumbnails"]) == len(output["Images"])
+    assert not set(output["Images"]) & set(output["Thumbnails"])
+
+    # A re-run loads every stage from its checkpoint and gives the same output
+    resumed, report = run()
+    assert resumed == output
+    assert report and all(status == "reused" for status in report.values())
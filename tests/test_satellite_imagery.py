@@ -0,0 +1,45 @@
+import pytest
+
+pytest.importorskip("cv2")
+
+def _merged_farm(dataset):
+    from aquaexchange.geojson_maker import farm_geodataframe
+    from aquaexchange.merge_geojson import merge_ponds
+    from aquaexchange.utils import load_json
+
+    return merge_ponds(farm_geodataframe(load_json(dataset["farm"])))
+
+def test_process_satellite_imagery_returns_images_only(offline_catalog):
+    from aquaexchange.satellite_imagery_processor import process_satellite_imagery
+
+    images = process_satellite_imagery(_merged_farm(offline_catalog), image_size=256)
+    assert images
+    assert all(isinstance(data, bytes) for data in images.values())
+    assert not any("_thumb" in filename for filename in images)
+
+def test_thumbnails_are_kept_apart_from_images(offline_catalog):
+    from aquaexchange.satellite_imagery_processor import process_satellite_imagery, render_imagery
+
+    merged = _merged_farm(offline_catalog)
+    images, thumbnails = render_imagery(merged, image_size=256, thumbnail_size=64)
+    assert images == process_satellite_imagery(merged, image_size=256)
+    assert sorted(thumbnails) == sorted(filename.replace(".", "_thumb.", 1) for filename in images)
+
+def test_matplotlib_renderer_draws_the_boundary_in_the_band_crs(offline_catalog, monkeypatch):
+    pytest.importorskip("matplotlib")
+    from aquaexchange import satellite_imagery_processor
+
+    boundaries = []
+
+    def render(false_color, extent, boundary_gdf, title=None, dpi=300):
+        boundaries.append((extent, boundary_gdf))
+        return b"png"
+
+    monkeypatch.setattr(satellite_imagery_processor, "render_fcc_matplotlib", render)
+    images, thumbnails = satellite_imagery_processor.render_imagery(
+        _merged_farm(offline_catalog), renderer="matplotlib", image_size=256,
+    )
+    assert images and thumbnails == {}
+    for (minx, maxx, miny, maxy), boundary_gdf in boundaries:
+        bminx, bminy, bmaxx, bmaxy = boundary_gdf.total_bounds
+        assert minx < bminx < bmaxx < maxx and miny < bminy < bmaxy < maxy
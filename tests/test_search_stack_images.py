@@ -0,0 +1,21 @@
+import pytest
+
+pystac = pytest.importorskip("pystac")
+pytest.importorskip("shapely")
+
+def _item(item_id, timestamp, cloud_cover):
+    item = pystac.Item.from_dict({
+        "type": "Feature", "stac_version": "1.0.0", "id": item_id, "geometry": None,
+        "properties": {"datetime": timestamp, "eo:cloud_cover": cloud_cover}, "links": [], "assets": {},
+    })
+    return item
+
+def test_years_parse_with_and_without_fractional_seconds():
+    from aquaexchange.search_stack_images import _item_years_and_clouds
+
+    items = [
+        _item("a", "2013-02-15T05:00:00Z", 3.0),
+        _item("b", "2014-05-15T05:00:00.123456Z", 7.5),
+        _item("c", "2015-12-31T23:59:59+00:00", 1.0),
+    ]
+    assert _item_years_and_clouds(items) == ([2013, 2014, 2015], [3.0, 7.5, 1.0])
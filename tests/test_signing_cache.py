@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+import pytest
+from aquaexchange.signing_cache import SigningCache
+
+pytest.importorskip("planetary_computer")
+
+BLOB = "https://landsateuwest.blob.core.windows.net/landsat-c2/level-2/B4.TIF"
+SENTINEL_BLOB = "https://sentinel2l2a01.blob.core.windows.net/sentinel2-l2/43/Q/B04.tif"
+
+class FakeTokens:
+    """Token endpoint stand-in counting requests; tokens expire after ``lifetime``."""
+
+    def __init__(self, lifetime=timedelta(hours=1)):
+        self.lifetime = lifetime
+        self.calls = []
+
+    def __call__(self, account, container):
+        self.calls.append(f"{account}/{container}")
+        return f"st=now&se=later&sig=s{len(self.calls)}%2B%3D", datetime.now(timezone.utc) + self.lifetime
+
+def _item(collection, hrefs):
+    return SimpleNamespace(collection_id=collection, assets={key: SimpleNamespace(href=href) for key, href in hrefs.items()})
+
+def test_sign_href_keeps_existing_query_parameters():
+    signer = SigningCache(FakeTokens())
+    signed = signer.sign_href(BLOB + "?versionid=7&sig=stale", "landsat-c2-l2")
+
+    params = parse_qs(urlsplit(signed).query)
+    assert params["versionid"] == ["7"]
+    assert params["sig"] == ["s1+="]
+    assert params["se"] == ["later"]
+    assert signed.startswith(BLOB + "?")
+
+def test_urls_planetary_computer_does_not_sign_are_unchanged():
+    fake = FakeTokens()
+    signer = SigningCache(fake)
+    unsigned = [
+        "/data/B4.tif",
+        "https://example.com/B4.tif?x=1",
+        "https://ai4edatasetspublicassets.blob.core.windows.net/assets/thumb.png",
+        BLOB + "?st=now&se=later&sp=rl&sig=old",
+    ]
+    for href in unsigned:
+        assert signer.sign_href(href, "landsat-c2-l2") == href
+    assert fake.calls == []
+
+def test_tokens_are_cached_per_container_until_expiry():
+    fake = FakeTokens()
+    signer = SigningCache(fake)
+    for _ in range(3):
+        signer.sign_href(BLOB, "landsat-c2-l2")
+    signer.sign_href(SENTINEL_BLOB, "sentinel-2-l2a")
+    assert fake.calls == ["landsateuwest/landsat-c2", "sentinel2l2a01/sentinel2-l2"]
+    assert signer.stats() == {"hits": 2, "misses": 2,
+                              "containers": ["landsateuwest/landsat-c2", "sentinel2l2a01/sentinel2-l2"]}
+
+    # Tokens within the renewal margin of their expiry are fetched again
+    expiring = FakeTokens(lifetime=timedelta(minutes=1))
+    signer = SigningCache(expiring)
+    signer.sign_href(BLOB, "landsat-c2-l2")
+    signer.sign_href(BLOB, "landsat-c2-l2")
+    assert len(expiring.calls) == 2
+
+def test_sign_item_signs_all_assets_with_one_token():
+    fake = FakeTokens()
+    signer = SigningCache(fake)
+    item = _item("landsat-c2-l2", {
+        "red": BLOB + "?versionid=1",
+        "nir08": BLOB.replace("B4", "B5"),
+        "thumbnail": "https://example.com/thumb.png",
+    })
+
+    signed = signer.sign_item(item, ["red", "nir08", "thumbnail"])
+    assert list(signed) == ["red", "nir08", "thumbnail"]
+    assert parse_qs(urlsplit(signed["red"]).query) == {"versionid": ["1"], "st": ["now"], "se": ["later"], "sig": ["s1+="]}
+    assert parse_qs(urlsplit(signed["nir08"]).query)["sig"] == ["s1+="]
+    assert signed["thumbnail"] == "https://example.com/thumb.png"
+    assert fake.calls == ["landsateuwest/landsat-c2"]
+    assert item.assets["red"].href == BLOB + "?versionid=1"
+
+def test_default_signer_matches_planetary_computer(monkeypatch):
+    import planetary_computer
+    from planetary_computer.sas import SASToken
+
+    calls = []
+
+    def get_token(account, container):
+        calls.append((account, container))
+        return SASToken(token="st=now&se=later&sp=rl&sig=abc", expiry=datetime.now(timezone.utc) + timedelta(hours=1))
+
+    monkeypatch.setattr(planetary_computer.sas, "get_token", get_token)
+    signer = SigningCache()
+    for href in (BLOB, SENTINEL_BLOB, "https://example.com/B4.tif"):
+        assert signer.sign_href(href) == planetary_computer.sign_url(href)
+    calls.clear()
+    signer.sign_href(BLOB)
+    assert calls == []
@@ -0,0 +1,73 @@
+import os
+import time
+from datetime import date
+import pytest
+
+pytest.importorskip("pystac")
+pytest.importorskip("pystac_client")
+pytest.importorskip("shapely")
+
+TODAY = date(2026, 10, 17)  # Recent tail starts on 2026-01-01
+
+def test_split_range_historic_and_recent():
+    from aquaexchange.stac_cache import RECENT_TTL, _split_range
+
+    assert _split_range("2013-01-01/2015-12-31", TODAY) == [("2013-01-01/2015-12-31", None)]
+    assert _split_range("2026-03-01/2026-12-31", TODAY) == [("2026-03-01/2026-12-31", RECENT_TTL)]
+    assert _split_range("2018-01-01/2026-12-31", TODAY) == [
+        ("2018-01-01/2025-12-31", None),
+        ("2026-01-01/2026-12-31", RECENT_TTL),
+    ]
+    assert _split_range("../..", TODAY) == [("../2025-12-31", None), ("2026-01-01/..", RECENT_TTL)]
+
+@pytest.fixture
+def counted_searches(offline_catalog, monkeypatch):
+    """Search AOI of the synthetic catalog; counts the segments searched over the network."""
+    from shapely.geometry import shape
+    from aquaexchange import stac_cache
+
+    client = stac_cache.get_client(stac_cache.STAC_URL)
+    searched = []
+
+    class CountingClient:
+        def search(self, **kwargs):
+            searched.append(kwargs["datetime"])
+            return client.search(**kwargs)
+
+    monkeypatch.setattr(stac_cache, "get_client", lambda url=None: CountingClient())
+    aoi = shape(next(iter(client._items)).geometry).centroid.buffer(0.001)
+    return aoi, searched
+
+def test_recent_tail_expires_historic_part_does_not(counted_searches):
+    from aquaexchange import stac_cache
+
+    aoi, searched = counted_searches
+    first = stac_cache.search_items(["landsat-c2-l2"], aoi, "2013-01-01/..")
+    assert first
+    assert len(searched) == 2
+
+    assert [item.id for item in stac_cache.search_items(["landsat-c2-l2"], aoi, "2013-01-01/..")] == [item.id for item in first]
+    assert len(searched) == 2
+
+    # Age every cached segment past the TTL: only the recent tail is searched again
+    old = time.time() - 2 * stac_cache.RECENT_TTL
+    stac_dir = os.path.join(stac_cache.CACHE_DIR, "stac")
+    for name in os.listdir(stac_dir):
+        os.utime(os.path.join(stac_dir, name), (old, old))
+    stac_cache.search_items(["landsat-c2-l2"], aoi, "2013-01-01/..")
+    assert len(searched) == 3
+    assert searched[2] == searched[1]
+    assert searched[1].endswith("/..")
+
+def test_offline_cache_miss_raises(counted_searches):
+    from aquaexchange import stac_cache
+
+    aoi, searched = counted_searches
+    with pytest.raises(FileNotFoundError):
+        stac_cache.search_items(["landsat-c2-l2"], aoi, "2013-01-01/2015-12-31", offline=True)
+    assert searched == []
+
+    online = stac_cache.search_items(["landsat-c2-l2"], aoi, "2013-01-01/2015-12-31")
+    offline = stac_cache.search_items(["landsat-c2-l2"], aoi, "2013-01-01/2015-12-31", offline=True)
+    assert [item.id for item in offline] == [item.id for item in online]
+    assert len(searched) == 1
@@ -0,0 +1,12 @@
+def test_search_over_generated_catalog(offline_catalog):
+    """Smoke test: the benchmark dataset must stay searchable by the pipeline."""
+    from aquaexchange.geojson_maker import farm_geodataframe
+    from aquaexchange.search_stack_images import search_stac_images_by_pond
+    from aquaexchange.utils import load_json
+
+    ponds = farm_geodataframe(load_json(offline_catalog["farm"]))
+    pond_items = search_stac_images_by_pond(ponds)
+
+    assert set(pond_items) == set(ponds["pond_id"])
+    for years in pond_items.values():
+        assert sorted(years) == [2013, 2014, 2015]